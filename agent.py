@@ -2,151 +2,739 @@
 Agente de investigación simple y gratuito
 Usa Ollama (local) + DuckDuckGo (búsqueda gratis)
 """
-import subprocess
-from search import search_web
+import contextlib
+import functools
+import inspect
+import threading
+import time
+
+from cache import ModelInventory, ResponseCache, normalize_query, response_key
+from context import ContextBuilder, model_num_ctx
+from deadline import Deadline, DeadlineExceeded, exceeded_message, incomplete_message, remaining
+from llm import OllamaCLIClient, OllamaHTTPClient
+from search import format_results, query_variants, search_many, search_results
+from singleflight import SingleFlight
+from tracing import span
+
+
+def build_prompt(question, search_results):
+    """
+    Crea el prompt de investigación para el modelo
+    
+    Args:
+        question: La pregunta del usuario
+        search_results: Los resultados de búsqueda formateados
+        
+    Returns:
+        El prompt completo
+    """
+    return f"""Pregunta del usuario: {question}
+
+Información encontrada en internet:
+{search_results}
+
+Instrucciones: 
+- Usa la información de arriba para responder la pregunta
+- Sé claro y conciso
+- Si la información es limitada, dilo
+- Responde en español
+
+Respuesta:"""
+
+
+def _coalesced(method):
+    """
+    Une las llamadas idénticas simultáneas a un método del agente
+
+    Misma pregunta (normalizada) y mismo modelo: una sola búsqueda y una
+    sola generación, y todos reciben la respuesta (o el stream). El timeout
+    no forma parte de la clave: quien se une a una llamada en curso espera
+    como mucho su propio timeout.
+    """
+    streaming = inspect.isgeneratorfunction(method)
+    
+    @functools.wraps(method)
+    def wrapper(self, text, timeout=None):
+        if self.singleflight is None:
+            return method(self, text, timeout)
+        key = (method.__name__, self.model, normalize_query(text))
+        deadline = self._deadline(timeout)
+        at = deadline.at if deadline else None
+        if streaming:
+            return _until_deadline(
+                self.singleflight.stream(key, lambda: method(self, text, timeout), at),
+                deadline
+            )
+        try:
+            return self.singleflight.do(key, lambda: method(self, text, timeout), at)
+        except DeadlineExceeded:
+            return exceeded_message(deadline.seconds, "la espera de una pregunta igual")
+    
+    return wrapper
+
+
+def _until_deadline(chunks, deadline):
+    """Trozos de un stream compartido hasta el deadline de quien lo lee"""
+    started = False
+    try:
+        for text in chunks:
+            started = True
+            yield text
+    except DeadlineExceeded:
+        if started:
+            yield incomplete_message(deadline.seconds)
+        else:
+            yield exceeded_message(deadline.seconds, "la espera de una pregunta igual")
+    finally:
+        chunks.close()
 
 
 class ResearchAgent:
     """Agente de investigación completamente gratuito"""
     
-    def __init__(self, model=None):
+    def __init__(self, model=None, backend=None, host=None, options=None,
+                 search_cache=True, response_cache=None, fanout=False,
+                 fetch_pages=False, context_builder=None, search_backend=None,
+                 embedding_index=None, model_inventory=True, preload=True,
+                 keep_alive=None, coalesce=True, scheduler=None, priority="normal",
+                 answer_store=None, timeout=None, search_budget=0.4):
         """
         Inicializa el agente
         
         Args:
             model: Modelo de Ollama a usar (default: None, auto-detecta)
+            backend: Backend de LLM (default: API HTTP de Ollama,
+                     o `ollama run` si la API no responde)
+            host: URL de Ollama (default: $OLLAMA_HOST o http://localhost:11434),
+                  o una lista de URLs para repartir las peticiones entre
+                  varios servidores (ver balancer.py)
+            options: Opciones de generación de Ollama (temperature, num_ctx...)
+            search_cache: Reutilizar búsquedas recientes guardadas en disco
+                          (default: True)
+            response_cache: Reutilizar respuestas del modelo para prompts
+                            idénticos. True para usar la caché por defecto,
+                            o una ResponseCache (default: None, desactivada)
+            fanout: Buscar a la vez varias variantes de la pregunta
+                    (palabras clave, subpreguntas) y mezclar los resultados
+                    sin duplicados (default: False)
+            fetch_pages: Descargar las primeras páginas de resultados y usar
+                         su texto, no solo el resumen del buscador.
+                         True, o un PageFetcher (default: False)
+            context_builder: Elegir los fragmentos más relevantes hasta
+                             llenar la ventana de contexto del modelo, en vez
+                             de cortar cada resultado a 200 caracteres.
+                             True, o un ContextBuilder (default: None)
+            search_backend: Buscador a usar, ej: LocalIndexBackend para
+                            documentos locales (default: DuckDuckGo)
+            embedding_index: EmbeddingIndex para añadir a los resultados los
+                             fragmentos más parecidos por significado
+                             (default: None)
+            model_inventory: Guardar unos segundos en disco la lista de
+                             modelos para no preguntar a Ollama en cada
+                             arranque. True, False o un ModelInventory
+                             (default: True)
+            preload: Cargar el modelo en segundo plano al crear el agente y
+                     mientras se busca, para no esperar la carga después
+                     (default: True)
+            keep_alive: Cuánto tiempo deja Ollama el modelo cargado sin
+                        usarse (ej: "30m", 3600, -1 para siempre;
+                        default: el de Ollama, 5 minutos)
+            coalesce: Si llega la misma pregunta varias veces a la vez
+                      (desde varios hilos), buscar y generar una sola vez.
+                      True, False o un SingleFlight para compartirlo entre
+                      agentes con la misma configuración (default: True)
+            scheduler: ModelScheduler compartido con otros agentes que usan
+                       otros modelos en el mismo Ollama: agrupa las llamadas
+                       por modelo para cambiar de modelo lo menos posible.
+                       Con scheduler no se precarga el modelo (default: None)
+            priority: Prioridad de este agente en el scheduler: "high",
+                      "normal" o "low" (default: "normal")
+            answer_store: Responder con lo guardado si ya se investigó una
+                          pregunta igual o casi igual ("¿Qué es Python?" y
+                          "que es python"). True, o un AnswerStore
+                          (default: None, desactivado)
+            timeout: Segundos máximos por pregunta, de la búsqueda al último
+                     token. Al acabarse se cancela la generación y se
+                     devuelve lo generado hasta entonces (default: None,
+                     sin límite; cada llamada puede pasar el suyo)
+            search_budget: Parte del timeout para buscar (y descargar
+                           páginas); el resto queda para generar
+                           (default: 0.4)
         """
-        # Si no se especifica modelo, detectar automáticamente
-        if model is None:
-            self.model = self._detect_model()
-        else:
-            self.model = model
+        # Sin comprobar antes la API: si no responde, _list_models()
+        # cambia a `ollama run` (así arrancar cuesta una consulta, no dos)
+        if backend is None and isinstance(host, (list, tuple)):
+            # Importar aquí: balancer.py solo hace falta con varios servidores
+            from balancer import BalancedBackend
+            backend = BalancedBackend(host)
+        self._auto_backend = backend is None
+        self.backend = backend if backend is not None else OllamaHTTPClient(host)
+        self.options = options
+        self.search_cache = search_cache
+        self.fanout = fanout
+        self.search_backend = search_backend
+        self.embedding_index = embedding_index
+        if fetch_pages is True:
+            # Importar aquí: fetch.py solo hace falta si se descargan páginas
+            from fetch import PageFetcher
+            fetch_pages = PageFetcher()
+        self.fetcher = fetch_pages or None
+        self.response_cache = ResponseCache() if response_cache is True else response_cache
+        if answer_store is True:
+            # Importar aquí: answer_store.py solo hace falta si se usa
+            from answer_store import AnswerStore
+            answer_store = AnswerStore()
+        self.answer_store = answer_store or None
+        self.scheduler = scheduler
+        self.priority = priority
+        # Precargar el modelo fuera de turno provocaría justo los cambios
+        # de modelo que el scheduler intenta evitar
+        self.preload = preload and scheduler is None
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+        self.search_budget = search_budget
+        self.singleflight = SingleFlight() if coalesce is True else (coalesce or None)
+        self.last_stats = {}
+        self.last_timings = {}
+        self.last_cache_hit = False
+        self.last_timed_out = False
+        self._preload_thread = None
+        self._load_seconds = None
+        if model_inventory is True:
+            try:
+                model_inventory = ModelInventory()
+            except OSError:
+                model_inventory = None
+        self.model_inventory = model_inventory or None
         
+        # Si no se especifica modelo, _check_setup() lo detecta automáticamente
+        self.model = model
         self._check_setup()
+        
+        if context_builder is True:
+            context_builder = ContextBuilder(model_num_ctx(self.backend, self.model, self.options))
+        self.context_builder = context_builder
+        
+        self._start_preload()
+    
+    def _list_models(self, refresh=False):
+        """
+        Lista los modelos instalados
+        
+        Usa la lista guardada en disco si es reciente, salvo con refresh=True.
+        """
+        key = getattr(self.backend, "host", "cli")
+        if not refresh and self.model_inventory is not None:
+            models = self.model_inventory.get(key)
+            if models is not None:
+                return models
+        
+        try:
+            models = self.backend.list_models()
+        except OSError:
+            if not self._auto_backend:
+                raise
+            # La API no responde: usar `ollama run`
+            self.backend = OllamaCLIClient()
+            self._auto_backend = False
+            return self._list_models(refresh)
+        
+        if self.model_inventory is not None:
+            self.model_inventory.set(key, models)
+        return models
     
-    def _detect_model(self):
-        """Detecta automáticamente el primer modelo disponible"""
+    def _has_model(self, available):
+        """Indica si el modelo pedido (o alguno, si no se pidió) está instalado"""
+        if self.model is None:
+            return bool(available)
+        return any(self.model in name for name in available)
+    
+    def _check_setup(self):
+        """Verifica que todo esté instalado y elige el modelo si no se indicó"""
         try:
-            result = subprocess.run(
-                ["ollama", "list"],
-                capture_output=True,
-                text=True,
-                timeout=5
+            available = self._list_models()
+            if not self._has_model(available):
+                # La lista guardada puede no tener un modelo recién instalado
+                available = self._list_models(refresh=True)
+        except FileNotFoundError:
+            raise RuntimeError(
+                "❌ Ollama no está instalado.\n"
+                "Descárgalo de: https://ollama.com/download"
             )
-            
-            # Parsear la lista de modelos
-            lines = result.stdout.strip().split('\n')
-            if len(lines) > 1:  # Primera línea es el header
-                # Tomar el primer modelo disponible
-                first_model = lines[1].split()[0]
-                print(f"ℹ️  Usando modelo: {first_model}")
-                return first_model
-            else:
-                raise RuntimeError("No hay modelos instalados")
-                
         except Exception as e:
+            if self.model is not None:
+                raise
             raise RuntimeError(
                 f"❌ No se pudo detectar ningún modelo.\n"
                 f"Error: {e}\n"
                 f"Instala un modelo con: ollama pull gemma3:4b"
             )
-    
-    def _check_setup(self):
-        """Verifica que todo esté instalado correctamente"""
-        # Verificar Ollama
-        try:
-            result = subprocess.run(
-                ["ollama", "list"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            
-            # Verificar que el modelo especificado existe
-            if self.model not in result.stdout:
-                # Listar modelos disponibles
-                lines = result.stdout.strip().split('\n')
-                available = [line.split()[0] for line in lines[1:]] if len(lines) > 1 else []
-                
+        
+        if self.model is None:
+            if not available:
                 raise RuntimeError(
-                    f"❌ Modelo '{self.model}' no encontrado.\n"
-                    f"Modelos disponibles: {', '.join(available) if available else 'ninguno'}\n"
-                    f"Instala un modelo con: ollama pull gemma3:4b"
+                    "❌ No se pudo detectar ningún modelo.\n"
+                    "Error: No hay modelos instalados\n"
+                    "Instala un modelo con: ollama pull gemma3:4b"
                 )
-        except FileNotFoundError:
+            # Tomar el primer modelo disponible
+            self.model = available[0]
+            print(f"ℹ️  Usando modelo: {self.model}")
+        elif not self._has_model(available):
             raise RuntimeError(
-                "❌ Ollama no está instalado.\n"
-                "Descárgalo de: https://ollama.com/download"
+                f"❌ Modelo '{self.model}' no encontrado.\n"
+                f"Modelos disponibles: {', '.join(available) if available else 'ninguno'}\n"
+                f"Instala un modelo con: ollama pull gemma3:4b"
             )
     
-    def _call_ollama(self, prompt):
+    def _extra(self):
+        """Campos extra de las peticiones al modelo (keep_alive)"""
+        return {"keep_alive": self.keep_alive} if self.keep_alive is not None else {}
+    
+    def _turn(self, deadline=None):
+        """Turno del scheduler para llamar al modelo (o nada si no hay scheduler)"""
+        if self.scheduler is None:
+            return contextlib.nullcontext()
+        return self.scheduler.slot(self.model, self.priority, deadline)
+    
+    def _deadline(self, timeout):
+        """Deadline de una pregunta (el timeout de la llamada o el del agente)"""
+        # timeout=0 es un límite (ya vencido), no "sin límite"
+        seconds = self.timeout if timeout is None else timeout
+        return Deadline(seconds) if seconds is not None else None
+    
+    def _start_preload(self):
+        """Empieza a cargar el modelo en segundo plano (si no se está cargando ya)"""
+        if not self.preload:
+            return
+        thread = self._preload_thread
+        if thread is not None and thread.is_alive():
+            return
+        thread = threading.Thread(target=self._preload, name="preload", daemon=True)
+        # Arrancarlo antes de publicarlo: otra pregunta a la vez podría hacerle join()
+        thread.start()
+        self._preload_thread = thread
+    
+    def _preload(self):
+        """Carga el modelo (si ya está cargado, Ollama responde al momento)"""
+        start = time.perf_counter()
+        try:
+            self.backend.load(self.model, keep_alive=self.keep_alive)
+        except Exception:
+            # Si falla, la llamada real al modelo mostrará el error
+            pass
+        self._load_seconds = time.perf_counter() - start
+    
+    def _wait_preload(self, deadline=None):
+        """
+        Espera a que termine la carga en segundo plano
+        
+        Args:
+            deadline: Instante (time.monotonic()) hasta el que esperar como mucho
+        
+        Returns:
+            Segundos esperados (0 si el modelo ya estaba listo)
+        """
+        thread = self._preload_thread
+        if thread is None:
+            return 0.0
+        start = time.perf_counter()
+        thread.join(remaining(deadline))
+        return time.perf_counter() - start
+    
+    def _prepare(self, question, timings, deadline=None):
+        """
+        Busca y crea el prompt mientras el modelo se carga en segundo plano
+        
+        Args:
+            deadline: Deadline de la pregunta; la búsqueda solo puede usar
+                      la parte `search_budget`
+        
+        Returns:
+            El prompt, ya con el modelo cargado
+        """
+        start = time.perf_counter()
+        self._start_preload()
+        try:
+            with span("search"):
+                search_deadline = deadline.budget(self.search_budget) if deadline else None
+                search_results = self._search(question, search_deadline)
+        except Exception as e:
+            # El error no es información: el modelo responde sin resultados
+            print(f"⚠️  Error en la búsqueda: {str(e)}")
+            timings["search_error"] = True
+            search_results = format_results(question, [])
+        with span("prompt") as s:
+            prompt = self._build_prompt(question, search_results)
+            s.set(prompt_chars=len(prompt))
+        timings["search"] = time.perf_counter() - start
+        with span("model_load", model=self.model):
+            timings["load_wait"] = self._wait_preload(deadline.at if deadline else None)
+        if self._load_seconds is not None:
+            # Parte de la carga que se hizo mientras se buscaba
+            timings["load"] = self._load_seconds
+            timings["load_saved"] = max(0.0, self._load_seconds - timings["load_wait"])
+        return prompt
+    
+    def _cache_key(self, prompt):
+        """
+        Calcula la clave de la caché de respuestas para un prompt
+        
+        Returns:
+            (clave, digest del modelo), o (None, None) si no hay caché
+        """
+        if self.response_cache is None:
+            return None, None
+        digest = self.response_cache.model_digest(self.backend, self.model)
+        return response_key(self.model, digest, self.options, prompt), digest
+    
+    def _call_ollama(self, prompt, deadline=None, timings=None):
         """
         Llama a Ollama con un prompt
         
         Args:
             prompt: El texto a enviar al modelo
+            deadline: Deadline de la pregunta (default: sin límite)
+            timings: Tiempos de esta pregunta; si se acaba el tiempo se
+                     marca 'timed_out' y si falla Ollama 'error' (el agente
+                     atiende varias a la vez)
             
         Returns:
             La respuesta del modelo
         """
+        if deadline is not None:
+            # En streaming, al acabarse el tiempo queda lo generado hasta entonces
+            return "".join(self._call_ollama_stream(prompt, deadline, timings)).strip()
+        self.last_timed_out = False
+        with span("llm", model=self.model) as s:
+            key, digest = self._cache_key(prompt)
+            self.last_cache_hit = False
+            if key is not None:
+                cached = self.response_cache.get(key)
+                if cached is not None:
+                    self.last_stats = cached["stats"]
+                    self.last_cache_hit = True
+                    s.set(cache_hit=True)
+                    return cached["response"]
+                s.set(cache_hit=False)
+            
+            try:
+                with self._turn():
+                    result = self.backend.generate(
+                        self.model, prompt, self.options, **self._extra()
+                    )
+            except Exception as e:
+                s.set_error(str(e))
+                if timings is not None:
+                    timings["error"] = True
+                return f"Error al llamar a Ollama: {str(e)}"
+            
+            # Guardar estadísticas de la última llamada (tokens, duraciones...)
+            self.last_stats = _stats(result)
+            s.set_stats(self.last_stats)
+            response = result.get("response", "").strip()
+            
+            if key is not None:
+                self.response_cache.set(
+                    key, self.model, digest, {"response": response, "stats": self.last_stats}
+                )
+            return response
+    
+    def _call_ollama_stream(self, prompt, deadline=None, timings=None):
+        """
+        Llama a Ollama con un prompt y devuelve la respuesta en trozos
+        
+        Args:
+            prompt: El texto a enviar al modelo
+            deadline: Deadline de la pregunta (default: sin límite)
+            timings: Tiempos de esta pregunta (como en _call_ollama)
+            
+        Yields:
+            Trozos de texto de la respuesta según los genera el modelo.
+            Si se deja de leer (o se cierra el generador), o se acaba el
+            tiempo, la generación se cancela en Ollama; en ese caso el
+            último trozo avisa de que la respuesta está incompleta.
+        """
+        self.last_timed_out = False
+        with span("llm", model=self.model, stream=True) as s:
+            self.last_stats = {}
+            key, digest = self._cache_key(prompt)
+            self.last_cache_hit = False
+            if key is not None:
+                cached = self.response_cache.get(key)
+                if cached is not None:
+                    self.last_stats = cached["stats"]
+                    self.last_cache_hit = True
+                    s.set(cache_hit=True)
+                    if cached["response"]:
+                        yield cached["response"]
+                    return
+                s.set(cache_hit=False)
+            
+            extra = self._extra()
+            if deadline is not None:
+                extra["deadline"] = deadline.at
+            parts = []
+            started = False
+            try:
+                # El turno del scheduler dura hasta el último trozo
+                with self._turn(extra.get("deadline")):
+                    stream = self.backend.generate_stream(
+                        self.model, prompt, self.options, **extra
+                    )
+                    try:
+                        for chunk in stream:
+                            text = chunk.get("response", "")
+                            if not started:
+                                # Igual que _call_ollama, sin espacios al principio
+                                text = text.lstrip()
+                                started = bool(text)
+                            if text:
+                                parts.append(text)
+                                yield text
+                            if chunk.get("done"):
+                                self.last_stats = _stats(chunk)
+                                s.set_stats(self.last_stats)
+                                if key is not None:
+                                    response = "".join(parts).strip()
+                                    self.response_cache.set(
+                                        key, self.model, digest,
+                                        {"response": response, "stats": self.last_stats}
+                                    )
+                    finally:
+                        # Cerrar el stream cierra la conexión: Ollama deja de generar
+                        stream.close()
+            except DeadlineExceeded as e:
+                # Lo generado hasta ahora vale; nunca se guarda en la caché
+                self.last_timed_out = True
+                if timings is not None:
+                    timings["timed_out"] = True
+                s.set_error(str(e))
+                if parts:
+                    yield incomplete_message(deadline.seconds)
+                else:
+                    yield exceeded_message(deadline.seconds, "la generación")
+            except Exception as e:
+                # Puede fallar con la respuesta a medias: tampoco vale para guardarla
+                s.set_error(str(e))
+                if timings is not None:
+                    timings["error"] = True
+                yield f"Error al llamar a Ollama: {str(e)}"
+    
+    def _build_prompt(self, question, search_results):
+        """
+        Crea el prompt para el modelo a partir de la búsqueda
+        
+        Args:
+            question: La pregunta del usuario
+            search_results: Los resultados de búsqueda formateados
+            
+        Returns:
+            El prompt completo
+        """
+        return build_prompt(question, search_results)
+    
+    def _search(self, question, deadline=None):
+        """
+        Busca información para una pregunta
+        
+        Args:
+            question: La pregunta a investigar
+            deadline: Instante (time.monotonic()) límite para buscar y
+                      descargar páginas (default: sin límite)
+            
+        Returns:
+            Los resultados de búsqueda formateados para el prompt
+            
+        Raises:
+            El error de la búsqueda si no hay resultados de ningún sitio
+            (ni de la web ni del índice semántico)
+        """
+        error = None
         try:
-            result = subprocess.run(
-                ["ollama", "run", self.model, prompt],
-                capture_output=True,
-                text=True,
-                timeout=60
-            )
-            return result.stdout.strip()
+            if self.fanout:
+                results = search_many(
+                    query_variants(question), max_results=3,
+                    use_cache=self.search_cache, max_total=6,
+                    backend=self.search_backend, deadline=deadline
+                )
+            else:
+                results = search_results(
+                    question, max_results=3, use_cache=self.search_cache,
+                    backend=self.search_backend, deadline=deadline
+                )
+            
+            if self.fetcher is not None:
+                results = self.fetcher.enrich(results, timeout=remaining(deadline))
         except Exception as e:
-            return f"Error al llamar a Ollama: {str(e)}"
+            # Sin buscador todavía se puede responder con el índice semántico
+            if self.embedding_index is None:
+                raise
+            error, results = e, []
+        
+        if self.embedding_index is not None:
+            try:
+                results = results + self.embedding_index.search_results(question)
+            except Exception:
+                # Si falla el índice valen los resultados de la web (si los hay)
+                if error is not None:
+                    raise error
+        
+        if self.context_builder is not None:
+            return self.context_builder.build(
+                question, results, fixed_text=build_prompt(question, "")
+            )
+        return format_results(question, results)
     
-    def research(self, question):
+    def _stored_answer(self, question):
+        """Respuesta guardada para una pregunta casi igual (o None)"""
+        if self.answer_store is None:
+            return None
+        with span("answer_store", model=self.model) as s:
+            start = time.perf_counter()
+            found = self.answer_store.get(question, self.model)
+            s.set(cache_hit=found is not None)
+        if found is None:
+            return None
+        print(f"\n♻️  Respuesta guardada de: {found['question']}")
+        self.last_timings = {"total": time.perf_counter() - start,
+                             "saved": found["seconds"]}
+        return found["answer"]
+    
+    def _store_answer(self, question, response, timings):
+        """Guarda una respuesta para preguntas parecidas (si salió bien)"""
+        if self.answer_store is None or not response.strip():
+            return
+        # Sin búsqueda, sin modelo o a medias la respuesta no vale para la próxima vez
+        if timings.get("search_error") or timings.get("timed_out") or timings.get("error"):
+            return
+        self.answer_store.put(question, self.model, response, timings["total"])
+    
+    def session(self, session_id=None, **kwargs):
+        """
+        Abre una conversación de varios turnos (ver session.py)
+        
+        Args:
+            session_id: Identificador; si hay una guardada con ese id se retoma
+            **kwargs: Opciones de ChatSession (store_dir, max_tokens...)
+            
+        Returns:
+            Un ChatSession
+        """
+        # Importar aquí: session.py solo hace falta con conversaciones
+        from session import ChatSession
+        return ChatSession(self, session_id, **kwargs)
+    
+    @_coalesced
+    def research(self, question, timeout=None):
         """
         Investiga una pregunta usando búsqueda web + AI
         
         Args:
             question: La pregunta a investigar
+            timeout: Segundos máximos para responder (default: el del agente)
             
         Returns:
-            Respuesta completa del agente
+            Respuesta completa del agente (o lo generado hasta acabarse
+            el tiempo, con un aviso al final)
         """
+        stored = self._stored_answer(question)
+        if stored is not None:
+            return stored
         print(f"\n🔍 Buscando información sobre: {question}")
+        with span("research", model=self.model):
+            start = time.perf_counter()
+            timings = {}
+            deadline = self._deadline(timeout)
+            
+            # Paso 1: Buscar en internet (el modelo se carga mientras tanto)
+            # Paso 2: Crear prompt para el modelo
+            prompt = self._prepare(question, timings, deadline)
+            
+            # Paso 3: Generar respuesta
+            print("💭 Generando respuesta...")
+            generate_start = time.perf_counter()
+            response = self._call_ollama(prompt, deadline, timings)
+            
+            timings["generate"] = time.perf_counter() - generate_start
+            timings["total"] = time.perf_counter() - start
+            self.last_timings = timings
+            self._store_answer(question, response, timings)
+            return response
+    
+    @_coalesced
+    def research_stream(self, question, timeout=None):
+        """
+        Igual que research() pero devuelve la respuesta en trozos
         
-        # Paso 1: Buscar en internet
-        search_results = search_web(question, max_results=3)
-        
-        # Paso 2: Crear prompt para el modelo
-        prompt = f"""Pregunta del usuario: {question}
-
-Información encontrada en internet:
-{search_results}
-
-Instrucciones: 
-- Usa la información de arriba para responder la pregunta
-- Sé claro y conciso
-- Si la información es limitada, dilo
-- Responde en español
-
-Respuesta:"""
-        
-        # Paso 3: Generar respuesta
-        print("💭 Generando respuesta...")
-        response = self._call_ollama(prompt)
-        
-        return response
+        Args:
+            question: La pregunta a investigar
+            timeout: Segundos máximos para responder (default: el del agente)
+            
+        Yields:
+            Trozos de texto de la respuesta según se generan
+        """
+        stored = self._stored_answer(question)
+        if stored is not None:
+            yield stored
+            return
+        print(f"\n🔍 Buscando información sobre: {question}")
+        with span("research", model=self.model, stream=True):
+            start = time.perf_counter()
+            timings = {}
+            deadline = self._deadline(timeout)
+            prompt = self._prepare(question, timings, deadline)
+            
+            print("💭 Generando respuesta...")
+            generate_start = time.perf_counter()
+            parts = []
+            for text in self._call_ollama_stream(prompt, deadline, timings):
+                if "first_token" not in timings:
+                    timings["first_token"] = time.perf_counter() - generate_start
+                parts.append(text)
+                yield text
+            
+            timings["generate"] = time.perf_counter() - generate_start
+            timings["total"] = time.perf_counter() - start
+            self.last_timings = timings
+            self._store_answer(question, "".join(parts), timings)
     
-    def chat(self, message):
+    @_coalesced
+    def chat(self, message, timeout=None):
         """
         Chat simple sin búsqueda web
         
         Args:
             message: El mensaje para el modelo
+            timeout: Segundos máximos para responder (default: el del agente)
             
         Returns:
             Respuesta del modelo
         """
         print("💭 Procesando...")
-        return self._call_ollama(message)
+        with span("chat", model=self.model):
+            return self._call_ollama(message, self._deadline(timeout))
+    
+    @_coalesced
+    def chat_stream(self, message, timeout=None):
+        """
+        Igual que chat() pero devuelve la respuesta en trozos
+        
+        Args:
+            message: El mensaje para el modelo
+            timeout: Segundos máximos para responder (default: el del agente)
+            
+        Yields:
+            Trozos de texto de la respuesta según se generan
+        """
+        print("💭 Procesando...")
+        with span("chat", model=self.model, stream=True):
+            yield from self._call_ollama_stream(message, self._deadline(timeout))
+
+
+def _stats(result):
+    """Extrae las estadísticas (tokens, duraciones...) de una respuesta de Ollama"""
+    return {k: v for k, v in result.items() if k.endswith(("_count", "_duration"))}
 
 
 # Prueba rápida
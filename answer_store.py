@@ -0,0 +1,345 @@
+"""
+Respuestas guardadas para preguntas casi iguales
+"¿Qué es Python?" y "que es python" son la misma pregunta: la segunda
+vez se responde con lo guardado en vez de buscar y generar otra vez.
+
+Cada pregunta se reduce a sus palabras clave (sin tildes ni mayúsculas),
+los pares de palabras seguidas y trigramas de letras; una firma MinHash
+con bandas (LSH) encuentra en memoria las parecidas sin recorrer todas,
+y solo se usa la respuesta si el parecido (Jaccard) supera el umbral y
+no ha caducado.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+from cache import default_cache_dir
+from search import STOPWORDS
+
+
+# Firma MinHash: NUM_HASHES valores en BANDS bandas de ROWS valores.
+# Dos preguntas son candidatas si coinciden en alguna banda entera, con
+# probabilidad 1 - (1 - J^ROWS)^BANDS: 99,5% con Jaccard 0.8, 8% con 0.3
+# y casi 0 con preguntas de otro tema
+NUM_HASHES = 40
+BANDS = 10
+ROWS = NUM_HASHES // BANDS
+
+# Una permutación por valor de la firma (hash de la palabra XOR máscara)
+_MASKS = [
+    int.from_bytes(hashlib.blake2b(b"minhash-%d" % i, digest_size=8).digest(), "big")
+    for i in range(NUM_HASHES)
+]
+
+
+def _strip_accents(text):
+    return "".join(
+        c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c)
+    )
+
+
+# Las palabras interrogativas cambian la pregunta ("¿quién creó Python?" y
+# "¿cuándo se creó Python?"): no se descartan y tienen que coincidir
+QUESTION_WORDS = frozenset("""
+que quien quienes cual cuales cuando donde como cuanto cuanta cuantos cuantas por
+what who whom whose which when where why how
+""".split())
+
+# Letras de cada palabra en los pares de palabras seguidas
+PAIR_PREFIX = 5
+
+# Las negaciones cambian la respuesta: no se descartan
+_STOPWORDS = (frozenset(_strip_accents(w) for w in STOPWORDS)
+              - {"no", "sin", "not"} - QUESTION_WORDS)
+
+
+def question_features(question):
+    """
+    Reduce una pregunta a lo que la identifica
+
+    Returns:
+        (palabras clave en orden como texto, conjunto de palabras clave,
+        pares de palabras seguidas y trigramas, palabras que tienen que
+        coincidir). Los pares hacen que importe el orden ("lista en
+        diccionario" no es "diccionario en lista"). Dos preguntas con
+        números distintos ("Python 2" y "Python 3") o con otras palabras
+        interrogativas ("¿qué es...?" y "¿por qué...?") nunca se
+        consideran la misma.
+    """
+    words = list(dict.fromkeys(
+        w for w in re.findall(r"\w+", _strip_accents(question.casefold()))
+        if w not in _STOPWORDS and (len(w) > 1 or w.isdigit())
+    ))
+    joined = " ".join(words)
+    features = set(words)
+    # Pares con el principio de cada palabra (igual en singular y plural);
+    # "+" no sale en \w: un par nunca coincide con una palabra o un trigrama
+    stems = [w[:PAIR_PREFIX] for w in words]
+    features.update(f"{a}+{b}" for a, b in zip(stems, stems[1:]))
+    features.update(joined[i:i + 3] for i in range(len(joined) - 2))
+    constraints = frozenset(
+        w for w in words if w in QUESTION_WORDS or any(c.isdigit() for c in w)
+    )
+    return joined, frozenset(features), constraints
+
+
+def _hash(feature):
+    return int.from_bytes(
+        hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big"
+    )
+
+
+def minhash(features):
+    """Firma MinHash (NUM_HASHES enteros) de un conjunto de rasgos"""
+    hashes = [_hash(f) for f in features]
+    return [min(h ^ mask for h in hashes) for mask in _MASKS]
+
+
+def _bands(signature):
+    return [(b, tuple(signature[b * ROWS:(b + 1) * ROWS])) for b in range(BANDS)]
+
+
+class _Entry:
+    __slots__ = ("model", "key", "features", "constraints", "bands", "created", "accessed")
+
+    def __init__(self, model, key, features, constraints, bands, created, accessed):
+        self.model = model
+        self.key = key
+        self.features = features
+        self.constraints = constraints
+        self.bands = bands
+        self.created = created
+        self.accessed = accessed
+
+
+class AnswerStore:
+    """Respuestas del agente por pregunta, encontradas aunque cambie la redacción"""
+
+    def __init__(self, path=None, similarity=0.8, max_age=24 * 3600, max_entries=5000):
+        """
+        Inicializa el almacén
+
+        Args:
+            path: Archivo SQLite (default: <carpeta de caché>/answers.sqlite)
+            similarity: Parecido mínimo (Jaccard, de 0 a 1) para reutilizar
+                        una respuesta (default: 0.8)
+            max_age: Segundos que vale una respuesta (default: 1 día; la
+                     información de internet cambia)
+            max_entries: Respuestas guardadas como máximo; se borran las
+                         menos usadas
+        """
+        self.path = path or os.path.join(default_cache_dir(), "answers.sqlite")
+        self.similarity = similarity
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.lookup_seconds = 0.0
+
+        self._entries = {}
+        self._exact = {}
+        self._buckets = {}
+        self._touched = set()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " id INTEGER PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " question TEXT NOT NULL,"
+            " signature TEXT NOT NULL,"
+            " answer TEXT NOT NULL,"
+            " seconds REAL NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._db.commit()
+        self._load()
+
+    def _load(self):
+        """Reconstruye el índice en memoria (la firma ya está guardada)"""
+        cutoff = time.time() - self.max_age
+        rows = self._db.execute(
+            "SELECT id, model, question, signature, created, accessed FROM answers"
+            " WHERE created > ?", (cutoff,)
+        ).fetchall()
+        for entry_id, model, question, signature, created, accessed in rows:
+            key, features, constraints = question_features(question)
+            self._index(entry_id, _Entry(model, key, features, constraints,
+                                         _bands(json.loads(signature)), created, accessed))
+
+    def _index(self, entry_id, entry):
+        self._entries[entry_id] = entry
+        self._exact[(entry.model, entry.key)] = entry_id
+        for band in entry.bands:
+            self._buckets.setdefault(band, set()).add(entry_id)
+
+    def _unindex(self, entry_id):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        if self._exact.get((entry.model, entry.key)) == entry_id:
+            del self._exact[(entry.model, entry.key)]
+        for band in entry.bands:
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(entry_id)
+                if not bucket:
+                    del self._buckets[band]
+
+    def _exact_match(self, model, key, now):
+        """(1.0, id) si hay una respuesta vigente con las mismas palabras clave"""
+        entry_id = self._exact.get((model, key))
+        if entry_id is not None and self._entries[entry_id].created + self.max_age > now:
+            return 1.0, entry_id
+        return None
+
+    def _best(self, model, features, constraints, bands, now):
+        """(parecido, id) de la respuesta vigente más parecida, o None"""
+        candidates = set()
+        for band in bands:
+            candidates.update(self._buckets.get(band, ()))
+        best = None
+        for entry_id in candidates:
+            entry = self._entries[entry_id]
+            if (entry.model != model or entry.constraints != constraints
+                    or entry.created + self.max_age <= now):
+                continue
+            similarity = len(features & entry.features) / len(features | entry.features)
+            if similarity >= self.similarity and (best is None or similarity > best[0]):
+                best = (similarity, entry_id)
+        return best
+
+    def get(self, question, model):
+        """
+        Busca la respuesta de una pregunta igual o casi igual
+
+        Args:
+            question: La pregunta
+            model: Modelo que generaría la respuesta (solo se reutilizan
+                   respuestas del mismo modelo)
+
+        Returns:
+            Diccionario con 'answer', 'question' (la original guardada),
+            'similarity' y 'seconds' (lo que tardó generarla), o None
+        """
+        start = time.perf_counter()
+        key, features, constraints = question_features(question)
+        if not features:
+            return None
+        now = time.time()
+        with self._lock:
+            # Lo más común: la misma pregunta con otras mayúsculas, tildes o signos
+            best = self._exact_match(model, key, now)
+            if best is None:
+                best = self._best(model, features, constraints, _bands(minhash(features)), now)
+            if best is not None:
+                similarity, entry_id = best
+                row = self._db.execute(
+                    "SELECT question, answer, seconds FROM answers WHERE id = ?", (entry_id,)
+                ).fetchone()
+            self.lookup_seconds += time.perf_counter() - start
+            if best is None or row is None:
+                self.misses += 1
+                return None
+            # Se guarda en disco con la siguiente respuesta nueva (un commit
+            # por acierto costaría más que la búsqueda)
+            self._entries[entry_id].accessed = now
+            self._touched.add(entry_id)
+            self.hits += 1
+            self.saved_seconds += row[2]
+        return {"question": row[0], "answer": row[1], "similarity": similarity,
+                "seconds": row[2]}
+
+    def put(self, question, model, answer, seconds=0.0):
+        """
+        Guarda la respuesta de una pregunta
+
+        Args:
+            question: La pregunta
+            model: Modelo que generó la respuesta
+            answer: La respuesta
+            seconds: Lo que tardó en obtenerse (para medir el tiempo ahorrado)
+        """
+        key, features, constraints = question_features(question)
+        if not features:
+            return
+        signature = minhash(features)
+        bands = _bands(signature)
+        now = time.time()
+        with self._lock:
+            # La misma pregunta sustituye a la anterior
+            same = self._exact.get((model, key))
+            if same is not None:
+                self._db.execute("DELETE FROM answers WHERE id = ?", (same,))
+                self._unindex(same)
+            cursor = self._db.execute(
+                "INSERT INTO answers (model, question, signature, answer, seconds, created,"
+                " accessed) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (model, question, json.dumps(signature), answer, seconds, now, now)
+            )
+            self._index(cursor.lastrowid, _Entry(model, key, features, constraints, bands, now, now))
+            self._flush_touched()
+            self._evict(now)
+            self._db.commit()
+
+    def _flush_touched(self):
+        """Guarda en disco cuándo se usó cada respuesta acertada"""
+        self._db.executemany(
+            "UPDATE answers SET accessed = ? WHERE id = ?",
+            [(self._entries[i].accessed, i) for i in self._touched if i in self._entries]
+        )
+        self._touched.clear()
+
+    def _evict(self, now):
+        """Borra las respuestas caducadas y, si sobran, las menos usadas"""
+        fresh = []
+        doomed = []
+        for entry_id, entry in self._entries.items():
+            if entry.created + self.max_age <= now:
+                doomed.append(entry_id)
+            else:
+                fresh.append((entry.accessed, entry_id))
+        excess = len(fresh) - self.max_entries
+        if excess > 0:
+            fresh.sort()
+            doomed += [entry_id for _, entry_id in fresh[:excess]]
+        self._db.execute("DELETE FROM answers WHERE created <= ?", (now - self.max_age,))
+        self._db.executemany("DELETE FROM answers WHERE id = ?", [(i,) for i in doomed])
+        for entry_id in doomed:
+            self._unindex(entry_id)
+
+    def stats(self):
+        """Aciertos, fallos y tiempo de generación ahorrado"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+                "saved_seconds": round(self.saved_seconds, 3),
+                "lookup_ms": round(self.lookup_seconds / lookups * 1000, 4) if lookups else 0.0,
+            }
+
+    def clear(self):
+        """Vacía el almacén"""
+        with self._lock:
+            self._entries.clear()
+            self._exact.clear()
+            self._buckets.clear()
+            self._touched.clear()
+            self._db.execute("DELETE FROM answers")
+            self._db.commit()
+
+    def close(self):
+        """Guarda los últimos usos y cierra la base de datos"""
+        with self._lock:
+            self._flush_touched()
+            self._db.commit()
+            self._db.close()
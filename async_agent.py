@@ -0,0 +1,188 @@
+"""
+Versión asyncio del agente de investigación
+Para servicios que atienden muchas preguntas a la vez sin gastar un hilo por pregunta
+"""
+import asyncio
+
+from agent import build_prompt, _stats
+from async_llm import AsyncOllamaClient
+from llm import _same_model
+from search import format_results, search_results_async
+
+
+class AsyncResearchAgent:
+    """
+    Agente de investigación asíncrono
+
+    Igual que ResearchAgent, pero research() y chat() son corrutinas.
+    Miles de preguntas pueden esperar a la vez en un mismo event loop;
+    solo max_concurrency llegan a Ollama al mismo tiempo.
+    No imprime mensajes de progreso.
+    """
+
+    def __init__(self, model=None, host=None, options=None, max_concurrency=4,
+                 search_cache=True, client=None, search_backend=None):
+        """
+        Inicializa el agente (el modelo se comprueba en la primera llamada)
+
+        Args:
+            model: Modelo de Ollama a usar (default: None, auto-detecta)
+            host: URL de Ollama (default: $OLLAMA_HOST o http://localhost:11434)
+            options: Opciones de generación de Ollama (temperature, num_ctx...)
+            max_concurrency: Peticiones simultáneas máximas hacia Ollama
+            search_cache: Reutilizar búsquedas recientes guardadas en disco
+            client: Cliente asíncrono de Ollama (default: AsyncOllamaClient)
+            search_backend: Buscador a usar (default: DuckDuckGo)
+        """
+        self.client = client if client is not None else AsyncOllamaClient(
+            host, max_concurrency=max_concurrency
+        )
+        self.model = model
+        self.options = options
+        self.search_cache = search_cache
+        self.search_backend = search_backend
+        self.last_stats = {}
+        self._ready = False
+        self._setup_lock = None
+
+    async def setup(self):
+        """Detecta o comprueba el modelo (se llama solo la primera vez)"""
+        if self._ready:
+            return
+        if self._setup_lock is None:
+            self._setup_lock = asyncio.Lock()
+
+        async with self._setup_lock:
+            if self._ready:
+                return
+            try:
+                available = await self.client.list_models()
+            except OSError:
+                raise RuntimeError(
+                    "❌ No se pudo conectar con Ollama.\n"
+                    "Comprueba que está corriendo: ollama serve"
+                )
+
+            if self.model is None:
+                if not available:
+                    raise RuntimeError(
+                        "❌ No se pudo detectar ningún modelo.\n"
+                        "Instala un modelo con: ollama pull gemma3:4b"
+                    )
+                self.model = available[0]
+            elif not any(_same_model(name, self.model) or self.model in name
+                         for name in available):
+                raise RuntimeError(
+                    f"❌ Modelo '{self.model}' no encontrado.\n"
+                    f"Modelos disponibles: {', '.join(available) if available else 'ninguno'}\n"
+                    f"Instala un modelo con: ollama pull gemma3:4b"
+                )
+            self._ready = True
+
+    async def _call_ollama(self, prompt):
+        """
+        Llama a Ollama con un prompt
+
+        Returns:
+            La respuesta del modelo
+        """
+        await self.setup()
+        try:
+            result = await self.client.generate(self.model, prompt, self.options)
+        except Exception as e:
+            return f"Error al llamar a Ollama: {str(e)}"
+
+        self.last_stats = _stats(result)
+        return result.get("response", "").strip()
+
+    async def _call_ollama_stream(self, prompt):
+        """
+        Llama a Ollama y devuelve la respuesta en trozos
+
+        Si se deja de leer o se cancela la tarea, la generación se cancela
+        en Ollama.
+        """
+        await self.setup()
+        stream = self.client.generate_stream(self.model, prompt, self.options)
+        started = False
+        try:
+            async for chunk in stream:
+                text = chunk.get("response", "")
+                if not started:
+                    text = text.lstrip()
+                    started = bool(text)
+                if text:
+                    yield text
+                if chunk.get("done"):
+                    self.last_stats = _stats(chunk)
+        except Exception as e:
+            yield f"Error al llamar a Ollama: {str(e)}"
+        finally:
+            await stream.aclose()
+
+    async def _prepare(self, question):
+        """
+        Busca y crea el prompt
+
+        Si la búsqueda falla, el modelo responde sin resultados (como
+        ResearchAgent): el texto del error no es información.
+        """
+        try:
+            results = await search_results_async(
+                question, max_results=3, use_cache=self.search_cache,
+                backend=self.search_backend
+            )
+        except Exception:
+            results = []
+        return build_prompt(question, format_results(question, results))
+
+    async def research(self, question):
+        """
+        Investiga una pregunta usando búsqueda web + AI
+
+        Args:
+            question: La pregunta a investigar
+
+        Returns:
+            Respuesta completa del agente
+        """
+        return await self._call_ollama(await self._prepare(question))
+
+    async def research_stream(self, question):
+        """Igual que research() pero devuelve la respuesta en trozos"""
+        async for text in self._call_ollama_stream(await self._prepare(question)):
+            yield text
+
+    async def chat(self, message):
+        """
+        Chat simple sin búsqueda web
+
+        Args:
+            message: El mensaje para el modelo
+
+        Returns:
+            Respuesta del modelo
+        """
+        return await self._call_ollama(message)
+
+    async def chat_stream(self, message):
+        """Igual que chat() pero devuelve la respuesta en trozos"""
+        async for text in self._call_ollama_stream(message):
+            yield text
+
+    async def close(self):
+        """Cierra las conexiones con Ollama"""
+        await self.client.close()
+
+
+# Prueba rápida
+if __name__ == "__main__":
+    async def main():
+        agent = AsyncResearchAgent()
+        preguntas = ["¿Qué es Python?", "¿Qué es Rust?", "¿Qué es Go?"]
+        respuestas = await asyncio.gather(*(agent.research(p) for p in preguntas))
+        for pregunta, respuesta in zip(preguntas, respuestas):
+            print(f"\n❓ {pregunta}\n💬 {respuesta}")
+        await agent.close()
+
+    asyncio.run(main())
@@ -0,0 +1,232 @@
+"""
+Cliente asyncio de la API REST de Ollama
+Va aparte de llm.py para no cargar asyncio en el agente síncrono
+"""
+import asyncio
+import json
+
+from llm import OllamaError, _resolve_host
+
+
+class AsyncOllamaClient:
+    """
+    Cliente asyncio de la API REST de Ollama
+
+    Reutiliza conexiones keep-alive y limita cuántas peticiones
+    llegan a la vez al servidor; el resto espera sin bloquear hilos.
+    """
+
+    def __init__(self, host=None, max_concurrency=4, timeout=60):
+        """
+        Inicializa el cliente
+
+        Args:
+            host: URL de Ollama (default: $OLLAMA_HOST o http://localhost:11434)
+            max_concurrency: Peticiones simultáneas máximas hacia Ollama
+            timeout: Timeout en segundos para conectar y entre datos recibidos
+        """
+        self.scheme, self.hostname, self.port = _resolve_host(host)
+        self.host = f"{self.scheme}://{self.hostname}:{self.port}"
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self._idle = []
+        self._semaphore = None
+
+    def _get_semaphore(self):
+        # Se crea al usarse para quedar ligado al event loop que lo usa
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _connect(self):
+        """Toma una conexión libre o abre una nueva"""
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not writer.is_closing() and not reader.at_eof():
+                return reader, writer, True
+            writer.close()
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(self.hostname, self.port, ssl=self.scheme == "https"),
+            self.timeout
+        )
+        return reader, writer, False
+
+    async def _send(self, method, path, payload=None):
+        """
+        Envía una petición y lee la cabecera de la respuesta
+
+        Returns:
+            (reader, writer, cabeceras de la respuesta)
+        """
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        head = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {self.hostname}:{self.port}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: keep-alive\r\n\r\n"
+        ).encode("latin-1")
+
+        reader, writer, reused = await self._connect()
+        try:
+            writer.write(head + body)
+            await writer.drain()
+            status, headers = await self._read_head(reader)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer.close()
+            if not reused:
+                raise
+            # La conexión reutilizada estaba cerrada: reintentar con una nueva
+            reader, writer, _ = await self._connect()
+            try:
+                writer.write(head + body)
+                await writer.drain()
+                status, headers = await self._read_head(reader)
+            except BaseException:
+                writer.close()
+                raise
+        except BaseException:
+            writer.close()
+            raise
+
+        if status >= 400:
+            detail = b"".join([part async for part in self._read_body(reader, headers)])
+            self._finish(reader, writer, headers)
+            detail = detail.decode("utf-8", errors="replace")
+            try:
+                detail = json.loads(detail).get("error", detail)
+            except (ValueError, AttributeError):
+                pass
+            raise OllamaError(f"Ollama respondió {status}: {detail}")
+
+        return reader, writer, headers
+
+    async def _read_head(self, reader):
+        """Lee la línea de estado y las cabeceras"""
+        line = await asyncio.wait_for(reader.readline(), self.timeout)
+        if not line:
+            raise ConnectionResetError("Conexión cerrada por Ollama")
+        status = int(line.split()[1])
+        headers = {}
+        while True:
+            line = await asyncio.wait_for(reader.readline(), self.timeout)
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return status, headers
+
+    async def _read_body(self, reader, headers):
+        """Va devolviendo el cuerpo de la respuesta (normal o chunked)"""
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size_line = await asyncio.wait_for(reader.readline(), self.timeout)
+                size = int(size_line.split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    # Saltar trailers hasta la línea vacía
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    return
+                data = await asyncio.wait_for(reader.readexactly(size + 2), self.timeout)
+                yield data[:-2]
+        elif "content-length" in headers:
+            length = int(headers["content-length"])
+            if length:
+                yield await asyncio.wait_for(reader.readexactly(length), self.timeout)
+        else:
+            yield await asyncio.wait_for(reader.read(), self.timeout)
+
+    def _finish(self, reader, writer, headers):
+        """Devuelve la conexión al pool si el servidor la deja abierta"""
+        if headers.get("connection", "").lower() == "close" or (
+            "content-length" not in headers and "transfer-encoding" not in headers
+        ):
+            writer.close()
+        else:
+            self._idle.append((reader, writer))
+
+    async def _request(self, method, path, payload=None):
+        """Hace una petición completa y devuelve el JSON de la respuesta"""
+        async with self._get_semaphore():
+            reader, writer, headers = await self._send(method, path, payload)
+            try:
+                data = b"".join([part async for part in self._read_body(reader, headers)])
+            except BaseException:
+                writer.close()
+                raise
+            self._finish(reader, writer, headers)
+        return json.loads(data) if data else {}
+
+    async def _stream(self, path, payload):
+        """
+        Hace una petición en modo streaming y va devolviendo cada línea JSON
+
+        Si el generador se cierra o la tarea se cancela antes de terminar,
+        se cierra la conexión y Ollama cancela la generación.
+        """
+        async with self._get_semaphore():
+            reader, writer, headers = await self._send("POST", path, payload)
+            finished = False
+            buffer = b""
+            try:
+                async for data in self._read_body(reader, headers):
+                    buffer += data
+                    *lines, buffer = buffer.split(b"\n")
+                    for line in lines:
+                        if not line.strip():
+                            continue
+                        chunk = json.loads(line)
+                        if "error" in chunk:
+                            raise OllamaError(chunk["error"])
+                        yield chunk
+                if buffer.strip():
+                    yield json.loads(buffer)
+                finished = True
+            finally:
+                if finished:
+                    self._finish(reader, writer, headers)
+                else:
+                    writer.close()
+
+    async def list_models(self):
+        """Lista los modelos instalados"""
+        data = await self._request("GET", "/api/tags")
+        return [m["name"] for m in data.get("models", [])]
+
+    async def generate(self, model, prompt, options=None, **extra):
+        """Genera una respuesta con /api/generate (ver OllamaHTTPClient.generate)"""
+        payload = {"model": model, "prompt": prompt, "stream": False}
+        if options:
+            payload["options"] = options
+        payload.update(extra)
+        return await self._request("POST", "/api/generate", payload)
+
+    async def chat(self, model, messages, options=None, **extra):
+        """Genera una respuesta con /api/chat (ver OllamaHTTPClient.chat)"""
+        payload = {"model": model, "messages": messages, "stream": False}
+        if options:
+            payload["options"] = options
+        payload.update(extra)
+        return await self._request("POST", "/api/chat", payload)
+
+    def generate_stream(self, model, prompt, options=None, **extra):
+        """Igual que generate() pero va devolviendo los trozos según llegan"""
+        payload = {"model": model, "prompt": prompt, "stream": True}
+        if options:
+            payload["options"] = options
+        payload.update(extra)
+        return self._stream("/api/generate", payload)
+
+    def chat_stream(self, model, messages, options=None, **extra):
+        """Igual que chat() pero va devolviendo los trozos según llegan"""
+        payload = {"model": model, "messages": messages, "stream": True}
+        if options:
+            payload["options"] = options
+        payload.update(extra)
+        return self._stream("/api/chat", payload)
+
+    async def close(self):
+        """Cierra todas las conexiones libres"""
+        while self._idle:
+            _, writer = self._idle.pop()
+            writer.close()
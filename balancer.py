@@ -0,0 +1,273 @@
+"""
+Reparto de peticiones entre varios servidores de Ollama
+Cada generación va al servidor con menos peticiones en curso, mejor
+si ya tiene el modelo cargado; los servidores que fallan se apartan
+un rato y vuelven solos cuando responden de nuevo
+
+Uso:
+    agent = ResearchAgent(host=["http://gpu1:11434", "http://gpu2:11434"])
+"""
+import http.client
+import threading
+import time
+
+from deadline import DeadlineExceeded
+from llm import OllamaError, OllamaHTTPClient, _same_model
+
+
+# Errores que indican que el servidor no responde (no que la petición esté mal)
+NODE_ERRORS = (OSError, http.client.HTTPException)
+
+
+class _Node:
+    """Un servidor de Ollama y su estado"""
+
+    def __init__(self, host, pool_size, timeout, health_timeout):
+        self.client = OllamaHTTPClient(host, pool_size=pool_size, timeout=timeout)
+        # Cliente aparte con timeout corto: un servidor colgado no bloquea las comprobaciones
+        self.probe = OllamaHTTPClient(host, pool_size=1, timeout=health_timeout)
+        self.host = self.client.host
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.models = None
+        self.loaded = set()
+
+    def has(self, model, names):
+        return any(_same_model(name, model) for name in names)
+
+
+class BalancedBackend:
+    """
+    Backend de LLM que reparte entre varios servidores de Ollama
+
+    Tiene la misma interfaz que OllamaHTTPClient, así que se puede pasar
+    como backend a ResearchAgent.
+    """
+
+    def __init__(self, hosts, pool_size=4, timeout=60, health_interval=10,
+                 health_timeout=2, max_failures=3, eject_seconds=30, load_penalty=2):
+        """
+        Args:
+            hosts: Lista de URLs de Ollama
+            pool_size: Conexiones abiertas por servidor
+            timeout: Timeout de cada petición en segundos
+            health_interval: Segundos entre comprobaciones de los servidores
+                             (0 para no comprobarlos en segundo plano)
+            health_timeout: Timeout de cada comprobación
+            max_failures: Fallos seguidos para apartar un servidor
+            eject_seconds: Segundos que un servidor queda apartado como mínimo
+            load_penalty: Peticiones en curso que "cuesta" elegir un servidor
+                          sin el modelo cargado (tiene que cargarlo primero)
+        """
+        if not hosts:
+            raise ValueError("Hace falta al menos un servidor de Ollama")
+        self.nodes = [_Node(h, pool_size, timeout, health_timeout) for h in hosts]
+        self.host = ",".join(node.host for node in self.nodes)
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.load_penalty = load_penalty
+        self._lock = threading.Lock()
+        self._next = 0
+        self._stop = threading.Event()
+        self._health_thread = None
+        if health_interval:
+            self._health_thread = threading.Thread(
+                target=self._health_loop, args=(health_interval,),
+                name="ollama-health", daemon=True
+            )
+            self._health_thread.start()
+
+    # --- Estado de los servidores ---
+
+    def _health_loop(self, interval):
+        while not self._stop.is_set():
+            self.check_health()
+            self._stop.wait(interval)
+
+    def check_health(self):
+        """Pregunta a cada servidor qué modelos tiene y cuáles están cargados"""
+        for node in self.nodes:
+            try:
+                models = node.probe.list_models()
+                loaded = node.probe.running_models()
+            except Exception:
+                self._failed(node)
+                continue
+            finally:
+                # Conexión nueva en cada comprobación: que una abierta de antes
+                # no oculte que el servidor ya no acepta conexiones
+                node.probe.close()
+            with self._lock:
+                node.models = set(models)
+                node.loaded = set(loaded)
+                node.failures = 0
+                # Vuelve al reparto aunque no haya pasado eject_seconds
+                node.ejected_until = 0.0
+
+    def _failed(self, node):
+        with self._lock:
+            node.failures += 1
+            if node.failures >= self.max_failures:
+                node.ejected_until = time.monotonic() + self.eject_seconds
+
+    def _acquire(self, model, exclude=()):
+        """Elige servidor para una petición y la apunta como en curso"""
+        with self._lock:
+            now = time.monotonic()
+            candidates = [
+                n for n in self.nodes
+                if n not in exclude and n.ejected_until <= now
+                and (n.models is None or n.has(model, n.models))
+            ]
+            if not candidates:
+                # Todos apartados o sin el modelo: mejor intentarlo que fallar seguro
+                candidates = [n for n in self.nodes if n not in exclude]
+            if not candidates:
+                raise OllamaError("❌ Ningún servidor de Ollama responde")
+
+            # Empezar cada vez por uno distinto para repartir los empates
+            start = self._next % len(candidates)
+            self._next += 1
+            ordered = candidates[start:] + candidates[:start]
+            node = min(ordered, key=lambda n: n.outstanding + (
+                0 if n.has(model, n.loaded) else self.load_penalty
+            ))
+            node.outstanding += 1
+            node.requests += 1
+            return node
+
+    def _release(self, node, model, ok, loaded=True):
+        with self._lock:
+            node.outstanding -= 1
+            if ok:
+                node.failures = 0
+                if loaded:
+                    node.loaded.add(model)
+        if not ok:
+            self._failed(node)
+
+    def _run(self, model, call):
+        """Hace una petición; si el servidor no responde, prueba con otro"""
+        tried = []
+        while True:
+            node = self._acquire(model, tried)
+            try:
+                result = call(node.client)
+            except DeadlineExceeded:
+                # Se acabó el tiempo de la petición, no es que el servidor falle
+                self._release(node, model, ok=True, loaded=False)
+                raise
+            except NODE_ERRORS:
+                self._release(node, model, ok=False)
+                tried.append(node)
+                if len(tried) >= len(self.nodes):
+                    raise
+                continue
+            except Exception:
+                # El servidor respondió (ej: error 400): no es culpa suya
+                self._release(node, model, ok=True, loaded=False)
+                raise
+            self._release(node, model, ok=True)
+            return result
+
+    def _stream(self, model, make_stream):
+        """Igual que _run() para streams; solo se reintenta si no llegó nada"""
+        tried = []
+        while True:
+            node = self._acquire(model, tried)
+            stream = make_stream(node.client)
+            started = False
+            ok, loaded = True, True
+            try:
+                for chunk in stream:
+                    started = True
+                    yield chunk
+                return
+            except DeadlineExceeded:
+                # Como en _run(): ni es culpa del servidor ni sabemos si cargó el modelo
+                loaded = False
+                raise
+            except NODE_ERRORS:
+                ok = False
+                tried.append(node)
+                if started or len(tried) >= len(self.nodes):
+                    raise
+            except Exception:
+                # El servidor respondió (ej: error 400): no es culpa suya
+                loaded = False
+                raise
+            finally:
+                stream.close()
+                self._release(node, model, ok, loaded)
+
+    # --- Interfaz de backend ---
+
+    def is_available(self):
+        """Indica si algún servidor responde"""
+        return any(node.probe.is_available() for node in self.nodes)
+
+    def list_models(self):
+        """Modelos instalados en alguno de los servidores"""
+        if all(node.models is None for node in self.nodes):
+            self.check_health()
+        if all(node.models is None for node in self.nodes):
+            raise ConnectionError("Ningún servidor de Ollama responde")
+        names = []
+        for node in self.nodes:
+            for name in sorted(node.models or ()):
+                if name not in names:
+                    names.append(name)
+        return names
+
+    def model_digest(self, model):
+        return self._run(model, lambda client: client.model_digest(model))
+
+    def show(self, model):
+        return self._run(model, lambda client: client.show(model))
+
+    def load(self, model, keep_alive=None):
+        return self._run(model, lambda client: client.load(model, keep_alive))
+
+    def generate(self, model, prompt, options=None, **extra):
+        return self._run(model, lambda client: client.generate(model, prompt, options, **extra))
+
+    def chat(self, model, messages, options=None, **extra):
+        return self._run(model, lambda client: client.chat(model, messages, options, **extra))
+
+    def embed(self, model, texts, **extra):
+        return self._run(model, lambda client: client.embed(model, texts, **extra))
+
+    def generate_stream(self, model, prompt, options=None, **extra):
+        return self._stream(
+            model, lambda client: client.generate_stream(model, prompt, options, **extra)
+        )
+
+    def chat_stream(self, model, messages, options=None, **extra):
+        return self._stream(
+            model, lambda client: client.chat_stream(model, messages, options, **extra)
+        )
+
+    def stats(self):
+        """Estado de cada servidor (para /health o para depurar)"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "host": node.host,
+                    "outstanding": node.outstanding,
+                    "requests": node.requests,
+                    "failures": node.failures,
+                    "ejected": node.ejected_until > now,
+                    "loaded": sorted(node.loaded),
+                }
+                for node in self.nodes
+            ]
+
+    def close(self):
+        """Para las comprobaciones y cierra las conexiones"""
+        self._stop.set()
+        for node in self.nodes:
+            node.client.close()
+            node.probe.close()
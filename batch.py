@@ -0,0 +1,231 @@
+"""
+Investigación por lotes: muchas preguntas, resultados en JSONL
+
+Las búsquedas de las siguientes preguntas se adelantan mientras el modelo
+genera las respuestas actuales. Las preguntas se leen y los resultados se
+escriben según avanzan, así que la memoria no crece con el tamaño del lote.
+
+Cada pregunta pasa por agent.research(), igual que una suelta: timeout,
+respuestas guardadas, trazas y grabación (cassette.py) funcionan igual.
+"""
+import contextlib
+import copy
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from cache import normalize_query
+from search import SearchBackend, search_results
+
+
+def read_questions(path):
+    """
+    Lee preguntas de un archivo (una por línea) sin cargarlo entero
+
+    Args:
+        path: Ruta del archivo, o '-' para leer de la entrada estándar
+
+    Yields:
+        (índice, pregunta) para cada línea no vacía. El índice es el número
+        de pregunta, y se usa para retomar un lote a medias.
+    """
+    stream = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        index = 0
+        for line in stream:
+            question = line.strip()
+            if question:
+                yield index, question
+                index += 1
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def completed_indexes(output_path):
+    """
+    Lee qué preguntas ya están respondidas en un archivo de salida
+
+    Si la última línea quedó a medias (el proceso se cortó), se recorta
+    el archivo para poder seguir añadiendo resultados.
+
+    Returns:
+        Conjunto de índices ya respondidos
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, "rb+") as f:
+        valid_end = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                break
+            valid_end += len(line)
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            # Líneas que no son resultados (ej: escritas a mano) no cuentan
+            index = record.get("index") if isinstance(record, dict) else None
+            if index is not None and "error" not in record:
+                done.add(index)
+        f.truncate(valid_end)
+    return done
+
+
+class _SearchAhead(SearchBackend):
+    """
+    Buscador que responde con búsquedas lanzadas por adelantado
+
+    Es el buscador de la copia del agente que responde el lote: research()
+    recibe la búsqueda ya hecha (o en curso) de su pregunta, y cualquier
+    otra (ej: las variantes de fanout) se hace en el momento.
+    """
+
+    name = "batch"
+
+    def __init__(self, backend, use_cache, executor):
+        self.backend = backend
+        self.use_cache = use_cache
+        self.cacheable = backend.cacheable if backend is not None else True
+        self._executor = executor
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, query, max_results=3):
+        """Empieza a buscar en segundo plano"""
+        future = self._executor.submit(
+            search_results, query, max_results, self.use_cache, self.backend
+        )
+        with self._lock:
+            self._pending[(normalize_query(query), max_results)] = future
+
+    def forget(self, query, max_results=3):
+        """Descarta lo precargado de una pregunta que no llegó a usarlo"""
+        with self._lock:
+            future = self._pending.pop((normalize_query(query), max_results), None)
+        if future is not None:
+            future.cancel()
+
+    def search(self, query, max_results=3):
+        with self._lock:
+            future = self._pending.pop((normalize_query(query), max_results), None)
+        if future is not None and not future.cancelled():
+            # Si aún no ha terminado, al menos empezó antes
+            return future.result()
+        return search_results(query, max_results, use_cache=False, backend=self.backend)
+
+
+def iter_batch(agent, questions, workers=2, search_workers=4, lookahead=8, skip=(),
+               timeout=None):
+    """
+    Responde muchas preguntas solapando búsquedas y generación
+
+    Args:
+        agent: Un ResearchAgent (no se modifica: el lote usa una copia)
+        questions: Iterable de (índice, pregunta), ej: read_questions()
+        workers: Respuestas que se generan a la vez
+        search_workers: Búsquedas que se hacen a la vez
+        lookahead: Preguntas que se buscan por adelantado, además de las
+                   que se están generando
+        skip: Índices que ya están respondidos y se saltan
+        timeout: Segundos máximos por pregunta, desde que se empieza a
+                 responder (default: el del agente)
+
+    Yields:
+        Un diccionario por pregunta según terminan (no en orden), con
+        'index', 'question', 'answer' y 'seconds' (o 'error' si falló)
+    """
+    def answer(index, question, queued):
+        try:
+            response = agent.research(question, timeout)
+            if response.startswith("Error al llamar a Ollama"):
+                raise RuntimeError(response)
+            record = {"index": index, "question": question, "answer": response}
+        except Exception as e:
+            record = {"index": index, "question": question, "error": str(e)}
+        finally:
+            ahead.forget(question)
+        record["seconds"] = round(time.perf_counter() - queued, 3)
+        return record
+
+    search_pool = ThreadPoolExecutor(max_workers=search_workers, thread_name_prefix="batch-search")
+    answer_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-answer")
+    ahead = _SearchAhead(agent.search_backend, agent.search_cache, search_pool)
+    # Copia del agente (mismo modelo, cachés y scheduler) con el buscador del
+    # lote: el original puede estar respondiendo otras preguntas a la vez
+    agent = copy.copy(agent)
+    agent.search_backend = ahead
+    in_flight = set()
+    try:
+        for index, question in questions:
+            if index in skip:
+                continue
+
+            # Limitar lo que hay en marcha para no cargar todo el lote en memoria
+            while len(in_flight) >= workers + lookahead:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield future.result()
+
+            queued = time.perf_counter()
+            ahead.prefetch(question)
+            in_flight.add(answer_pool.submit(answer, index, question, queued))
+
+        while in_flight:
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                yield future.result()
+    finally:
+        for future in in_flight:
+            future.cancel()
+        answer_pool.shutdown(wait=True)
+        search_pool.shutdown(wait=True)
+
+
+def run_batch(agent, input_path, output_path=None, resume=False, workers=2,
+              search_workers=4, lookahead=8, progress=None, timeout=None):
+    """
+    Responde todas las preguntas de un archivo y escribe los resultados en JSONL
+
+    Args:
+        agent: Un ResearchAgent
+        input_path: Archivo de preguntas (una por línea), o '-' para stdin
+        output_path: Archivo JSONL de salida (default: None, stdout)
+        resume: Saltar las preguntas que ya están en output_path
+        workers, search_workers, lookahead, timeout: Ver iter_batch()
+        progress: Función opcional que recibe cada resultado (ej: para imprimir)
+
+    Returns:
+        (respondidas, con error)
+    """
+    skip = completed_indexes(output_path) if resume and output_path else set()
+
+    if output_path:
+        out = open(output_path, "a" if resume else "w", encoding="utf-8")
+    else:
+        out = sys.stdout
+
+    answered = failed = 0
+    try:
+        # Los mensajes del agente van a stderr: stdout puede ser la salida JSONL
+        with contextlib.redirect_stdout(sys.stderr):
+            for record in iter_batch(agent, read_questions(input_path), workers,
+                                     search_workers, lookahead, skip, timeout):
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                if "error" in record:
+                    failed += 1
+                else:
+                    answered += 1
+                if progress is not None:
+                    progress(record)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    return answered, failed
@@ -0,0 +1,279 @@
+"""
+Benchmark del agente de punta a punta, sin internet ni modelos reales
+
+Arranca un Ollama falso y un buscador falso, hace preguntas con
+ResearchAgent y mide:
+  - latencia p50/p95/p99 y tiempo hasta el primer token (una a una)
+  - preguntas por segundo con varias a la vez
+  - memoria (pico de tracemalloc y máximo del proceso)
+
+Los resultados se guardan en JSON para compararlos entre versiones:
+    python benchmarks/bench.py --output antes.json
+    ... cambios ...
+    python benchmarks/bench.py --output despues.json --compare antes.json
+
+Con --compare el proceso termina con código 1 si algo empeora más
+que --threshold (por defecto un 10%).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import ResearchAgent  # noqa: E402
+from fake_ollama import FakeOllama  # noqa: E402
+from fake_search import FakeSearchBackend  # noqa: E402
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+# Métricas que se comparan: ruta en el JSON -> True si más alto es mejor
+COMPARED = {
+    "sequential.latency_ms.p50": False,
+    "sequential.latency_ms.p95": False,
+    "sequential.latency_ms.p99": False,
+    "sequential.ttft_ms.p50": False,
+    "sequential.ttft_ms.p95": False,
+    "concurrent.throughput_rps": True,
+    "concurrent.latency_ms.p95": False,
+    "memory.peak_traced_mb": False,
+}
+
+
+def percentile(values, p):
+    """Percentil p (0-100) con interpolación lineal"""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    k = (len(ordered) - 1) * p / 100
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+def summarize(seconds):
+    """Resume una lista de tiempos en segundos como milisegundos"""
+    if not seconds:
+        return {}
+    ms = [s * 1000 for s in seconds]
+    return {
+        "p50": round(percentile(ms, 50), 2),
+        "p95": round(percentile(ms, 95), 2),
+        "p99": round(percentile(ms, 99), 2),
+        "mean": round(sum(ms) / len(ms), 2),
+        "max": round(max(ms), 2),
+    }
+
+
+def is_error(answer):
+    return answer.startswith("Error al llamar a Ollama")
+
+
+def run_sequential(agent, questions):
+    """Pregunta una a una con streaming: latencia total y primer token"""
+    latencies, ttfts, errors = [], [], 0
+    for question in questions:
+        start = time.perf_counter()
+        first = None
+        parts = []
+        for text in agent.research_stream(question):
+            if first is None:
+                first = time.perf_counter() - start
+            parts.append(text)
+        latencies.append(time.perf_counter() - start)
+        if first is not None:
+            ttfts.append(first)
+        errors += is_error("".join(parts))
+    return {
+        "requests": len(questions),
+        "errors": errors,
+        "latency_ms": summarize(latencies),
+        "ttft_ms": summarize(ttfts),
+    }
+
+
+def run_concurrent(agent, questions, workers):
+    """Muchas preguntas a la vez: rendimiento y latencia bajo carga"""
+    def one(question):
+        start = time.perf_counter()
+        answer = agent.research(question)
+        return time.perf_counter() - start, is_error(answer)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(one, questions))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": len(questions),
+        "workers": workers,
+        "errors": sum(error for _, error in results),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(questions) / elapsed, 3),
+        "latency_ms": summarize([latency for latency, _ in results]),
+    }
+
+
+def run_memory(agent, questions):
+    """Memoria reservada por Python durante unas preguntas (tracemalloc)"""
+    tracemalloc.start()
+    try:
+        for question in questions:
+            agent.research(question)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    memory = {"peak_traced_mb": round(peak / 2**20, 3)}
+    if resource is not None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux da KB y macOS bytes
+        memory["max_rss_mb"] = round(rss / (2**20 if sys.platform == "darwin" else 2**10), 1)
+    return memory
+
+
+def flatten(data, prefix=""):
+    """{'a': {'b': 1}} -> {'a.b': 1}"""
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        else:
+            flat[path] = value
+    return flat
+
+
+def compare(baseline, current, threshold, metrics=COMPARED):
+    """
+    Compara dos resultados y muestra qué mejoró o empeoró
+
+    Args:
+        baseline: Resultados anteriores
+        current: Resultados de ahora
+        threshold: Empeoramiento tolerado (0.10 = un 10%)
+        metrics: Métricas que se comparan (ruta -> True si más alto es mejor)
+
+    Returns:
+        Lista de métricas que empeoraron más que `threshold`
+    """
+    old, new = flatten(baseline), flatten(current)
+    regressions = []
+    print(f"\n{'métrica':<30} {'antes':>10} {'ahora':>10} {'cambio':>9}")
+    for path, higher_is_better in metrics.items():
+        if not old.get(path) or new.get(path) is None:
+            continue
+        change = (new[path] - old[path]) / old[path]
+        worse = change < -threshold if higher_is_better else change > threshold
+        mark = "❌" if worse else "  "
+        print(f"{path:<30} {old[path]:>10} {new[path]:>10} {change:>+8.1%} {mark}")
+        if worse:
+            regressions.append(path)
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark del agente sin internet")
+    parser.add_argument("--requests", type=int, default=30, help="Preguntas por prueba")
+    parser.add_argument("--concurrency", type=int, default=8, help="Preguntas a la vez")
+    parser.add_argument("--token-rate", type=float, default=200, help="Tokens/s del modelo falso")
+    parser.add_argument("--tokens", type=int, default=64, help="Tokens por respuesta")
+    parser.add_argument("--load", type=float, default=0.5, help="Segundos de carga del modelo")
+    parser.add_argument("--parallel", type=int, default=4,
+                        help="Peticiones que el Ollama falso genera a la vez")
+    parser.add_argument("--llm-errors", type=float, default=0.0, help="Fracción de errores del modelo")
+    parser.add_argument("--search-latency", type=float, default=0.2,
+                        help="Latencia mediana de búsqueda (s)")
+    parser.add_argument("--search-jitter", type=float, default=0.5,
+                        help="Dispersión de la latencia (sigma log-normal)")
+    parser.add_argument("--search-errors", type=float, default=0.0,
+                        help="Fracción de búsquedas que fallan")
+    parser.add_argument("--no-preload", action="store_true", help="Sin precarga del modelo")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", "-o", help="Guardar los resultados en este JSON")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Empeoramiento tolerado al comparar (default: 0.10)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    questions = [f"¿Pregunta de prueba número {i}?" for i in range(args.requests)]
+
+    server = FakeOllama(
+        tokens_per_second=args.token_rate, response_tokens=args.tokens,
+        load_seconds=args.load, error_rate=args.llm_errors,
+        parallel=args.parallel, seed=args.seed
+    ).start()
+    search = FakeSearchBackend(
+        latency=args.search_latency, jitter=args.search_jitter,
+        error_rate=args.search_errors, seed=args.seed
+    )
+
+    print(f"🧪 Ollama falso en {server.host}, {args.requests} preguntas por prueba")
+    try:
+        # Los mensajes del agente no interesan aquí
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent = ResearchAgent(
+                host=server.host, search_backend=search, search_cache=False,
+                model_inventory=False, preload=not args.no_preload
+            )
+            results = {
+                "sequential": run_sequential(agent, questions),
+                "concurrent": run_concurrent(agent, questions, args.concurrency),
+                "memory": run_memory(agent, questions[:max(1, args.requests // 3)]),
+            }
+    finally:
+        server.stop()
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "config": config,
+        **results,
+    }
+
+    sequential, concurrent = results["sequential"], results["concurrent"]
+    print(f"\n⏱️  Una a una:   p50 {sequential['latency_ms']['p50']} ms | "
+          f"p95 {sequential['latency_ms']['p95']} ms | "
+          f"p99 {sequential['latency_ms']['p99']} ms")
+    print(f"⚡ Primer token: p50 {sequential['ttft_ms'].get('p50')} ms | "
+          f"p95 {sequential['ttft_ms'].get('p95')} ms")
+    print(f"🚀 {concurrent['workers']} a la vez: {concurrent['throughput_rps']} preguntas/s | "
+          f"p95 {concurrent['latency_ms']['p95']} ms")
+    print(f"💾 Memoria: pico {results['memory']['peak_traced_mb']} MB (tracemalloc)")
+    errors = sequential["errors"] + concurrent["errors"]
+    if errors:
+        print(f"⚠️  {errors} respuestas con error del modelo")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados guardados en {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold)
+        if regressions:
+            print(f"\n❌ Empeoran: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ Sin regresiones")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark de las conversaciones (session.py)
+
+Una conversación de muchos turnos contra un Ollama falso, de dos formas:
+  - reenviando toda la conversación en cada turno (/api/chat)
+  - con ChatSession, que reutiliza el `context` de Ollama
+y se cuentan los tokens que el modelo tiene que leer (prefill) y el tiempo.
+El Ollama falso no reutiliza prefijos en /api/chat, así que la primera
+forma es el peor caso (el de un servidor que ya descartó la caché KV).
+
+Ejecuta: python benchmarks/chat_session.py --turns 20
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import ResearchAgent  # noqa: E402
+from fake_ollama import FakeOllama  # noqa: E402
+
+
+def resend(agent, messages):
+    """Cada turno envía todos los mensajes anteriores"""
+    history, prefill = [], 0
+    for message in messages:
+        history.append({"role": "user", "content": message})
+        result = agent.backend.chat(agent.model, history)
+        history.append(result["message"])
+        prefill += result["prompt_eval_count"]
+    return prefill
+
+
+def session(agent, messages):
+    """Cada turno envía solo el mensaje nuevo y el context anterior"""
+    chat, prefill = agent.session(store_dir=False), 0
+    for message in messages:
+        chat.send(message)
+        prefill += chat.last_stats["prompt_eval_count"]
+    return prefill, chat.stats()["compactions"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de conversaciones")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--prefill-rate", type=float, default=2000,
+                        help="Tokens/s que lee el modelo falso")
+    parser.add_argument("--tokens", type=int, default=48, help="Tokens por respuesta")
+    parser.add_argument("--num-ctx", type=int, default=4096)
+    args = parser.parse_args()
+
+    messages = [f"Turno {i}: cuéntame algo más sobre el tema anterior, con detalle." * 2
+                for i in range(args.turns)]
+    server = FakeOllama(tokens_per_second=2000, response_tokens=args.tokens,
+                        prefill_tokens_per_second=args.prefill_rate,
+                        num_ctx=args.num_ctx).start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent = ResearchAgent(host=server.host, model_inventory=False)
+        start = time.perf_counter()
+        full = resend(agent, messages)
+        full_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        incremental, compactions = session(agent, messages)
+        session_seconds = time.perf_counter() - start
+    finally:
+        server.stop()
+
+    print(f"💬 {args.turns} turnos, prefill a {args.prefill_rate:g} tokens/s")
+    print(f"   Reenviando todo: {full:6d} tokens leídos, {full_seconds:.2f}s")
+    print(f"   ChatSession:     {incremental:6d} tokens leídos, {session_seconds:.2f}s "
+          f"({compactions} compactaciones)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark de los límites de tiempo por pregunta (deadline.py)
+
+Un Ollama falso lento (una respuesta completa tarda varios segundos) y
+un buscador que a veces se cuelga. Se mide cuánto tarda el agente en
+devolver algo con y sin timeout, cuánto texto llega antes del corte, y
+si Ollama deja de generar de verdad: con un solo hueco en el servidor,
+la siguiente pregunta solo empieza si la anterior se canceló.
+
+Ejecuta: python benchmarks/deadlines.py --timeout 2 --tokens 200
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import ResearchAgent  # noqa: E402
+from fake_ollama import FakeOllama  # noqa: E402
+from fake_search import FakeSearchBackend  # noqa: E402
+
+
+def run(args, timeout, search_latency):
+    """Varias preguntas seguidas: (segundos por pregunta, caracteres, canceladas)"""
+    server = FakeOllama(tokens_per_second=args.token_rate, response_tokens=args.tokens,
+                        parallel=1).start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent = ResearchAgent(host=server.host, model_inventory=False, preload=False,
+                                  coalesce=False, search_cache=False, timeout=timeout,
+                                  search_backend=FakeSearchBackend(search_latency, jitter=0))
+            seconds = []
+            chars = []
+            for i in range(args.questions):
+                start = time.perf_counter()
+                answer = agent.research(f"Pregunta {i}")
+                seconds.append(time.perf_counter() - start)
+                chars.append(len(answer))
+        # Dar tiempo al servidor a notar las desconexiones
+        time.sleep(0.2)
+        return seconds, chars, server.cancelled
+    finally:
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los límites de tiempo")
+    parser.add_argument("--questions", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=2.0)
+    parser.add_argument("--token-rate", type=float, default=40,
+                        help="Tokens por segundo del Ollama falso")
+    parser.add_argument("--tokens", type=int, default=200,
+                        help="Tokens de cada respuesta completa")
+    parser.add_argument("--search-latency", type=float, default=0.1)
+    parser.add_argument("--slow-search", type=float, default=5.0,
+                        help="Latencia del buscador colgado")
+    args = parser.parse_args()
+
+    print(f"Respuesta completa: {args.tokens / args.token_rate:.1f}s | "
+          f"timeout: {args.timeout:g}s | {args.questions} preguntas seguidas\n")
+    print(f"{'caso':<28} {'s/pregunta (máx)':>17} {'caracteres':>11} {'canceladas':>11}")
+    cases = [
+        ("sin timeout", None, args.search_latency),
+        ("con timeout", args.timeout, args.search_latency),
+        ("con timeout, buscador lento", args.timeout, args.slow_search),
+    ]
+    for name, timeout, latency in cases:
+        seconds, chars, cancelled = run(args, timeout, latency)
+        print(f"{name:<28} {max(seconds):>17.2f} {sum(chars) // len(chars):>11} "
+              f"{cancelled:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark de la búsqueda semántica (embeddings.py)
+
+Mide cuánto tarda una consulta por fuerza bruta (similitud de coseno con
+todos los vectores y los k mejores) en float32 y en int8, y cuánta
+memoria ocupa cada matriz. Usa vectores aleatorios: no necesita Ollama.
+
+Ejecuta: python benchmarks/embedding_search.py --vectors 1000000 --dim 768
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from bench import summarize  # noqa: E402
+from embeddings import quantize, similarities  # noqa: E402
+
+# Filas que se generan de una vez (para no crear temporales enormes)
+CHUNK_ROWS = 65536
+
+
+def random_matrix(rows, dim, int8, seed):
+    """Vectores aleatorios normalizados, como los que guarda el índice"""
+    rng = np.random.default_rng(seed)
+    matrix = np.empty((rows, dim), dtype=np.int8 if int8 else np.float32)
+    scales = np.empty(rows, dtype=np.float32) if int8 else None
+    for start in range(0, rows, CHUNK_ROWS):
+        block = rng.standard_normal((min(CHUNK_ROWS, rows - start), dim), dtype=np.float32)
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        if int8:
+            matrix[start:start + len(block)], scales[start:start + len(block)] = quantize(block)
+        else:
+            matrix[start:start + len(block)] = block
+    return matrix, scales
+
+
+def measure(matrix, scales, queries, k, seed):
+    rng = np.random.default_rng(seed + 1)
+    latencies = []
+    for _ in range(queries + 1):
+        q = rng.standard_normal(matrix.shape[1], dtype=np.float32)
+        q /= np.linalg.norm(q)
+        start = time.perf_counter()
+        scores = similarities(matrix, q, scales)
+        top = np.argpartition(scores, -k)[-k:]
+        top[np.argsort(-scores[top])]
+        latencies.append(time.perf_counter() - start)
+    # La primera consulta calienta la caché y los hilos de BLAS
+    return latencies[1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la búsqueda semántica")
+    parser.add_argument("--vectors", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"🧮 {args.vectors} vectores de {args.dim} dimensiones, "
+          f"{os.cpu_count()} CPU")
+    for int8 in (False, True):
+        matrix, scales = random_matrix(args.vectors, args.dim, int8, args.seed)
+        size = matrix.nbytes + (scales.nbytes if int8 else 0)
+        stats = summarize(measure(matrix, scales, args.queries, args.k, args.seed))
+        print(f"{'int8   ' if int8 else 'float32'} | {size / 1e6:.0f} MB | "
+              f"consulta (ms): {stats}")
+        del matrix, scales
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Servidor falso de Ollama para medir el agente sin modelos ni GPU
+
+Imita la API REST (/api/tags, /api/generate, /api/chat...) con una
+velocidad de tokens, un tiempo de carga del modelo y una tasa de
+errores configurables. Las respuestas son texto de relleno.
+
+Uso:
+    server = FakeOllama(tokens_per_second=50, load_seconds=2).start()
+    agent = ResearchAgent(host=server.host)
+    ...
+    server.stop()
+"""
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+WORDS = ("el modelo responde con texto de relleno para medir la velocidad "
+         "del agente sin depender de una GPU ni de internet").split()
+
+
+class FakeOllama:
+    """Servidor HTTP que se comporta como Ollama"""
+
+    def __init__(self, models=("fake:latest",), tokens_per_second=100,
+                 response_tokens=64, prefill_tokens_per_second=2000,
+                 load_seconds=0.0, error_rate=0.0, parallel=4, num_ctx=2048,
+                 seed=0, port=0):
+        """
+        Configura el servidor (no arranca hasta start())
+
+        Args:
+            models: Modelos "instalados"
+            tokens_per_second: Velocidad de generación de cada petición
+            response_tokens: Tokens de cada respuesta
+            prefill_tokens_per_second: Velocidad de lectura del prompt
+            load_seconds: Tiempo de carga del modelo la primera vez
+                          (o al cambiar de modelo)
+            error_rate: Fracción de peticiones que responden 500
+            parallel: Peticiones que genera a la vez (como OLLAMA_NUM_PARALLEL);
+                      el resto espera
+            num_ctx: Ventana de contexto que anuncia /api/show
+            seed: Semilla de los errores aleatorios
+            port: Puerto (default: uno libre)
+        """
+        self.models = list(models)
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.load_seconds = load_seconds
+        self.error_rate = error_rate
+        self.num_ctx = num_ctx
+        self.port = port
+
+        self.requests = 0
+        self.errors = 0
+        self.loads = 0
+        self.cancelled = 0
+        self.active = 0
+        self.loaded_model = None
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(parallel)
+        # Contextos que siguen en la caché KV (como los slots de Ollama)
+        self._kv = deque(maxlen=parallel)
+        self._server = None
+
+    @property
+    def host(self):
+        """URL del servidor, para OLLAMA_HOST o ResearchAgent(host=...)"""
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self):
+        """Arranca el servidor en un hilo y lo devuelve"""
+        fake = self
+
+        class Handler(_Handler):
+            server_state = fake
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_port
+        threading.Thread(target=self._server.serve_forever, name="fake-ollama",
+                         daemon=True).start()
+        return self
+
+    def stop(self):
+        """Para el servidor"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _should_fail(self):
+        with self._lock:
+            self.requests += 1
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+            return fail
+
+    def _ensure_loaded(self, model):
+        """Espera la carga del modelo si no es el que está en memoria"""
+        with self._load_lock:
+            if self.loaded_model == model:
+                return 0.0
+            time.sleep(self.load_seconds)
+            self.loaded_model = model
+            self.loads += 1
+            return self.load_seconds
+
+    def _cached(self, context):
+        with self._lock:
+            return bool(context) and tuple(context) in self._kv
+
+    def _remember(self, context):
+        with self._lock:
+            self._kv.append(tuple(context))
+        return context
+
+    def _tokens(self, count):
+        """Genera `count` palabras de relleno (una por token)"""
+        return [WORDS[i % len(WORDS)] + " " for i in range(count)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Sin esto cada respuesta pequeña espera ~40 ms por el algoritmo de Nagle
+    disable_nagle_algorithm = True
+    server_state = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length)) if length else {}
+
+    def do_GET(self):
+        fake = self.server_state
+        if self.path == "/api/version":
+            self._send_json({"version": "0.0.0-fake"})
+        elif self.path == "/api/tags":
+            self._send_json({"models": [
+                {"name": name, "digest": f"fake-{i}"} for i, name in enumerate(fake.models)
+            ]})
+        elif self.path == "/api/ps":
+            loaded = [fake.loaded_model] if fake.loaded_model else []
+            self._send_json({"models": [{"name": name, "model": name} for name in loaded]})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        fake = self.server_state
+        request = self._read_json()
+        if self.path == "/api/show":
+            self._send_json({"parameters": f"num_ctx {fake.num_ctx}"})
+        elif self.path == "/api/embed":
+            texts = request.get("input") or []
+            texts = [texts] if isinstance(texts, str) else texts
+            self._send_json({"embeddings": [_embedding(t) for t in texts]})
+        elif self.path in ("/api/generate", "/api/chat"):
+            self._generate(request, chat=self.path == "/api/chat")
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def _generate(self, request, chat):
+        fake = self.server_state
+        model = request.get("model")
+        if model not in fake.models:
+            return self._send_json({"error": f"model '{model}' not found"}, 404)
+        if fake._should_fail():
+            return self._send_json({"error": "fake error"}, 500)
+
+        if chat:
+            prompt = " ".join(m.get("content", "") for m in request.get("messages", []))
+        else:
+            prompt = request.get("prompt", "")
+
+        start = time.perf_counter()
+        with fake._slots:
+            load = fake._ensure_loaded(model)
+            # Sin prompt solo se carga el modelo (como Ollama)
+            if not prompt and not chat:
+                return self._send_json({"model": model, "response": "", "done": True,
+                                        "load_duration": int(load * 1e9)})
+
+            prompt_tokens = max(1, len(prompt) // 4)
+            context = request.get("context") or []
+            # Un context que sigue en la caché KV no se vuelve a leer
+            evaluated = prompt_tokens + (0 if fake._cached(context) else len(context))
+            prefill = evaluated / fake.prefill_tokens_per_second
+            time.sleep(prefill)
+            tokens = fake._tokens(fake.response_tokens)
+            stats = {
+                "prompt_eval_count": evaluated,
+                "prompt_eval_duration": int(prefill * 1e9),
+                "eval_count": len(tokens),
+                "eval_duration": int(len(tokens) / fake.tokens_per_second * 1e9),
+                "load_duration": int(load * 1e9),
+            }
+            if not chat:
+                # /api/generate devuelve el contexto para continuar la conversación
+                stats["context"] = fake._remember(
+                    context + list(range(len(context), len(context) + prompt_tokens + len(tokens)))
+                )
+
+            if not request.get("stream", True):
+                time.sleep(len(tokens) / fake.tokens_per_second)
+                stats["total_duration"] = int((time.perf_counter() - start) * 1e9)
+                return self._send_json(dict(_message(model, "".join(tokens), chat),
+                                            done=True, **stats))
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            with fake._lock:
+                fake.active += 1
+            try:
+                for token in tokens:
+                    time.sleep(1 / fake.tokens_per_second)
+                    self._write_chunk(dict(_message(model, token, chat), done=False))
+                stats["total_duration"] = int((time.perf_counter() - start) * 1e9)
+                self._write_chunk(dict(_message(model, "", chat), done=True, **stats))
+                self.wfile.write(b"0\r\n\r\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # El cliente canceló la generación
+                self.close_connection = True
+                with fake._lock:
+                    fake.cancelled += 1
+            finally:
+                with fake._lock:
+                    fake.active -= 1
+
+    def _write_chunk(self, data):
+        line = (json.dumps(data) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+
+def _message(model, text, chat):
+    """Cuerpo de una respuesta de /api/generate o /api/chat"""
+    if chat:
+        return {"model": model, "message": {"role": "assistant", "content": text}}
+    return {"model": model, "response": text}
+
+
+def _embedding(text, dim=64):
+    """Embedding de juguete: cuenta de palabras por cubetas"""
+    vector = [0.0] * dim
+    for word in text.casefold().split():
+        vector[sum(word.encode("utf-8")) % dim] += 1.0
+    return vector
+
+
+# Arranca un servidor falso para probar a mano
+if __name__ == "__main__":
+    with FakeOllama(load_seconds=1) as server:
+        print(f"🧪 Ollama falso en {server.host} (Ctrl+C para parar)")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,67 @@
+"""
+Buscador falso para medir el agente sin internet
+
+Devuelve resultados inventados tras una latencia aleatoria
+(log-normal, como las de una API web real: la mayoría rápidas y
+unas pocas muy lentas) y puede fallar una fracción de las veces.
+"""
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search import SearchBackend  # noqa: E402
+
+
+class FakeSearchBackend(SearchBackend):
+    """Buscador con latencia y errores configurables"""
+
+    name = "fake"
+
+    # Cada búsqueda debe esperar su latencia: nada de caché
+    cacheable = False
+
+    def __init__(self, latency=0.2, jitter=0.5, error_rate=0.0, body_chars=300, seed=0):
+        """
+        Args:
+            latency: Latencia mediana en segundos
+            jitter: Dispersión (sigma de la log-normal; 0 = siempre `latency`)
+            error_rate: Fracción de búsquedas que lanzan un error
+            body_chars: Longitud del resumen de cada resultado
+            seed: Semilla (las mismas opciones dan las mismas latencias)
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.body_chars = body_chars
+        self.searches = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self):
+        """Sortea la latencia y si esta búsqueda falla"""
+        with self._lock:
+            self.searches += 1
+            delay = self.latency
+            if self.jitter:
+                delay *= self._random.lognormvariate(0, self.jitter)
+            return delay, self._random.random() < self.error_rate
+
+    def search(self, query, max_results=3):
+        delay, fail = self._draw()
+        time.sleep(delay)
+        if fail:
+            raise ConnectionError("fake: búsqueda fallida")
+        words = query.split() or ["nada"]
+        body = " ".join(words[i % len(words)] for i in range(self.body_chars // 6))
+        return [
+            {
+                "title": f"Resultado {i + 1} sobre {query}",
+                "body": body[:self.body_chars],
+                "href": f"https://example.com/{i + 1}?q={'+'.join(words)}",
+            }
+            for i in range(max_results)
+        ]
@@ -0,0 +1,152 @@
+"""
+Servidor web falso para medir y probar la descarga de páginas (fetch.py)
+
+Sirve páginas HTML de relleno con una latencia configurable, además de
+redirecciones, páginas lentas, páginas enormes, gzip y contenido que no
+es HTML. Cuenta las peticiones y las conexiones abiertas.
+
+Rutas:
+    /page/<n>               Página normal
+    /slow/<segundos>/<n>    Página que tarda <segundos> en responder
+    /redirect/<k>/<n>       <k> redirecciones seguidas hasta /page/<n>
+    /gzip/<n>               Página comprimida con gzip
+    /big/<kb>               Página de <kb> KB
+    /image                  Contenido image/png
+    /missing                404
+
+Uso:
+    with FakeWeb(latency=0.05) as web:
+        fetcher.fetch_all([web.url(f"/page/{i}") for i in range(10)])
+"""
+import gzip
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+PARAGRAPH = ("Este párrafo de relleno imita el texto principal de una página web "
+             "para medir la descarga y la extracción sin depender de internet. ")
+
+
+def page_html(n, paragraphs=20):
+    """HTML de la página <n>: título, menú, script y párrafos de texto"""
+    body = "".join(f"<p>{n}. {PARAGRAPH * 3}</p>\n" for _ in range(paragraphs))
+    return (f"<html><head><title>Página {n}</title>"
+            f"<script>var menu = 'no es texto';</script></head><body>"
+            f"<nav>Inicio | Productos | Contacto | Un menú que no es texto principal</nav>"
+            f"<main>{body}</main><footer>Pie de página con enlaces</footer></body></html>")
+
+
+class FakeWeb:
+    """Servidor HTTP con páginas de relleno"""
+
+    def __init__(self, latency=0.0, paragraphs=20, port=0):
+        """
+        Configura el servidor (no arranca hasta start())
+
+        Args:
+            latency: Segundos que tarda cada respuesta
+            paragraphs: Párrafos de cada página
+            port: Puerto (default: uno libre)
+        """
+        self.latency = latency
+        self.paragraphs = paragraphs
+        self.port = port
+
+        self.requests = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def host(self):
+        """URL base del servidor"""
+        return f"http://127.0.0.1:{self.port}"
+
+    def url(self, path):
+        """URL completa de una ruta"""
+        return self.host + path
+
+    def start(self):
+        """Arranca el servidor en un hilo y lo devuelve"""
+        fake = self
+
+        class Handler(_Handler):
+            server_state = fake
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_port
+        threading.Thread(target=self._server.serve_forever, name="fake-web",
+                         daemon=True).start()
+        return self
+
+    def stop(self):
+        """Para el servidor"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count(self, attribute):
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server_state = None
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server_state._count("connections")
+
+    def _send(self, body, status=200, content_type="text/html; charset=utf-8", headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # El cliente dejó de leer (página demasiado grande)
+            self.close_connection = True
+
+    def do_GET(self):
+        fake = self.server_state
+        fake._count("requests")
+        time.sleep(fake.latency)
+        parts = self.path.strip("/").split("/")
+        route, args = parts[0], parts[1:]
+
+        if route == "page":
+            self._send(page_html(args[0], fake.paragraphs).encode("utf-8"))
+        elif route == "slow":
+            time.sleep(float(args[0]))
+            self._send(page_html(args[1], fake.paragraphs).encode("utf-8"))
+        elif route == "redirect":
+            hops = int(args[0])
+            location = f"/redirect/{hops - 1}/{args[1]}" if hops > 1 else f"/page/{args[1]}"
+            self._send(b"", 302, headers=[("Location", location)])
+        elif route == "gzip":
+            body = gzip.compress(page_html(args[0], fake.paragraphs).encode("utf-8"))
+            self._send(body, headers=[("Content-Encoding", "gzip")])
+        elif route == "big":
+            paragraphs = int(args[0]) * 1024 // (len(PARAGRAPH) * 3)
+            self._send(page_html("grande", paragraphs).encode("utf-8"))
+        elif route == "image":
+            self._send(b"\x89PNG\r\n\x1a\n" + bytes(1024), content_type="image/png")
+        else:
+            self._send(b"<html><body>No existe</body></html>", 404)
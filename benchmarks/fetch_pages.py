@@ -0,0 +1,80 @@
+"""
+Benchmark de la descarga de páginas (fetch.py)
+
+Un servidor web local con latencia configurable sirve páginas de
+relleno. Se compara descargarlas de una en una con PageFetcher
+(varias a la vez, conexiones reutilizadas) y extraer el texto en el
+mismo hilo o en un pool de procesos. Con --slow algunas páginas tardan
+más que el timeout y se ve que fetch_all no las espera.
+
+Ejecuta: python benchmarks/fetch_pages.py --pages 60 --latency 0.05
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_web import FakeWeb  # noqa: E402
+from fetch import PageFetcher  # noqa: E402
+
+
+def run(servers, urls, timeout, **kwargs):
+    """Descarga todas las URLs: (segundos, páginas descargadas, conexiones abiertas)"""
+    fetcher = PageFetcher(cache=None, **kwargs)
+    # Arrancar el pool de procesos fuera de la medida
+    fetcher._extract("<p>" + "x" * 40 + "</p>")
+    connections = sum(server.connections for server in servers)
+    start = time.perf_counter()
+    try:
+        documents = fetcher.fetch_all(urls, timeout=timeout)
+    finally:
+        elapsed = time.perf_counter() - start
+        fetcher.close()
+    return elapsed, len(documents), sum(s.connections for s in servers) - connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de descarga de páginas")
+    parser.add_argument("--pages", type=int, default=60)
+    parser.add_argument("--hosts", type=int, default=1,
+                        help="Servidores distintos (el límite por servidor es por cada uno)")
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="Segundos que tarda cada respuesta")
+    parser.add_argument("--paragraphs", type=int, default=200,
+                        help="Párrafos por página (más = más trabajo de extracción)")
+    parser.add_argument("--slow", type=int, default=0,
+                        help="Páginas que tardan más que el timeout")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    args = parser.parse_args()
+
+    servers = [FakeWeb(latency=args.latency, paragraphs=args.paragraphs).start()
+               for _ in range(args.hosts)]
+    urls = [servers[i % len(servers)].url(f"/page/{i}") for i in range(args.pages)]
+    urls += [servers[0].url(f"/slow/{args.timeout * 2}/{i}") for i in range(args.slow)]
+
+    cases = [
+        ("de una en una", dict(max_workers=1, max_per_host=1, extract_processes=0)),
+        ("a la vez, extracción en el hilo", dict(max_workers=16, max_per_host=8,
+                                                extract_processes=0)),
+        ("a la vez, extracción en procesos", dict(max_workers=16, max_per_host=8,
+                                                 extract_processes=os.cpu_count() or 2)),
+    ]
+
+    print(f"📄 {args.pages} páginas de {args.paragraphs} párrafos, "
+          f"{args.latency * 1000:.0f} ms de latencia, {args.hosts} servidor(es)")
+    if args.slow:
+        print(f"🐢 {args.slow} páginas más lentas que el timeout de {args.timeout:g} s")
+    print(f"{'caso':36} {'segundos':>9} {'páginas/s':>10} {'páginas':>8} {'conexiones':>11}")
+    try:
+        for name, kwargs in cases:
+            elapsed, pages, connections = run(servers, urls, args.timeout, **kwargs)
+            print(f"{name:36} {elapsed:9.2f} {pages / elapsed:10.1f} {pages:8} {connections:11}")
+    finally:
+        for server in servers:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Benchmark del modo interactivo (repl.py)
+
+Una sesión de preguntas con seguimiento ("¿Y sus ventajas?") contra un
+Ollama y un buscador falsos. Se compara un proceso nuevo por pregunta
+(como ejecutar run_agent.py cada vez) con el modo interactivo, sin y con
+las búsquedas precargadas mientras se lee la respuesta.
+
+Ejecuta: python benchmarks/interactive.py --search-latency 0.8 --read 2
+"""
+import argparse
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from agent import ResearchAgent  # noqa: E402
+from fake_ollama import FakeOllama  # noqa: E402
+from fake_search import FakeSearchBackend  # noqa: E402
+from repl import Repl  # noqa: E402
+
+SESSION = [
+    "¿Qué es Python?",
+    "¿Y sus ventajas?",
+    "¿Y sus desventajas?",
+    "Ejemplos de Python",
+    "¿Qué es Rust?",
+    "¿Y sus ventajas?",
+    "Alternativas a Rust",
+    "¿Y su historia?",
+]
+
+# Una pregunta en un proceso nuevo: importar, crear el agente, responder
+ONE_SHOT = """
+import sys
+sys.path.insert(0, "benchmarks")
+from agent import ResearchAgent
+from fake_search import FakeSearchBackend
+agent = ResearchAgent(search_backend=FakeSearchBackend({latency}, jitter=0), search_cache=False)
+agent.research({question!r})
+"""
+
+
+def one_shot(args, server):
+    """Segundos de cada pregunta con un proceso nuevo por pregunta"""
+    env = dict(os.environ, OLLAMA_HOST=server.host)
+    times = []
+    for question in SESSION:
+        code = ONE_SHOT.format(latency=args.search_latency, question=question)
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def interactive(args, server, prefetch):
+    """Segundos de cada pregunta en una sola sesión interactiva"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent = ResearchAgent(host=server.host, search_cache=False, model_inventory=False,
+                              search_backend=FakeSearchBackend(args.search_latency, jitter=0))
+        repl = Repl(agent, prefetch=prefetch)
+        times = []
+        for question in SESSION:
+            start = time.perf_counter()
+            repl.handle(question)
+            times.append(time.perf_counter() - start)
+            # El usuario lee la respuesta antes de la siguiente pregunta
+            time.sleep(args.read)
+    hits = repl.prefetcher.hits if repl.prefetcher is not None else 0
+    return times, hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del modo interactivo")
+    parser.add_argument("--search-latency", type=float, default=0.8)
+    parser.add_argument("--token-rate", type=float, default=200)
+    parser.add_argument("--tokens", type=int, default=64)
+    parser.add_argument("--read", type=float, default=2.0,
+                        help="Segundos que el usuario tarda en leer cada respuesta")
+    args = parser.parse_args()
+
+    server = FakeOllama(tokens_per_second=args.token_rate,
+                        response_tokens=args.tokens).start()
+    try:
+        print(f"{len(SESSION)} preguntas, búsqueda de {args.search_latency:g}s, "
+              f"respuesta de {args.tokens / args.token_rate:.2f}s\n")
+        print(f"{'modo':<32} {'media s':>8} {'máx s':>7} {'precargadas':>12}")
+        cases = [
+            ("un proceso por pregunta", lambda: (one_shot(args, server), 0)),
+            ("interactivo", lambda: interactive(args, server, prefetch=False)),
+            ("interactivo + precarga", lambda: interactive(args, server, prefetch=True)),
+        ]
+        for name, run in cases:
+            times, hits = run()
+            print(f"{name:<32} {sum(times) / len(times):>8.2f} {max(times):>7.2f} "
+                  f"{hits:>12}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
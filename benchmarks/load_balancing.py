@@ -0,0 +1,119 @@
+"""
+Benchmark del reparto entre varios servidores de Ollama (balancer.py)
+
+Arranca 1, 2, 4... Ollama falsos que generan de uno en uno, lanza
+muchas peticiones a la vez y mide las respuestas por segundo: con el
+reparto deberían crecer casi en proporción al número de servidores.
+Después para un servidor a mitad de carga para comprobar que las
+peticiones siguen saliendo y que vuelve al reparto al arrancarlo.
+
+Ejecuta: python benchmarks/load_balancing.py --nodes 1 2 4 --requests 48
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from balancer import BalancedBackend  # noqa: E402
+from bench import summarize  # noqa: E402
+from fake_ollama import FakeOllama  # noqa: E402
+
+MODEL = "fake:latest"
+
+
+def run(backend, requests, concurrency):
+    """Muchas peticiones de chat a la vez: (respuestas/s, latencias, errores)"""
+    def one(i):
+        start = time.perf_counter()
+        try:
+            backend.chat(MODEL, [{"role": "user", "content": f"Pregunta {i}"}])
+        except Exception:
+            return time.perf_counter() - start, True
+        return time.perf_counter() - start, False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    return (requests / elapsed, [seconds for seconds, _ in results],
+            sum(error for _, error in results))
+
+
+def scaling(args):
+    print(f"🧪 {args.requests} peticiones, {args.concurrency} a la vez, "
+          f"{args.token_rate:g} tokens/s por servidor\n")
+    base = None
+    for count in args.nodes:
+        servers = [
+            FakeOllama(tokens_per_second=args.token_rate, response_tokens=args.tokens,
+                       load_seconds=args.load, parallel=1).start()
+            for _ in range(count)
+        ]
+        backend = BalancedBackend([s.host for s in servers], pool_size=args.concurrency,
+                                  health_interval=0)
+        try:
+            backend.check_health()
+            rps, latencies, errors = run(backend, args.requests, args.concurrency)
+        finally:
+            backend.close()
+            for server in servers:
+                server.stop()
+        base = base or rps / count
+        spread = [s.requests for s in servers]
+        print(f"🖥️  {count} servidor(es): {rps:6.2f} resp/s "
+              f"(x{rps / base:.2f}) | p95 {summarize(latencies)['p95']} ms | "
+              f"reparto {spread}" + (f" | ⚠️  {errors} errores" if errors else ""))
+
+
+def failover(args):
+    """Para un servidor a mitad de carga y lo vuelve a arrancar"""
+    servers = [
+        FakeOllama(tokens_per_second=args.token_rate, response_tokens=args.tokens,
+                   parallel=1).start()
+        for _ in range(3)
+    ]
+    backend = BalancedBackend([s.host for s in servers], pool_size=args.concurrency,
+                              health_interval=0.2, max_failures=1, eject_seconds=60)
+    try:
+        backend.check_health()
+        servers[0].stop()
+        _, _, errors = run(backend, args.requests, args.concurrency)
+        ejected = backend.stats()[0]["ejected"]
+        print(f"\n💥 Un servidor caído: {errors} errores, apartado: {ejected}")
+
+        servers[0].start()
+        time.sleep(0.5)
+        before = servers[0].requests
+        run(backend, args.requests, args.concurrency)
+        print(f"♻️  Vuelto a arrancar: apartado: {backend.stats()[0]['ejected']}, "
+              f"{servers[0].requests - before} peticiones recibidas")
+    finally:
+        backend.close()
+        for server in servers:
+            server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del reparto entre servidores")
+    parser.add_argument("--nodes", type=int, nargs="+", default=[1, 2, 4],
+                        help="Número de servidores a probar (default: 1 2 4)")
+    parser.add_argument("--requests", type=int, default=48)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--token-rate", type=float, default=400)
+    parser.add_argument("--tokens", type=int, default=32)
+    parser.add_argument("--load", type=float, default=0.0,
+                        help="Segundos de carga del modelo en cada servidor")
+    parser.add_argument("--no-failover", action="store_true",
+                        help="No probar la caída de un servidor")
+    args = parser.parse_args()
+
+    scaling(args)
+    if not args.no_failover:
+        failover(args)
+
+
+if __name__ == "__main__":
+    main()
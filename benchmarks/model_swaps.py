@@ -0,0 +1,78 @@
+"""
+Benchmark del planificador por modelo (scheduler.py)
+
+Dos agentes con modelos distintos comparten un Ollama falso que tarda
+en cambiar de modelo. Sus peticiones llegan mezcladas; se mide el
+tiempo total, los cambios de modelo y la espera en la cola con y sin
+ModelScheduler.
+
+Ejecuta: python benchmarks/model_swaps.py --requests 24 --swap 0.5
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import ResearchAgent  # noqa: E402
+from fake_ollama import FakeOllama  # noqa: E402
+from scheduler import ModelScheduler  # noqa: E402
+
+MODELS = ("small:latest", "large:latest")
+
+
+def run(args, scheduler):
+    """Peticiones alternando modelos: (segundos, cambios de modelo)"""
+    server = FakeOllama(models=MODELS, tokens_per_second=args.token_rate,
+                        response_tokens=args.tokens, load_seconds=args.swap,
+                        parallel=1).start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            agents = [
+                ResearchAgent(model=model, host=server.host, model_inventory=False,
+                              preload=False, coalesce=False, scheduler=scheduler)
+                for model in MODELS
+            ]
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                list(executor.map(
+                    lambda i: agents[i % len(agents)].chat(f"Pregunta {i}"),
+                    range(args.requests)
+                ))
+            elapsed = time.perf_counter() - start
+        # La primera carga no es un cambio
+        return elapsed, server.loads - 1
+    finally:
+        server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del planificador por modelo")
+    parser.add_argument("--requests", type=int, default=24)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--token-rate", type=float, default=400)
+    parser.add_argument("--tokens", type=int, default=16)
+    parser.add_argument("--swap", type=float, default=0.5,
+                        help="Segundos que tarda Ollama en cambiar de modelo")
+    parser.add_argument("--max-wait", type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(f"🧪 {args.requests} peticiones mezclando {len(MODELS)} modelos, "
+          f"{args.swap}s por cambio de modelo\n")
+    elapsed, swaps = run(args, None)
+    print(f"   Sin planificador: {elapsed:5.2f}s, {swaps} cambios de modelo")
+
+    scheduler = ModelScheduler(slots=1, max_wait=args.max_wait)
+    elapsed, swaps = run(args, scheduler)
+    stats = scheduler.stats()
+    print(f"📅 Con planificador: {elapsed:5.2f}s, {swaps} cambios de modelo "
+          f"({stats['forced_swaps']} forzados por max_wait)")
+    print(f"   espera en cola: {stats['wait_seconds']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark del almacén de respuestas (answer_store.py)
+
+Llena el almacén con muchas preguntas y mide cuánto tarda en buscar
+(debería ser menos de 1 ms), cuántas variantes de redacción reconoce
+y cuántas preguntas nuevas confunde con otras.
+
+Ejecuta: python benchmarks/near_duplicates.py --entries 5000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from answer_store import AnswerStore  # noqa: E402
+from bench import summarize  # noqa: E402
+
+TOPICS = ("python java rust kubernetes docker redis postgres linux git http "
+          "criptografía blockchain compiladores memoria caché gpu redes neuronales "
+          "transformers embeddings bases datos índices consultas").split()
+
+# Variantes de redacción que deberían dar la misma respuesta
+REWRITES = (
+    lambda q: q.lower(),
+    lambda q: q.upper(),
+    lambda q: q.replace("¿", "").replace("?", ""),
+    lambda q: q.replace("é", "e").replace("á", "a").replace("í", "i"),
+    lambda q: "Explícame " + q.strip("¿?").lower(),
+    lambda q: q.replace("diferencia", "diferencias"),
+    lambda q: q.replace("¿Qué diferencia hay entre", "Compara"),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del almacén de respuestas")
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    questions = [
+        f"¿Qué diferencia hay entre {' y '.join(rnd.sample(TOPICS, 2))} en {rnd.choice(TOPICS)}?"
+        for _ in range(args.entries)
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        store = AnswerStore(os.path.join(tmp, "answers.sqlite"), max_entries=args.entries)
+        start = time.perf_counter()
+        for i, question in enumerate(questions):
+            store.put(question, "fake", f"respuesta {i}", seconds=5.0)
+        fill = time.perf_counter() - start
+
+        latencies, found = [], 0
+        for _ in range(args.lookups):
+            question = rnd.choice(REWRITES)(rnd.choice(questions))
+            start = time.perf_counter()
+            found += store.get(question, "fake") is not None
+            latencies.append(time.perf_counter() - start)
+
+        stored = set(questions)
+        wrong = 0
+        for _ in range(args.lookups):
+            # Preguntas que no están (otros temas): no deberían encontrar nada
+            question = f"¿Cómo se configura {' con '.join(rnd.sample(TOPICS, 3))}?"
+            start = time.perf_counter()
+            wrong += question not in stored and store.get(question, "fake") is not None
+            latencies.append(time.perf_counter() - start)
+        stats = store.stats()
+        store.close()
+
+    print(f"📚 {stats['entries']} respuestas guardadas en {fill:.2f}s")
+    print(f"🔎 Búsqueda (ms): {summarize(latencies)}")
+    print(f"♻️  Variantes reconocidas: {found}/{args.lookups} | "
+          f"preguntas nuevas confundidas: {wrong}/{args.lookups}")
+    print(f"⏱️  Tiempo de generación ahorrado: {stats['saved_seconds']:.0f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Reproduce una grabación de tráfico (cassette.py) y mide el agente
+
+Las preguntas grabadas llegan en el mismo orden y con los mismos huecos
+entre ellas (divididos por --speed); las búsquedas y las respuestas del
+modelo tardan lo mismo que cuando se grabaron (también divididas por
+--speed). Sin internet ni Ollama, así que sirve para comparar versiones
+del agente con el mismo tráfico:
+
+    python server.py --record trafico.jsonl.gz        (un día de uso real)
+    python benchmarks/replay.py trafico.jsonl.gz --speed 10 --output antes.json
+    ... cambios ...
+    python benchmarks/replay.py trafico.jsonl.gz --speed 10 --output despues.json \\
+        --compare antes.json
+
+Con --compare el proceso termina con código 1 si algo empeora más
+que --threshold (por defecto un 10%).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench import compare, is_error, summarize  # noqa: E402
+from cassette import replay_agent  # noqa: E402
+
+# Métricas que se comparan: ruta en el JSON -> True si más alto es mejor
+COMPARED = {
+    "throughput_rps": True,
+    "latency_ms.p50": False,
+    "latency_ms.p95": False,
+    "latency_ms.p99": False,
+    "ttft_ms.p50": False,
+    "ttft_ms.p95": False,
+}
+
+
+def replay(agent, questions, speed, concurrency):
+    """
+    Lanza las preguntas en sus instantes grabados
+
+    Returns:
+        (latencias, tiempos hasta el primer trozo, errores, segundos en total)
+    """
+    latencies, ttfts = [], []
+    errors = 0
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def one(event):
+        nonlocal errors
+        if speed:
+            # Esperar a su instante de llegada
+            delay = event["t"] / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        sent = time.perf_counter()
+        first = None
+        try:
+            if event["method"].endswith("_stream"):
+                parts = []
+                for text in getattr(agent, event["method"])(event["text"]):
+                    if first is None:
+                        first = time.perf_counter() - sent
+                    parts.append(text)
+                answer = "".join(parts)
+            else:
+                answer = getattr(agent, event["method"])(event["text"])
+        except Exception:
+            answer = None
+        seconds = time.perf_counter() - sent
+        with lock:
+            if answer is None or is_error(answer):
+                errors += 1
+                return
+            latencies.append(seconds)
+            if first is not None:
+                ttfts.append(first)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, questions))
+    return latencies, ttfts, errors, time.perf_counter() - start
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Reproduce una grabación de tráfico")
+    parser.add_argument("cassette", help="Grabación de --record (ej: trafico.jsonl.gz)")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Velocidad (default: 1, la grabada; 0 = todo sin esperas)")
+    parser.add_argument("--concurrency", type=int, default=64,
+                        help="Preguntas a la vez como máximo (default: 64)")
+    parser.add_argument("--limit", type=int, help="Reproducir solo las primeras N preguntas")
+    parser.add_argument("--strict", action="store_true",
+                        help="Contar como error lo que no esté grabado en vez de improvisar")
+    parser.add_argument("--output", "-o", help="Guardar los resultados en este JSON")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Empeoramiento tolerado al comparar (default: 0.10)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+
+    # Los mensajes del agente no interesan aquí
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent, cassette = replay_agent(args.cassette, speed=args.speed, strict=args.strict)
+    questions = cassette.questions[:args.limit]
+    if not questions:
+        print(f"❌ La grabación no tiene preguntas: {args.cassette}")
+        sys.exit(1)
+    recorded = questions[-1]["t"]
+    print(f"📼 {len(questions)} preguntas grabadas en {recorded:.1f}s, "
+          f"reproducidas a x{args.speed:g} con hasta {args.concurrency} a la vez")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        latencies, ttfts, errors, total = replay(agent, questions, args.speed,
+                                                 args.concurrency)
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "config": config,
+        "questions": len(questions),
+        "errors": errors,
+        "seconds": round(total, 3),
+        "throughput_rps": round(len(latencies) / total, 2) if total else None,
+        "latency_ms": summarize(latencies),
+        "ttft_ms": summarize(ttfts),
+        "cassette": cassette.stats(),
+    }
+
+    latency = report["latency_ms"]
+    print(f"\n⏱️  Latencia: p50 {latency.get('p50')} ms | p95 {latency.get('p95')} ms | "
+          f"p99 {latency.get('p99')} ms")
+    if ttfts:
+        print(f"⚡ Primer token: p50 {report['ttft_ms']['p50']} ms | "
+              f"p95 {report['ttft_ms']['p95']} ms")
+    print(f"🚀 {report['throughput_rps']} preguntas/s ({total:.1f}s en total)")
+    stats = report["cassette"]
+    print(f"📼 {stats['hits']} llamadas grabadas, {stats['misses']} improvisadas")
+    if errors:
+        print(f"⚠️  {errors} preguntas con error")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados guardados en {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, report, args.threshold, COMPARED)
+        if regressions:
+            print(f"\n❌ Empeoran: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ Sin regresiones")
+
+
+if __name__ == "__main__":
+    main()
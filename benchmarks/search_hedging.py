@@ -0,0 +1,102 @@
+"""
+Benchmark de la búsqueda con varios buscadores (resilient_search.py)
+
+Buscadores falsos con latencia de cola larga (log-normal: casi todas
+rápidas, unas pocas muy lentas) y errores. Se compara un solo buscador
+con ResilientSearchBackend sin y con hedging, y qué pasa cuando el
+buscador principal se cae del todo.
+
+Ejecuta: python benchmarks/search_hedging.py --queries 300 --jitter 1.0
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_search import FakeSearchBackend  # noqa: E402
+from resilient_search import ResilientSearchBackend  # noqa: E402
+
+
+def make_backends(args, outage=False):
+    backends = []
+    for i in range(args.backends):
+        error_rate = 1.0 if outage and i == 0 else args.error_rate
+        backend = FakeSearchBackend(latency=args.latency, jitter=args.jitter,
+                                    error_rate=error_rate, seed=i)
+        backend.name = f"fake{i}"
+        backends.append(backend)
+    return backends
+
+
+def run(args, backend):
+    """Todas las búsquedas: (latencias ordenadas, errores, búsquedas hechas)"""
+    def one(i):
+        start = time.perf_counter()
+        try:
+            backend.search(f"consulta {i}")
+        except Exception:
+            return None
+        return time.perf_counter() - start
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            results = list(executor.map(one, range(args.queries)))
+    latencies = sorted(r for r in results if r is not None)
+    return latencies, results.count(None)
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(len(values) * q))] if values else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de búsqueda con hedging")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--backends", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="Latencia mediana de cada buscador")
+    parser.add_argument("--jitter", type=float, default=1.0,
+                        help="Dispersión de la latencia (más = cola más larga)")
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    args = parser.parse_args()
+
+    def resilient(hedge, outage=False):
+        return ResilientSearchBackend(make_backends(args, outage), hedge=hedge,
+                                      backoff=args.latency, min_samples=10,
+                                      hedge_delay=args.latency * 4, workers=16, seed=0)
+
+    cases = [
+        ("un buscador", lambda: make_backends(args)[0]),
+        ("varios, sin hedging", lambda: resilient(False)),
+        ("varios, con hedging", lambda: resilient(True)),
+        ("principal caído, uno solo", lambda: make_backends(args, outage=True)[0]),
+        ("principal caído, varios", lambda: resilient(True, outage=True)),
+    ]
+
+    print(f"{args.queries} búsquedas ({args.concurrency} a la vez), latencia mediana "
+          f"{args.latency * 1000:.0f} ms, {args.error_rate:.0%} de errores\n")
+    print(f"{'caso':<27} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'máx ms':>8} "
+          f"{'errores':>8} {'llamadas':>9}")
+    for name, make in cases:
+        backend = make()
+        latencies, errors = run(args, backend)
+        if isinstance(backend, ResilientSearchBackend):
+            calls = sum(p["calls"] for p in backend.stats())
+            backend.close()
+        else:
+            calls = backend.searches
+        print(f"{name:<27} {percentile(latencies, 0.5) * 1000:>8.1f} "
+              f"{percentile(latencies, 0.95) * 1000:>8.1f} "
+              f"{percentile(latencies, 0.99) * 1000:>8.1f} "
+              f"{(latencies[-1] if latencies else float('nan')) * 1000:>8.1f} "
+              f"{errors:>8} {calls / args.queries:>8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
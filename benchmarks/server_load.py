@@ -0,0 +1,88 @@
+"""
+Prueba de carga del servidor (server.py) contra Ollama y buscador falsos
+
+Lanza muchas peticiones a la vez y cuenta cuántas se atienden (200),
+cuántas se rechazan por cola llena (429) o por esperar demasiado (503),
+y la latencia de las atendidas.
+
+Ejecuta: python benchmarks/server_load.py --clients 40 --workers 2 --queue 8
+"""
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import ResearchAgent  # noqa: E402
+from bench import summarize  # noqa: E402
+from fake_ollama import FakeOllama  # noqa: E402
+from fake_search import FakeSearchBackend  # noqa: E402
+from server import ResearchServer  # noqa: E402
+
+
+def request(port, path, payload):
+    """Hace una petición y devuelve (código HTTP, segundos)"""
+    start = time.perf_counter()
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    try:
+        conn.request("POST", path, json.dumps(payload), {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        response.read()
+        return response.status, time.perf_counter() - start
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del servidor")
+    parser.add_argument("--clients", type=int, default=40, help="Peticiones simultáneas")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue", type=int, default=8)
+    parser.add_argument("--queue-timeout", type=float, default=5)
+    parser.add_argument("--token-rate", type=float, default=100)
+    parser.add_argument("--tokens", type=int, default=32)
+    parser.add_argument("--stream", action="store_true", help="Pedir respuestas en streaming")
+    args = parser.parse_args()
+
+    ollama = FakeOllama(tokens_per_second=args.token_rate, response_tokens=args.tokens,
+                        parallel=args.workers).start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent = ResearchAgent(host=ollama.host, search_backend=FakeSearchBackend(latency=0.1),
+                              search_cache=False, model_inventory=False)
+    server = ResearchServer(agent, port=0, workers=args.workers, queue_size=args.queue,
+                            queue_timeout=args.queue_timeout).start()
+    port = server.server_address[1]
+
+    payload = {"question": "¿Qué es Python?", "stream": args.stream}
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            with ThreadPoolExecutor(max_workers=args.clients) as executor:
+                results = list(executor.map(
+                    lambda _: request(port, "/research", payload), range(args.clients)
+                ))
+    finally:
+        server.stop()
+        ollama.stop()
+    elapsed = time.perf_counter() - start
+
+    codes = Counter(status for status, _ in results)
+    served = [seconds for status, seconds in results if status == 200]
+    rejected = [seconds for status, seconds in results if status != 200]
+    print(f"📨 {args.clients} peticiones en {elapsed:.2f}s "
+          f"({args.workers} a la vez, cola de {args.queue})")
+    print(f"   códigos: {dict(sorted(codes.items()))}")
+    print(f"   atendidas: {summarize(served)}")
+    if rejected:
+        print(f"   rechazadas (ms): {summarize(rejected)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Mide cuánto tarda en arrancar el agente
+
+Cada medida es un proceso nuevo de Python, como una ejecución de
+run_agent.py: importar los módulos, preguntar a Ollama por los modelos
+y crear el ResearchAgent. Necesita Ollama corriendo ($OLLAMA_HOST).
+
+Ejecuta: python benchmarks/startup.py [--runs 10] [--model gemma3:4b]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(code, runs, env, before=None):
+    """
+    Ejecuta `code` en procesos nuevos y devuelve los tiempos en ms
+
+    Args:
+        code: Código Python a ejecutar
+        runs: Cuántas veces
+        env: Variables de entorno del proceso
+        before: Función a llamar antes de cada ejecución (ej: vaciar cachés)
+    """
+    times = []
+    for _ in range(runs):
+        if before:
+            before()
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, check=True,
+                       stdout=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiempo de arranque del agente")
+    parser.add_argument("--runs", type=int, default=10, help="Medidas por caso")
+    parser.add_argument("--model", help="Modelo a usar (default: auto-detectar)")
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp(prefix="deepagents-startup-")
+    inventory = os.path.join(cache_dir, "models.json")
+    env = dict(os.environ, DEEPAGENTS_CACHE_DIR=cache_dir)
+
+    def forget_models():
+        if os.path.exists(inventory):
+            os.remove(inventory)
+
+    create = f"from agent import ResearchAgent; ResearchAgent(model={args.model!r})"
+    cases = [
+        ("python vacío", "pass", None),
+        ("import agent", "import agent", None),
+        ("ResearchAgent() en frío", create, forget_models),
+        ("ResearchAgent() con la lista de modelos guardada", create, None),
+    ]
+
+    print(f"{'caso':<50} {'mediana':>9} {'mín':>9}")
+    for name, code, before in cases:
+        times = measure(code, args.runs, env, before)
+        print(f"{name:<50} {statistics.median(times):>7.1f}ms {min(times):>7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,495 @@
+"""
+Cachés en disco para el agente (búsquedas y respuestas del modelo)
+Guardan resultados en SQLite para que sobrevivan entre ejecuciones
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def default_cache_dir():
+    """Carpeta de caché (default: ~/.cache/deepagents, o $DEEPAGENTS_CACHE_DIR)"""
+    path = os.environ.get("DEEPAGENTS_CACHE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".cache", "deepagents"
+    )
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def normalize_query(query):
+    """Normaliza una búsqueda: minúsculas y espacios colapsados"""
+    return " ".join(query.casefold().split())
+
+
+class SearchCache:
+    """Caché de resultados de búsqueda con TTL y expulsión LRU"""
+
+    table = "search_cache"
+    filename = "search.sqlite"
+
+    def __init__(self, path=None, ttl=3600, max_entries=10000, memory_entries=256):
+        """
+        Inicializa la caché
+
+        Args:
+            path: Archivo SQLite (default: <carpeta de caché>/search.sqlite)
+            ttl: Segundos que vale cada entrada (default: 1 hora)
+            max_entries: Máximo de entradas en disco antes de expulsar las
+                         menos usadas
+            memory_entries: Entradas que se mantienen también en memoria
+        """
+        self.path = path or os.path.join(default_cache_dir(), self.filename)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        t = self.table
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {t} ("
+            " key TEXT PRIMARY KEY,"
+            " results TEXT NOT NULL,"
+            " expires REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS {t}_accessed ON {t} (accessed)")
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS {t}_expires ON {t} (expires)")
+        self._db.commit()
+
+    def _key(self, query, max_results):
+        return f"{max_results}:{normalize_query(query)}"
+
+    def _remember(self, key, results, expires):
+        """Guarda una entrada en la capa de memoria"""
+        self._memory[key] = (results, expires)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, query, max_results):
+        """
+        Busca unos resultados en la caché
+
+        Returns:
+            La lista de resultados, o None si no está o ha caducado
+        """
+        key = self._key(query, max_results)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[1] > now:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            row = self._db.execute(
+                f"SELECT results, expires FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] <= now:
+                self._memory.pop(key, None)
+                self.misses += 1
+                return None
+
+            self._db.execute(
+                f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._db.commit()
+            results = json.loads(row[0])
+            self._remember(key, results, row[1])
+            self.hits += 1
+            return results
+
+    def set(self, query, max_results, results, ttl=None):
+        """
+        Guarda unos resultados en la caché
+
+        Args:
+            query: La búsqueda
+            max_results: Cuántos resultados se pidieron
+            results: Lista de resultados (diccionarios serializables a JSON)
+            ttl: Segundos que vale esta entrada (default: el de la caché)
+        """
+        key = self._key(query, max_results)
+        now = time.time()
+        expires = now + (self.ttl if ttl is None else ttl)
+
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, results, expires, accessed)"
+                " VALUES (?, ?, ?, ?)",
+                (key, json.dumps(results), expires, now)
+            )
+            self._evict(now)
+            self._db.commit()
+            self._remember(key, results, expires)
+
+    def _evict(self, now):
+        """Borra las entradas caducadas y, si sobran, las menos usadas"""
+        self._db.execute(f"DELETE FROM {self.table} WHERE expires <= ?", (now,))
+        count = self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        if count > self.max_entries:
+            # Los aciertos en memoria no tocan el disco: pasar ahora su orden de uso
+            # (las entradas en memoria son las más recientes, la última la que más)
+            keys = list(self._memory)
+            self._db.executemany(
+                f"UPDATE {self.table} SET accessed = ? WHERE key = ?",
+                [(now - (len(keys) - i) * 1e-6, key) for i, key in enumerate(keys)]
+            )
+            self._db.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f" SELECT key FROM {self.table} ORDER BY accessed LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def items(self):
+        """Devuelve (clave, valor) de todas las entradas vigentes"""
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT key, results FROM {self.table} WHERE expires > ?", (time.time(),)
+            ).fetchall()
+        return [(key, json.loads(value)) for key, value in rows]
+
+    def stats(self):
+        """Devuelve los contadores de aciertos y fallos"""
+        with self._lock:
+            entries = self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def clear(self):
+        """Vacía la caché"""
+        with self._lock:
+            self._memory.clear()
+            self._db.execute(f"DELETE FROM {self.table}")
+            self._db.commit()
+
+    def close(self):
+        """Cierra la base de datos"""
+        with self._lock:
+            self._db.close()
+
+
+class DocumentCache(SearchCache):
+    """Caché de páginas web ya descargadas y convertidas a texto"""
+
+    table = "documents"
+    filename = "documents.sqlite"
+
+    def __init__(self, path=None, ttl=24 * 3600, max_entries=2000, memory_entries=64):
+        """
+        Inicializa la caché
+
+        Args:
+            path: Archivo SQLite (default: <carpeta de caché>/documents.sqlite)
+            ttl: Segundos que vale cada página (default: 1 día)
+            max_entries: Máximo de páginas en disco
+            memory_entries: Páginas que se mantienen también en memoria
+        """
+        super().__init__(path, ttl, max_entries, memory_entries)
+
+    def _key(self, url, _=None):
+        # Las URLs distinguen mayúsculas en la ruta: no se normalizan aquí
+        return url
+
+    def get(self, url):
+        """Devuelve el documento guardado para una URL, o None"""
+        return super().get(url, None)
+
+    def set(self, url, document, ttl=None):
+        """Guarda el documento de una URL"""
+        super().set(url, None, document, ttl)
+
+
+def response_key(model, digest, options, prompt):
+    """
+    Calcula la clave de una respuesta del modelo
+
+    Es un hash de todo lo que influye en la respuesta: el modelo,
+    su digest (cambia si se actualiza), las opciones y el prompt completo.
+    """
+    payload = json.dumps(
+        {"model": model, "digest": digest, "options": options or {}, "prompt": prompt},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Caché de respuestas del modelo en memoria y en disco"""
+
+    def __init__(self, path=None, max_bytes=64 * 1024 * 1024, memory_bytes=8 * 1024 * 1024,
+                 max_age=7 * 24 * 3600, digest_ttl=60):
+        """
+        Inicializa la caché
+
+        Args:
+            path: Archivo SQLite (default: <carpeta de caché>/responses.sqlite)
+            max_bytes: Tamaño máximo de las respuestas guardadas en disco
+            memory_bytes: Tamaño máximo de las respuestas guardadas en memoria
+            max_age: Segundos que vale cada respuesta (default: 7 días)
+            digest_ttl: Segundos que se reutiliza el digest consultado a Ollama
+        """
+        self.path = path or os.path.join(default_cache_dir(), "responses.sqlite")
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.max_age = max_age
+        self.digest_ttl = digest_ttl
+        self.hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._digests = {}
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " model TEXT NOT NULL,"
+            " digest TEXT,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS responses_created ON responses (created)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS model_digests (model TEXT PRIMARY KEY, digest TEXT)"
+        )
+        self._db.commit()
+
+    def model_digest(self, backend, model):
+        """
+        Devuelve el digest del modelo, consultándolo como mucho cada digest_ttl
+
+        Si el digest cambió desde la última vez (el modelo se actualizó),
+        se borran las respuestas guardadas con el digest anterior.
+        """
+        now = time.time()
+        with self._lock:
+            known = self._digests.get(model)
+            if known is not None and known[1] > now:
+                return known[0]
+
+        try:
+            digest = backend.model_digest(model)
+        except Exception:
+            digest = None
+
+        with self._lock:
+            self._digests[model] = (digest, now + self.digest_ttl)
+            if digest is not None:
+                self._invalidate_if_changed(model, digest)
+        return digest
+
+    def _invalidate_if_changed(self, model, digest):
+        """Borra las respuestas de un modelo si su digest cambió"""
+        row = self._db.execute(
+            "SELECT digest FROM model_digests WHERE model = ?", (model,)
+        ).fetchone()
+        if row is not None and row[0] == digest:
+            return
+
+        self._db.execute(
+            "DELETE FROM responses WHERE model = ? AND digest IS NOT ?", (model, digest)
+        )
+        self._db.execute(
+            "INSERT OR REPLACE INTO model_digests (model, digest) VALUES (?, ?)",
+            (model, digest)
+        )
+        self._db.commit()
+        for key in [k for k, v in self._memory.items() if v[0] == model and v[1] != digest]:
+            self._forget(key)
+
+    def _forget(self, key):
+        """Quita una entrada de la capa de memoria"""
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_size -= entry[4]
+
+    def _remember(self, key, model, digest, value, size, created):
+        """Guarda una entrada en la capa de memoria"""
+        self._forget(key)
+        if size > self.memory_bytes:
+            return
+        self._memory[key] = (model, digest, value, created, size)
+        self._memory_size += size
+        while self._memory_size > self.memory_bytes:
+            _, entry = self._memory.popitem(last=False)
+            self._memory_size -= entry[4]
+
+    def get(self, key):
+        """
+        Busca una respuesta en la caché
+
+        Returns:
+            Diccionario con 'response' y las estadísticas originales,
+            o None si no está o ha caducado
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[3] + self.max_age > now:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+
+            row = self._db.execute(
+                "SELECT model, digest, value, size, created FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None or row[4] + self.max_age <= now:
+                self._forget(key)
+                self.misses += 1
+                return None
+
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            value = json.loads(row[2])
+            self._remember(key, row[0], row[1], value, row[3], row[4])
+            self.hits += 1
+            return value
+
+    def set(self, key, model, digest, value):
+        """
+        Guarda una respuesta en la caché
+
+        Args:
+            key: Clave de response_key()
+            model: Nombre del modelo
+            digest: Digest del modelo (o None si no se conoce)
+            value: Diccionario con 'response' y las estadísticas
+        """
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        now = time.time()
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses"
+                " (key, model, digest, value, size, created, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, digest, data, size, now, now)
+            )
+            self._evict(now)
+            self._db.commit()
+            self._remember(key, model, digest, value, size, now)
+
+    def _evict(self, now):
+        """Borra las respuestas caducadas y, si sobra espacio, las menos usadas"""
+        self._db.execute("DELETE FROM responses WHERE created <= ?", (now - self.max_age,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Como en SearchCache: pasar al disco el orden de uso de la capa de memoria
+        keys = list(self._memory)
+        self._db.executemany(
+            "UPDATE responses SET accessed = ? WHERE key = ?",
+            [(now - (len(keys) - i) * 1e-6, key) for i, key in enumerate(keys)]
+        )
+        excess = total - self.max_bytes
+        doomed = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self._db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def stats(self):
+        """Devuelve los contadores de aciertos y fallos"""
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+    def clear(self):
+        """Vacía la caché"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def close(self):
+        """Cierra la base de datos"""
+        with self._lock:
+            self._db.close()
+
+
+class ModelInventory:
+    """
+    Lista de modelos instalados guardada unos segundos en disco
+
+    Así crear el agente no pregunta a Ollama cada vez (en la línea de
+    comandos cada ejecución empieza de cero). Es un JSON pequeño, sin SQLite.
+    """
+
+    def __init__(self, path=None, ttl=30):
+        """
+        Inicializa la caché
+
+        Args:
+            path: Archivo JSON (default: <carpeta de caché>/models.json)
+            ttl: Segundos que vale la lista (default: 30)
+        """
+        self.path = path or os.path.join(default_cache_dir(), "models.json")
+        self.ttl = ttl
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, key):
+        """
+        Devuelve la lista de modelos guardada para un servidor
+
+        Args:
+            key: Identifica el servidor (ej: su URL)
+
+        Returns:
+            Lista de modelos, o None si no hay o caducó
+        """
+        entry = self._read().get(key)
+        if not entry or time.time() - entry["time"] > self.ttl:
+            return None
+        return entry["models"]
+
+    def set(self, key, models):
+        """Guarda la lista de modelos de un servidor"""
+        data = self._read()
+        data[key] = {"time": time.time(), "models": list(models)}
+        # Escribir a un temporal y renombrar: nunca queda un JSON a medias
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def clear(self):
+        """Olvida todas las listas guardadas"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
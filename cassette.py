@@ -0,0 +1,420 @@
+"""
+Grabar y reproducir búsquedas y llamadas al modelo (cassettes)
+Una grabación guarda las preguntas que llegan, los resultados de cada
+búsqueda y cada respuesta del modelo con sus tiempos (incluido cuándo
+llegó cada trozo del streaming) en un JSONL comprimido con gzip. Al
+reproducirla, el agente funciona sin internet ni Ollama, con los mismos
+resultados y la misma cadencia, a velocidad real o acelerada: sirve para
+repetir un día de tráfico y comparar versiones
+
+Uso:
+    recorder = record(agent, "trafico.jsonl.gz")   # o server.py --record
+    ...
+    recorder.close()
+
+    agent, cassette = replay_agent("trafico.jsonl.gz", speed=10)
+
+No se graban el 'context' de Ollama (las respuestas no lo traen al
+reproducir) ni los embeddings, ni las búsquedas que salen de la caché.
+"""
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import defaultdict, deque
+
+from deadline import DeadlineExceeded, remaining
+from search import DuckDuckGoBackend, SearchBackend
+
+
+class CassetteMiss(LookupError):
+    """La grabación no tiene la búsqueda o la llamada pedida"""
+
+
+def _normalize(query):
+    """La búsqueda sin mayúsculas ni espacios de más (para encontrarla al reproducir)"""
+    return " ".join(query.casefold().split())
+
+
+def request_key(model, payload, options=None):
+    """Clave de una llamada al modelo (el prompt o los mensajes y las opciones)"""
+    data = json.dumps([model, payload, options or {}], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()[:16]
+
+
+class CassetteWriter:
+    """Escribe una grabación (una línea JSON por evento, con gzip)"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Archivo de salida (ej: trafico.jsonl.gz)
+        """
+        self.path = path
+        self.events = 0
+        self._start = time.monotonic()
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+
+    def write(self, kind, **fields):
+        """Guarda un evento con el instante (segundos desde el principio)"""
+        fields = {"kind": kind, "t": round(time.monotonic() - self._start, 3), **fields}
+        line = json.dumps(fields, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line + "\n")
+                self.events += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class Cassette:
+    """Una grabación cargada en memoria para reproducirla"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Archivo grabado con CassetteWriter
+        """
+        self.path = path
+        self.questions = []
+        self.models = []
+        self._searches = defaultdict(deque)
+        self._calls = defaultdict(deque)
+        # Para cuando falta algo: las grabaciones en orden, en rueda
+        self._all_searches = []
+        self._all_calls = defaultdict(list)
+        self._next = defaultdict(int)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                event = json.loads(line)
+                kind = event["kind"]
+                if kind == "question":
+                    self.questions.append(event)
+                elif kind == "search":
+                    key = (_normalize(event["query"]), event["max_results"])
+                    self._searches[key].append(event)
+                    self._all_searches.append(event)
+                elif kind == "llm":
+                    self._calls[event["key"]].append(event)
+                    self._all_calls[event["model"]].append(event)
+                    if event["model"] not in self.models:
+                        self.models.append(event["model"])
+
+    def _take(self, exact, everything, turn, strict, what):
+        """La grabación exacta (la siguiente si se repitió) o, si falta, otra en orden"""
+        with self._lock:
+            if exact:
+                # La última se queda para más repeticiones
+                event = exact.popleft() if len(exact) > 1 else exact[0]
+                self.hits += 1
+                return event
+            if strict or not everything:
+                raise CassetteMiss(f"La grabación no tiene: {what}")
+            self.misses += 1
+            position = self._next[turn]
+            self._next[turn] = position + 1
+            return everything[position % len(everything)]
+
+    def search(self, query, max_results, strict=False):
+        """Resultados grabados de una búsqueda"""
+        key = (_normalize(query), max_results)
+        return self._take(self._searches.get(key), self._all_searches, "search", strict,
+                          f"búsqueda {query!r}")
+
+    def call(self, model, key, strict=False):
+        """Llamada al modelo grabada"""
+        return self._take(self._calls.get(key), self._all_calls.get(model), ("llm", model),
+                          strict, f"llamada a {model} ({key})")
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "questions": len(self.questions)}
+
+
+# --- Grabar ---
+
+class RecordingSearchBackend(SearchBackend):
+    """Buscador que guarda cada búsqueda y su duración"""
+
+    name = "recording"
+
+    def __init__(self, backend, writer):
+        self.backend = backend
+        self.writer = writer
+        self.name = backend.name
+        # Las búsquedas repetidas también se graban: al reproducir no hay caché
+        self.cacheable = False
+
+    def __getattr__(self, name):
+        # stats, close...: los del buscador real
+        return getattr(self.backend, name)
+
+    def search(self, query, max_results=3):
+        start = time.perf_counter()
+        results = self.backend.search(query, max_results)
+        self.writer.write("search", query=query, max_results=max_results,
+                          seconds=round(time.perf_counter() - start, 4), results=results)
+        return results
+
+
+def _without_context(result):
+    """La respuesta sin 'context' (miles de números que no hacen falta para medir)"""
+    return {k: v for k, v in result.items() if k != "context"}
+
+
+class RecordingLLM:
+    """Backend de LLM que guarda cada llamada, su duración y la de cada trozo"""
+
+    def __init__(self, backend, writer):
+        self.backend = backend
+        self.writer = writer
+        # OllamaCLIClient (`ollama run`) no tiene host
+        self.host = getattr(backend, "host", "cli")
+
+    def __getattr__(self, name):
+        # list_models, show, load, stats...: sin grabar
+        return getattr(self.backend, name)
+
+    def _record(self, model, key, seconds, result, chunks=None):
+        fields = {"model": model, "key": key, "seconds": round(seconds, 4),
+                  "result": _without_context(result)}
+        if chunks is not None:
+            fields["chunks"] = chunks
+        self.writer.write("llm", **fields)
+
+    def generate(self, model, prompt, options=None, **extra):
+        start = time.perf_counter()
+        result = self.backend.generate(model, prompt, options, **extra)
+        self._record(model, request_key(model, prompt, options),
+                     time.perf_counter() - start, result)
+        return result
+
+    def chat(self, model, messages, options=None, **extra):
+        start = time.perf_counter()
+        result = self.backend.chat(model, messages, options, **extra)
+        self._record(model, request_key(model, messages, options),
+                     time.perf_counter() - start, result)
+        return result
+
+    def _stream(self, model, key, stream):
+        """Pasa los trozos y guarda [ms desde el anterior, texto] de cada uno"""
+        start = last = time.perf_counter()
+        chunks = []
+        try:
+            for chunk in stream:
+                now = time.perf_counter()
+                message = chunk.get("message") or {}
+                text = chunk.get("response", message.get("content", ""))
+                chunks.append([round((now - last) * 1000, 1), text])
+                last = now
+                if chunk.get("done"):
+                    self._record(model, key, now - start, chunk, chunks)
+                yield chunk
+        finally:
+            stream.close()
+
+    def generate_stream(self, model, prompt, options=None, **extra):
+        return self._stream(model, request_key(model, prompt, options),
+                            self.backend.generate_stream(model, prompt, options, **extra))
+
+    def chat_stream(self, model, messages, options=None, **extra):
+        return self._stream(model, request_key(model, messages, options),
+                            self.backend.chat_stream(model, messages, options, **extra))
+
+
+def record(agent, path):
+    """
+    Empieza a grabar todo lo que hace un agente
+
+    Args:
+        agent: ResearchAgent (se le cambian el buscador y el backend)
+        path: Archivo de la grabación (ej: trafico.jsonl.gz)
+
+    Returns:
+        El CassetteWriter; ciérralo (close()) al terminar
+    """
+    writer = CassetteWriter(path)
+    agent.search_backend = RecordingSearchBackend(
+        agent.search_backend or DuckDuckGoBackend(), writer
+    )
+    agent.backend = RecordingLLM(agent.backend, writer)
+
+    # Las preguntas y cuándo llegan (para repetir el mismo ritmo). El modo
+    # lote (batch.py) también pasa por agent.research()
+    for method in ("research", "research_stream", "chat", "chat_stream"):
+        original = getattr(agent, method)
+
+        def recorded(text, timeout=None, _method=method, _original=original):
+            writer.write("question", method=_method, text=text)
+            return _original(text, timeout)
+
+        setattr(agent, method, recorded)
+    return writer
+
+
+# --- Reproducir ---
+
+def _sleep(seconds, deadline=None):
+    """Espera como la llamada original (o hasta el deadline, si llega antes)"""
+    left = remaining(deadline)
+    if left is not None and left < seconds:
+        time.sleep(left)
+        raise DeadlineExceeded("⏱️  Se acabó el tiempo esperando a Ollama")
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+class ReplaySearchBackend(SearchBackend):
+    """Buscador que devuelve los resultados grabados, con su latencia"""
+
+    name = "replay"
+    cacheable = False
+
+    def __init__(self, cassette, speed=1.0, strict=False):
+        """
+        Args:
+            cassette: Cassette cargado
+            speed: Velocidad (2 = la mitad de espera; 0 = sin esperas)
+            strict: Fallar si una búsqueda no está grabada; si no, se usa
+                    otra grabación en orden (mismos tiempos, otros resultados)
+        """
+        self.cassette = cassette
+        self.speed = speed
+        self.strict = strict
+
+    def search(self, query, max_results=3):
+        event = self.cassette.search(query, max_results, self.strict)
+        if self.speed:
+            _sleep(event["seconds"] / self.speed)
+        return event["results"][:max_results]
+
+
+class ReplayLLM:
+    """
+    Backend de LLM que responde con las llamadas grabadas
+
+    Misma interfaz que OllamaHTTPClient. Los streams respetan la cadencia
+    grabada de los trozos; si se pide en streaming una llamada grabada sin
+    streaming (o al revés) se usan sus tiempos totales.
+    """
+
+    def __init__(self, cassette, speed=1.0, strict=False):
+        """
+        Args:
+            cassette: Cassette cargado
+            speed: Velocidad (2 = la mitad de espera; 0 = sin esperas)
+            strict: Fallar si una llamada no está grabada; si no, se usa
+                    otra del mismo modelo en orden
+        """
+        self.cassette = cassette
+        self.speed = speed
+        self.strict = strict
+        self.host = f"cassette://{cassette.path}"
+
+    def _wait(self, seconds, deadline=None):
+        if self.speed:
+            _sleep(seconds / self.speed, deadline)
+
+    def is_available(self):
+        return True
+
+    def list_models(self):
+        return list(self.cassette.models)
+
+    def model_digest(self, model):
+        return f"cassette:{model}"
+
+    def show(self, model):
+        return {}
+
+    def load(self, model, keep_alive=None):
+        return {"model": model, "done": True}
+
+    def _result(self, model, key, deadline):
+        event = self.cassette.call(model, key, self.strict)
+        self._wait(event["seconds"], deadline)
+        result = dict(event["result"])
+        if "chunks" in event:
+            # Grabada en streaming: el texto está repartido en los trozos
+            text = "".join(text for _, text in event["chunks"])
+            if "message" in result:
+                result["message"] = dict(result["message"], content=text)
+            else:
+                result["response"] = text
+        return result
+
+    def generate(self, model, prompt, options=None, deadline=None, **extra):
+        return self._result(model, request_key(model, prompt, options), deadline)
+
+    def chat(self, model, messages, options=None, deadline=None, **extra):
+        return self._result(model, request_key(model, messages, options), deadline)
+
+    def _stream(self, model, key, chat, deadline):
+        event = self.cassette.call(model, key, self.strict)
+        result = event["result"]
+        chunks = event.get("chunks")
+        if chunks is None:
+            # Grabada sin streaming: todo el texto de golpe y luego el final
+            text = (result.get("message") or {}).get("content", result.get("response", ""))
+            chunks = [[event["seconds"] * 1000, text], [0, ""]]
+        # El último trozo grabado es el final (con las estadísticas)
+        for delay, text in chunks[:-1]:
+            self._wait(delay / 1000, deadline)
+            if chat:
+                yield {"model": model, "message": {"role": "assistant", "content": text},
+                       "done": False}
+            else:
+                yield {"model": model, "response": text, "done": False}
+        self._wait(chunks[-1][0] / 1000, deadline)
+        yield dict(result)
+
+    def generate_stream(self, model, prompt, options=None, deadline=None, **extra):
+        return self._stream(model, request_key(model, prompt, options), False, deadline)
+
+    def chat_stream(self, model, messages, options=None, deadline=None, **extra):
+        return self._stream(model, request_key(model, messages, options), True, deadline)
+
+    def embed(self, model, texts, **extra):
+        raise CassetteMiss("Las grabaciones no guardan embeddings")
+
+    def close(self):
+        pass
+
+
+def replay_agent(path, speed=1.0, strict=False, **kwargs):
+    """
+    Crea un agente que funciona con una grabación, sin internet ni Ollama
+
+    Args:
+        path: Archivo grabado con record()
+        speed: Velocidad de reproducción (default: 1, la original)
+        strict: Fallar en vez de improvisar si falta algo en la grabación
+        **kwargs: Otras opciones de ResearchAgent
+
+    Returns:
+        (agente, cassette); en cassette.questions están las preguntas
+        grabadas con su instante de llegada ('t')
+    """
+    # Importar aquí: agent.py importa este módulo solo para grabar
+    from agent import ResearchAgent
+    cassette = Cassette(path)
+    if not cassette.models:
+        raise ValueError(f"La grabación no tiene llamadas al modelo: {path}")
+    if kwargs.get("model") is None:
+        kwargs["model"] = cassette.models[0]
+    kwargs.setdefault("model_inventory", False)
+    kwargs.setdefault("search_cache", False)
+    agent = ResearchAgent(backend=ReplayLLM(cassette, speed, strict),
+                          search_backend=ReplaySearchBackend(cassette, speed, strict),
+                          **kwargs)
+    return agent, cassette
@@ -0,0 +1,49 @@
+"""
+Fixtures de las pruebas (python -m pytest)
+Usan el Ollama y el buscador falsos de benchmarks/, así que no hace falta
+internet ni modelos; cada prueba tiene su propia carpeta de caché.
+"""
+import contextlib
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+
+import search  # noqa: E402
+from fake_ollama import FakeOllama  # noqa: E402
+from fake_search import FakeSearchBackend  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Carpeta de caché vacía (nada de ~/.cache/deepagents)"""
+    path = tmp_path / "cache"
+    monkeypatch.setenv("DEEPAGENTS_CACHE_DIR", str(path))
+    monkeypatch.setattr(search, "_search_cache", None)
+    return path
+
+
+@pytest.fixture
+def ollama():
+    """Ollama falso rápido (20 tokens a 1000 tokens/s)"""
+    with FakeOllama(tokens_per_second=1000, response_tokens=20) as server:
+        yield server
+
+
+@pytest.fixture
+def make_agent():
+    """Crea agentes contra un servidor falso, sin mensajes por pantalla"""
+    # Importar aquí: agent.py importa search y cache, que ya usan la caché de la prueba
+    from agent import ResearchAgent
+
+    def make(server, search_latency=0.0, **kwargs):
+        kwargs.setdefault("search_backend", FakeSearchBackend(search_latency, jitter=0))
+        kwargs.setdefault("search_cache", False)
+        kwargs.setdefault("model_inventory", False)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return ResearchAgent(host=server.host, **kwargs)
+
+    return make
@@ -0,0 +1,189 @@
+"""
+Construcción del contexto del prompt con un presupuesto de tokens
+Elige los fragmentos más relevantes para la pregunta (BM25) y los
+mete hasta llenar la ventana de contexto del modelo, sin pasarse
+"""
+import math
+import re
+from collections import Counter
+
+from search import keywords
+
+
+# Ventana de contexto que usa Ollama si el modelo no define num_ctx
+DEFAULT_NUM_CTX = 2048
+
+# Caracteres por token aproximados (un poco a la baja para no pasarse)
+CHARS_PER_TOKEN = 3.5
+
+
+def estimate_tokens(text):
+    """Estima cuántos tokens ocupa un texto (sin cargar el tokenizador)"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def model_num_ctx(backend, model, options=None):
+    """
+    Averigua la ventana de contexto con la que Ollama ejecuta un modelo
+
+    Usa, por orden: options['num_ctx'], el parámetro num_ctx del
+    Modelfile, o el valor por defecto de Ollama (2048).
+
+    Args:
+        backend: Backend de LLM (con show())
+        model: Nombre del modelo
+        options: Opciones de generación que usa el agente
+
+    Returns:
+        Tokens de la ventana de contexto
+    """
+    if options and options.get("num_ctx"):
+        return int(options["num_ctx"])
+    try:
+        parameters = backend.show(model).get("parameters", "")
+    except Exception:
+        return DEFAULT_NUM_CTX
+    match = re.search(r"^\s*num_ctx\s+(\d+)", parameters or "", re.MULTILINE)
+    return int(match.group(1)) if match else DEFAULT_NUM_CTX
+
+
+def split_passages(results, passage_chars=600):
+    """
+    Parte los resultados de búsqueda en fragmentos de tamaño parecido
+
+    Usa el texto de la página descargada si lo hay, y si no el resumen
+    del buscador. Los fragmentos se cortan por frases.
+
+    Args:
+        results: Lista de resultados de búsqueda
+        passage_chars: Tamaño aproximado de cada fragmento
+
+    Returns:
+        Lista de diccionarios con 'source' (índice del resultado) y 'text'
+    """
+    passages = []
+    for source, result in enumerate(results):
+        text = result.get("content") or result.get("body") or ""
+        sentences = re.split(r"(?<=[.!?])\s+|\n+", text)
+        current = ""
+        for sentence in sentences:
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            if current and len(current) + len(sentence) + 1 > passage_chars:
+                passages.append({"source": source, "text": current})
+                current = ""
+            # Frases larguísimas (sin puntos) se cortan a lo bruto
+            while len(sentence) > passage_chars:
+                passages.append({"source": source, "text": sentence[:passage_chars]})
+                sentence = sentence[passage_chars:]
+            current = f"{current} {sentence}".strip()
+        if current:
+            passages.append({"source": source, "text": current})
+    return passages
+
+
+def bm25_scores(query, documents, k1=1.5, b=0.75):
+    """
+    Puntúa documentos según su relevancia para la consulta (BM25)
+
+    Args:
+        query: La consulta
+        documents: Lista de textos
+
+    Returns:
+        Lista de puntuaciones, una por documento
+    """
+    terms = set(keywords(query))
+    tokenized = [keywords(doc) for doc in documents]
+    if not terms or not tokenized:
+        return [0.0] * len(documents)
+
+    n = len(tokenized)
+    avg_len = sum(len(t) for t in tokenized) / n or 1
+    df = Counter(term for tokens in tokenized for term in set(tokens) & terms)
+
+    scores = []
+    for tokens in tokenized:
+        tf = Counter(tokens)
+        length_norm = k1 * (1 - b + b * len(tokens) / avg_len)
+        score = 0.0
+        for term in terms:
+            if tf[term]:
+                idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+                score += idf * tf[term] * (k1 + 1) / (tf[term] + length_norm)
+        scores.append(score)
+    return scores
+
+
+class ContextBuilder:
+    """Elige y ordena los fragmentos que caben en el presupuesto de tokens"""
+
+    def __init__(self, num_ctx=DEFAULT_NUM_CTX, reserve_tokens=512, passage_chars=600):
+        """
+        Inicializa el constructor de contexto
+
+        Args:
+            num_ctx: Ventana de contexto del modelo en tokens
+            reserve_tokens: Tokens que se dejan libres para la respuesta
+            passage_chars: Tamaño aproximado de cada fragmento
+        """
+        self.num_ctx = num_ctx
+        self.reserve_tokens = reserve_tokens
+        self.passage_chars = passage_chars
+
+    def budget(self, fixed_text=""):
+        """Tokens disponibles para el contexto, descontando el resto del prompt"""
+        return max(0, self.num_ctx - self.reserve_tokens - estimate_tokens(fixed_text))
+
+    def build(self, question, results, fixed_text=""):
+        """
+        Construye el bloque de información para el prompt
+
+        Args:
+            question: La pregunta del usuario
+            results: Lista de resultados de búsqueda
+            fixed_text: El resto del prompt (para descontarlo del presupuesto)
+
+        Returns:
+            Texto con los fragmentos más relevantes agrupados por fuente
+        """
+        if not results:
+            return "No se encontraron resultados."
+
+        passages = split_passages(results, self.passage_chars)
+        scores = bm25_scores(question, [p["text"] for p in passages])
+
+        # Los mejores fragmentos primero; a igualdad, el mejor resultado del buscador
+        order = sorted(range(len(passages)),
+                       key=lambda i: (-scores[i], passages[i]["source"], i))
+
+        # Si algo es relevante, no rellenar con fragmentos que no lo son
+        if any(scores):
+            order = [i for i in order if scores[i] > 0]
+
+        budget = self.budget(fixed_text)
+        chosen = {}
+        used = 0
+        for i in order:
+            source = passages[i]["source"]
+            cost = estimate_tokens(passages[i]["text"]) + 1
+            if source not in chosen:
+                header = f"[{source + 1}] {results[source]['title']} ({results[source]['href']})"
+                cost += estimate_tokens(header) + 1
+            if used + cost > budget:
+                continue
+            used += cost
+            chosen.setdefault(source, []).append(i)
+
+        if not chosen:
+            return "No se encontraron resultados."
+
+        # Presentar por fuente (en orden del buscador) y cada fragmento en su orden original
+        blocks = []
+        for source in sorted(chosen):
+            result = results[source]
+            lines = [f"[{source + 1}] {result['title']} ({result['href']})"]
+            lines += [passages[i]["text"] for i in sorted(chosen[source])]
+            blocks.append("\n".join(lines))
+        return "\n\n".join(blocks)
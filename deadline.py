@@ -0,0 +1,66 @@
+"""
+Tiempo máximo de una petición de punta a punta
+Un Deadline se crea al empezar la pregunta y se reparte entre las
+etapas: la búsqueda recibe una parte y la generación el resto. Cuando
+se acaba, la generación en curso se cancela de verdad (se cierra la
+conexión con Ollama o se mata `ollama run`) y se devuelve lo generado
+hasta ese momento.
+
+Las funciones de más abajo (search, fetch, llm) reciben el límite como
+`deadline`, un instante de time.monotonic(), igual que PageFetcher.
+"""
+import time
+
+
+class DeadlineExceeded(TimeoutError):
+    """Se acabó el tiempo de la petición"""
+
+
+class Deadline:
+    """Límite de tiempo de una petición"""
+
+    def __init__(self, seconds):
+        """
+        Args:
+            seconds: Segundos que tiene la petición en total
+        """
+        self.seconds = seconds
+        self.at = time.monotonic() + seconds
+
+    def remaining(self):
+        """Segundos que quedan (0 si ya pasó)"""
+        return max(0.0, self.at - time.monotonic())
+
+    def budget(self, fraction):
+        """
+        Tiempo para una etapa: una fracción del total, sin pasarse de lo que queda
+
+        Args:
+            fraction: Parte del total (ej: 0.4 para la búsqueda)
+
+        Returns:
+            Instante (time.monotonic()) en que debe terminar la etapa
+        """
+        return min(self.at, time.monotonic() + self.seconds * fraction)
+
+
+def exceeded_message(seconds, stage):
+    """Aviso para el usuario cuando no dio tiempo a nada en una etapa"""
+    return f"⏱️  Se acabó el tiempo ({seconds:g}s) durante: {stage}"
+
+
+def incomplete_message(seconds):
+    """Aviso que se añade al final de una respuesta cortada"""
+    return f"\n\n⏱️  Respuesta incompleta: se acabó el tiempo ({seconds:g}s)"
+
+
+def remaining(deadline):
+    """
+    Segundos hasta un instante de time.monotonic()
+
+    Returns:
+        Los segundos (mínimo 0), o None si no hay límite
+    """
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
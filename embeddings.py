@@ -0,0 +1,303 @@
+"""
+Búsqueda semántica con embeddings de Ollama
+Encuentra fragmentos por significado, no solo por palabras clave
+
+Necesita numpy (pip install numpy) y un modelo de embeddings:
+    ollama pull nomic-embed-text
+"""
+import os
+import sqlite3
+import threading
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from cache import default_cache_dir
+from context import split_passages
+
+
+DEFAULT_EMBED_MODEL = "nomic-embed-text"
+
+
+def quantize(vectors):
+    """
+    Convierte vectores float32 a int8 con una escala por fila
+
+    Returns:
+        (vectores int8, escalas float32)
+    """
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+def similarities(matrix, q, scales=None):
+    """
+    Similitud de coseno de la consulta con cada fila (vectores normalizados)
+
+    Args:
+        matrix: Matriz de vectores, float32 o int8
+        q: Vector de la consulta (float32, normalizado)
+        scales: Escala de cada fila si la matriz es int8
+
+    Returns:
+        Array float32 con una similitud por fila
+    """
+    if scales is None:
+        return matrix @ q
+    # Un solo producto; einsum convierte el int8 a float por trozos, sin
+    # la copia float32 de toda la matriz que haría matrix @ q
+    return np.einsum("ij,j->i", matrix, q, dtype=np.float32) * scales
+
+
+class EmbeddingIndex:
+    """
+    Índice de embeddings en disco con búsqueda por similitud de coseno
+
+    Los vectores se guardan normalizados en una matriz (float32, o int8
+    con una escala por fila) que se lee con memmap. Buscar es multiplicar
+    la matriz por el vector de la consulta y quedarse con los k mayores.
+    """
+
+    def __init__(self, backend, index_dir=None, model=DEFAULT_EMBED_MODEL,
+                 quantize=False, batch_size=32):
+        """
+        Abre (o crea) un índice
+
+        Args:
+            backend: Backend de LLM con embed() (la API HTTP de Ollama)
+            index_dir: Carpeta del índice (default: <carpeta de caché>/embeddings)
+            model: Modelo de embeddings de Ollama
+            quantize: Guardar los vectores en int8 (4 veces menos memoria).
+                      Solo se aplica al crear el índice.
+            batch_size: Textos por petición de embeddings
+        """
+        if np is None:
+            raise RuntimeError(
+                "❌ El índice de embeddings necesita numpy.\n"
+                "Instálalo con: pip install numpy"
+            )
+
+        self.backend = backend
+        self.batch_size = batch_size
+        self.index_dir = index_dir or os.path.join(default_cache_dir(), "embeddings")
+        os.makedirs(self.index_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._matrix = None
+        self._scales = None
+        self._db = sqlite3.connect(
+            os.path.join(self.index_dir, "index.sqlite"), check_same_thread=False
+        )
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+            "CREATE TABLE IF NOT EXISTS passages ("
+            " id INTEGER PRIMARY KEY,"
+            " href TEXT NOT NULL,"
+            " title TEXT NOT NULL,"
+            " text TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS passages_href ON passages (href);"
+        )
+        meta = dict(self._db.execute("SELECT key, value FROM meta"))
+        if meta:
+            if meta["model"] != model:
+                raise RuntimeError(
+                    f"❌ El índice se creó con el modelo '{meta['model']}', no '{model}'.\n"
+                    f"Usa otra carpeta para el índice o el mismo modelo."
+                )
+            self.model = meta["model"]
+            self.dim = int(meta["dim"])
+            self.quantize = meta["quantize"] == "1"
+        else:
+            self.model = model
+            self.dim = None
+            self.quantize = quantize
+        self._count = self._db.execute("SELECT COUNT(*) FROM passages").fetchone()[0]
+
+    def __len__(self):
+        return self._count
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    def _embed(self, texts):
+        """Calcula embeddings normalizados (float32, una fila por texto)"""
+        vectors = np.asarray(self.backend.embed(self.model, texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return vectors / norms
+
+    def _load(self):
+        """Abre la matriz de vectores con memmap (solo la primera vez)"""
+        if self._matrix is None and self._count:
+            dtype = np.int8 if self.quantize else np.float32
+            self._matrix = np.memmap(
+                self._path("vectors.bin"), dtype=dtype, mode="r", shape=(self._count, self.dim)
+            )
+            if self.quantize:
+                self._scales = np.memmap(
+                    self._path("scales.bin"), dtype=np.float32, mode="r", shape=(self._count,)
+                )
+        return self._matrix
+
+    def add_passages(self, passages):
+        """
+        Calcula y guarda los embeddings de varios fragmentos
+
+        Args:
+            passages: Lista de diccionarios con 'title', 'href' y 'text'
+
+        Returns:
+            Cuántos fragmentos se añadieron
+        """
+        added = 0
+        for start in range(0, len(passages), self.batch_size):
+            batch = passages[start:start + self.batch_size]
+            vectors = self._embed([p["text"] for p in batch])
+
+            with self._lock:
+                if self.dim is None:
+                    self.dim = vectors.shape[1]
+                    self._db.executemany(
+                        "INSERT INTO meta (key, value) VALUES (?, ?)",
+                        [("model", self.model), ("dim", str(self.dim)),
+                         ("quantize", "1" if self.quantize else "0")]
+                    )
+
+                # Primero los vectores y luego los metadatos: si el proceso se
+                # corta entre medias, las filas sobrantes se ignoran al abrir
+                if self.quantize:
+                    quantized, scales = quantize(vectors)
+                    self._append("vectors.bin", quantized)
+                    self._append("scales.bin", scales)
+                else:
+                    self._append("vectors.bin", vectors)
+
+                self._db.executemany(
+                    "INSERT INTO passages (id, href, title, text) VALUES (?, ?, ?, ?)",
+                    [(self._count + i, p["href"], p["title"], p["text"])
+                     for i, p in enumerate(batch)]
+                )
+                self._db.commit()
+                self._count += len(batch)
+                self._matrix = None
+                added += len(batch)
+        return added
+
+    def _append(self, name, array):
+        """Añade filas al final de un archivo de la matriz"""
+        path = self._path(name)
+        rows = self._count * (self.dim if array.ndim == 2 else 1) * array.itemsize
+        with open(path, "ab") as f:
+            # Descartar filas de una escritura anterior que no llegó a guardarse
+            if f.tell() != rows:
+                f.truncate(rows)
+                f.seek(rows)
+            f.write(array.tobytes())
+
+    def add_documents(self, documents, passage_chars=600):
+        """
+        Parte documentos en fragmentos y los indexa (salta los ya indexados)
+
+        Args:
+            documents: Iterable de diccionarios con 'title', 'href' y 'text'
+            passage_chars: Tamaño aproximado de cada fragmento
+
+        Returns:
+            Cuántos fragmentos se añadieron
+        """
+        passages = []
+        for document in documents:
+            with self._lock:
+                known = self._db.execute(
+                    "SELECT 1 FROM passages WHERE href = ? LIMIT 1", (document["href"],)
+                ).fetchone()
+            if known:
+                continue
+            for passage in split_passages([{"content": document["text"]}], passage_chars):
+                passages.append({
+                    "title": document["title"],
+                    "href": document["href"],
+                    "text": passage["text"],
+                })
+        return self.add_passages(passages)
+
+    def add_folder(self, corpus_dir):
+        """Indexa los documentos de una carpeta (.txt, .md, .html...)"""
+        # Importar aquí para no cargar el buscador local si no se usa
+        from local_index import EXTENSIONS, read_document
+
+        def documents():
+            for root, _, names in os.walk(corpus_dir):
+                for name in sorted(names):
+                    if os.path.splitext(name)[1].lower() in EXTENSIONS:
+                        path = os.path.abspath(os.path.join(root, name))
+                        document = read_document(path)
+                        yield {"title": document["title"], "href": "file://" + path,
+                               "text": document["text"]}
+
+        return self.add_documents(documents())
+
+    def add_cached_pages(self, cache=None):
+        """Indexa las páginas web guardadas en la DocumentCache (ver fetch.py)"""
+        if cache is None:
+            from cache import DocumentCache
+            cache = DocumentCache()
+        return self.add_documents(
+            {"title": doc.get("title") or url, "href": url, "text": doc["text"]}
+            for url, doc in cache.items() if doc.get("text")
+        )
+
+    def search(self, query, k=3):
+        """
+        Busca los fragmentos más parecidos a la consulta
+
+        Returns:
+            Lista de (id del fragmento, similitud), de mayor a menor
+        """
+        with self._lock:
+            matrix = self._load()
+            scales = self._scales
+        if matrix is None:
+            return []
+
+        q = self._embed([query])[0]
+        scores = similarities(matrix, q, scales if self.quantize else None)
+
+        k = min(k, len(scores))
+        top = np.argpartition(scores, -k)[-k:]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def search_results(self, query, k=3):
+        """
+        Igual que search() pero con el formato de los resultados de búsqueda
+
+        Returns:
+            Lista de diccionarios con 'title', 'body', 'href' y 'content'
+        """
+        hits = self.search(query, k)
+        if not hits:
+            return []
+        with self._lock:
+            placeholders = ",".join("?" * len(hits))
+            rows = {
+                row[0]: row[1:]
+                for row in self._db.execute(
+                    f"SELECT id, href, title, text FROM passages WHERE id IN ({placeholders})",
+                    tuple(i for i, _ in hits)
+                )
+            }
+        return [
+            {"title": rows[i][1], "body": rows[i][2][:300], "href": rows[i][0],
+             "content": rows[i][2]}
+            for i, _ in hits if i in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            self._matrix = None
+            self._scales = None
+            self._db.close()
@@ -4,6 +4,7 @@ Ejemplo de cómo usar el agente en tu código
 Ejecuta: python examples/example.py
 """
 from agent import ResearchAgent
+from batch import iter_batch
 
 
 def ejemplo_basico():
@@ -37,13 +38,15 @@ def ejemplo_multiple():
         "¿Qué es blockchain?"
     ]
     
-    for i, pregunta in enumerate(preguntas, 1):
-        print(f"\n[{i}/{len(preguntas)}] ❓ {pregunta}")
-        respuesta = agent.research(pregunta)
-        print(f"💬 {respuesta[:200]}...")  # Primeros 200 caracteres
-        
-        if i < len(preguntas):
-            input("\nPresiona Enter para la siguiente pregunta...")
+    # iter_batch busca las siguientes preguntas mientras el modelo
+    # responde las actuales, y devuelve cada resultado al terminar
+    for resultado in iter_batch(agent, enumerate(preguntas), workers=2):
+        i = resultado["index"] + 1
+        print(f"\n[{i}/{len(preguntas)}] ❓ {resultado['question']}")
+        if "error" in resultado:
+            print(f"⚠️  {resultado['error']}")
+        else:
+            print(f"💬 {resultado['answer'][:200]}...")  # Primeros 200 caracteres
 
 
 def ejemplo_chat():
@@ -0,0 +1,331 @@
+"""
+Descarga de páginas web y extracción de su texto
+Para dar al modelo algo más que los ~200 caracteres de cada resultado
+"""
+import gzip
+import http.client
+import queue
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+
+from cache import DocumentCache
+from deadline import DeadlineExceeded, remaining
+
+
+USER_AGENT = "Mozilla/5.0 (compatible; deepagents-research/1.0)"
+
+# Etiquetas cuyo contenido no es texto principal
+SKIP_TAGS = {"script", "style", "noscript", "nav", "header", "footer", "aside",
+             "form", "svg", "iframe", "template", "button"}
+
+# Etiquetas que separan bloques de texto
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "li", "ul", "ol", "br",
+              "h1", "h2", "h3", "h4", "h5", "h6", "tr", "table", "blockquote", "pre"}
+
+
+class _TextExtractor(HTMLParser):
+    """Recorre el HTML quedándose con el título y el texto de los bloques"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.blocks = []
+        self._current = []
+        self._skip = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self._skip += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self._skip = max(0, self._skip - 1)
+        elif tag == "title":
+            self._in_title = False
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+        elif not self._skip:
+            self._current.append(data)
+
+    def _flush(self):
+        text = " ".join("".join(self._current).split())
+        self._current = []
+        # Los bloques muy cortos suelen ser menús, botones o migas de pan
+        if len(text) >= 40:
+            self.blocks.append(text)
+
+
+def extract_text(html, max_chars=20000):
+    """
+    Extrae el texto principal de una página HTML
+
+    Args:
+        html: El HTML de la página
+        max_chars: Máximo de caracteres de texto a devolver
+
+    Returns:
+        Diccionario con 'title' y 'text'
+    """
+    parser = _TextExtractor()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception:
+        pass
+    parser._flush()
+    text = "\n".join(parser.blocks)
+    return {"title": " ".join(parser.title.split()), "text": text[:max_chars]}
+
+
+class PageFetcher:
+    """
+    Descarga varias páginas a la vez y extrae su texto
+
+    Reutiliza conexiones por servidor, limita las descargas simultáneas
+    a un mismo servidor, y extrae el texto en otros procesos para que
+    parsear HTML no frene las descargas.
+    """
+
+    def __init__(self, max_workers=8, max_per_host=2, timeout=5, max_bytes=2 * 1024 * 1024,
+                 cache=True, extract_processes=2):
+        """
+        Inicializa el descargador
+
+        Args:
+            max_workers: Descargas simultáneas en total
+            max_per_host: Descargas simultáneas a un mismo servidor
+            timeout: Timeout en segundos de conexión y lectura
+            max_bytes: Tamaño máximo de página que se descarga
+            cache: True para la caché por defecto, una DocumentCache, o None
+            extract_processes: Procesos para extraer texto (0 = en el mismo hilo)
+        """
+        self.timeout = timeout
+        self.max_per_host = max_per_host
+        self.max_bytes = max_bytes
+        self.extract_processes = extract_processes
+        if cache is True:
+            try:
+                cache = DocumentCache()
+            except Exception:
+                cache = None
+        self.cache = cache
+
+        self._threads = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch")
+        self._processes = None
+        self._pools = {}
+        self._host_limits = {}
+        self._lock = threading.Lock()
+
+    def _host_state(self, key):
+        """Devuelve (pool de conexiones, semáforo) de un servidor"""
+        with self._lock:
+            if key not in self._pools:
+                self._pools[key] = queue.LifoQueue(maxsize=self.max_per_host)
+                self._host_limits[key] = threading.BoundedSemaphore(self.max_per_host)
+            return self._pools[key], self._host_limits[key]
+
+    def _get(self, url, deadline):
+        """
+        Descarga una URL (siguiendo hasta 3 redirecciones)
+
+        Returns:
+            El HTML como texto, o None si no es una página de texto
+        """
+        for _ in range(4):
+            parts = urlsplit(url)
+            if parts.scheme not in ("http", "https") or not parts.hostname:
+                return None
+            key = (parts.scheme, parts.hostname, parts.port)
+            pool, limit = self._host_state(key)
+            path = parts.path or "/"
+            if parts.query:
+                path += "?" + parts.query
+
+            timeout = min(self.timeout, max(0.1, deadline - time.monotonic()))
+            if not limit.acquire(timeout=timeout):
+                raise TimeoutError(f"Demasiadas descargas a {parts.hostname}")
+            try:
+                try:
+                    conn = pool.get_nowait()
+                except queue.Empty:
+                    cls = (http.client.HTTPSConnection if parts.scheme == "https"
+                           else http.client.HTTPConnection)
+                    conn = cls(parts.hostname, parts.port, timeout=timeout)
+                conn.timeout = timeout
+                if conn.sock is not None:
+                    conn.sock.settimeout(timeout)
+
+                try:
+                    conn.request("GET", path, headers={
+                        "User-Agent": USER_AGENT,
+                        "Accept": "text/html,text/plain;q=0.9,*/*;q=0.1",
+                        "Accept-Encoding": "gzip, deflate",
+                    })
+                    response = conn.getresponse()
+                    body = response.read(self.max_bytes + 1)
+                except Exception:
+                    conn.close()
+                    raise
+
+                if len(body) > self.max_bytes or response.will_close:
+                    conn.close()
+                else:
+                    try:
+                        pool.put_nowait(conn)
+                    except queue.Full:
+                        conn.close()
+            finally:
+                limit.release()
+
+            if response.status in (301, 302, 303, 307, 308) and response.getheader("Location"):
+                url = urljoin(url, response.getheader("Location"))
+                continue
+            if response.status >= 400:
+                raise OSError(f"HTTP {response.status} en {url}")
+
+            content_type = response.getheader("Content-Type", "")
+            if content_type and "html" not in content_type and "text" not in content_type:
+                return None
+
+            encoding = response.getheader("Content-Encoding", "")
+            if encoding == "gzip":
+                body = gzip.decompress(body)
+            elif encoding == "deflate":
+                body = zlib.decompress(body)
+
+            charset = "utf-8"
+            if "charset=" in content_type:
+                charset = content_type.split("charset=")[-1].split(";")[0].strip()
+            try:
+                return body.decode(charset, errors="replace")
+            except LookupError:
+                return body.decode("utf-8", errors="replace")
+
+        raise OSError(f"Demasiadas redirecciones en {url}")
+
+    def _extract(self, html, deadline=None):
+        """
+        Extrae el texto en el pool de procesos (o aquí mismo si no hay)
+
+        Raises:
+            DeadlineExceeded si la extracción no termina antes de `deadline`
+            (el hilo de descarga no se queda esperando a una página enorme)
+        """
+        if self.extract_processes:
+            with self._lock:
+                if self._processes is None:
+                    try:
+                        self._processes = ProcessPoolExecutor(max_workers=self.extract_processes)
+                    except (OSError, NotImplementedError):
+                        self.extract_processes = 0
+            if self._processes is not None:
+                future = self._processes.submit(extract_text, html)
+                try:
+                    return future.result(timeout=remaining(deadline))
+                except FutureTimeout:
+                    future.cancel()
+                    raise DeadlineExceeded("⏱️  Se acabó el tiempo extrayendo el texto")
+        return extract_text(html)
+
+    def fetch(self, url, deadline=None):
+        """
+        Descarga una página y extrae su texto (usando la caché)
+
+        Args:
+            url: La URL de la página
+            deadline: Momento límite (time.monotonic()) para terminar
+
+        Returns:
+            Diccionario con 'url', 'title' y 'text', o None si no es HTML
+        """
+        if self.cache is not None:
+            cached = self.cache.get(url)
+            if cached is not None:
+                return cached
+
+        deadline = deadline or time.monotonic() + self.timeout
+        html = self._get(url, deadline)
+        if html is None:
+            return None
+
+        document = self._extract(html, deadline)
+        document["url"] = url
+        if self.cache is not None:
+            self.cache.set(url, document)
+        return document
+
+    def fetch_all(self, urls, timeout=None):
+        """
+        Descarga varias páginas a la vez
+
+        Args:
+            urls: Lista de URLs
+            timeout: Segundos máximos para todo el grupo (default: self.timeout)
+
+        Returns:
+            Diccionario url -> documento con las páginas que llegaron a tiempo.
+            Las que fallan o no terminan a tiempo no aparecen.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        futures = {self._threads.submit(self.fetch, url, deadline): url for url in urls}
+        done, _ = wait(futures, timeout=timeout)
+
+        documents = {}
+        for future in done:
+            try:
+                document = future.result(timeout=0)
+            except Exception:
+                continue
+            if document is not None and document["text"]:
+                documents[futures[future]] = document
+        return documents
+
+    def enrich(self, results, top=3, timeout=None):
+        """
+        Añade el texto de la página ('content') a los primeros resultados
+
+        Args:
+            results: Lista de resultados de búsqueda (con 'href')
+            top: Cuántos resultados descargar
+            timeout: Segundos máximos para las descargas
+
+        Returns:
+            Los mismos resultados (copias), con 'content' en los que se descargaron
+        """
+        documents = self.fetch_all([r["href"] for r in results[:top]], timeout)
+        enriched = []
+        for result in results:
+            result = dict(result)
+            document = documents.get(result["href"])
+            if document is not None:
+                result["content"] = document["text"]
+            enriched.append(result)
+        return enriched
+
+    def close(self):
+        """Libera los hilos, procesos y conexiones"""
+        self._threads.shutdown(wait=False)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False)
+        with self._lock:
+            for pool in self._pools.values():
+                while True:
+                    try:
+                        pool.get_nowait().close()
+                    except queue.Empty:
+                        break
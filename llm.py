@@ -0,0 +1,555 @@
+"""
+Backends de LLM para el agente
+Habla con la API REST de Ollama reutilizando conexiones HTTP,
+y mantiene `ollama run` como alternativa si la API no responde
+"""
+import codecs
+import http.client
+import json
+import os
+import queue
+import socket
+import subprocess
+import threading
+from urllib.parse import urlsplit
+
+from deadline import DeadlineExceeded, remaining
+
+
+DEFAULT_HOST = "http://localhost:11434"
+
+
+class OllamaError(RuntimeError):
+    """Error al comunicarse con Ollama"""
+
+
+def _timed_out():
+    return DeadlineExceeded("⏱️  Se acabó el tiempo esperando a Ollama")
+
+
+def _resolve_host(host=None):
+    """Devuelve (scheme, hostname, port) a partir de un host tipo OLLAMA_HOST"""
+    host = host or os.environ.get("OLLAMA_HOST") or DEFAULT_HOST
+    if "://" not in host:
+        host = "http://" + host
+    parts = urlsplit(host)
+    scheme = parts.scheme or "http"
+    port = parts.port or (443 if scheme == "https" else 11434)
+    return scheme, parts.hostname or "localhost", port
+
+
+class OllamaHTTPClient:
+    """Cliente de la API REST de Ollama con un pool de conexiones keep-alive"""
+
+    def __init__(self, host=None, pool_size=4, timeout=60):
+        """
+        Inicializa el cliente
+
+        Args:
+            host: URL de Ollama (default: $OLLAMA_HOST o http://localhost:11434)
+            pool_size: Conexiones que se mantienen abiertas para reutilizar
+            timeout: Timeout en segundos de cada petición
+        """
+        self.scheme, self.hostname, self.port = _resolve_host(host)
+        self.host = f"{self.scheme}://{self.hostname}:{self.port}"
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+
+    def _new_connection(self):
+        """Crea una conexión nueva al servidor"""
+        cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return cls(self.hostname, self.port, timeout=self.timeout)
+
+    def _acquire(self):
+        """Toma una conexión del pool (o crea una si está vacío)"""
+        try:
+            return self._pool.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def _release(self, conn):
+        """Devuelve una conexión al pool (o la cierra si está lleno)"""
+        if conn.timeout != self.timeout:
+            # Quitar el timeout de un deadline antes de reutilizarla
+            self._set_timeout(conn, self.timeout)
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    @staticmethod
+    def _set_timeout(conn, seconds):
+        conn.timeout = seconds
+        if conn.sock is not None:
+            conn.sock.settimeout(seconds)
+
+    def _left(self, deadline):
+        """Timeout de la conexión hasta el deadline (o DeadlineExceeded si ya pasó)"""
+        left = remaining(deadline)
+        if left <= 0:
+            raise _timed_out()
+        return min(left, self.timeout)
+
+    def _send(self, method, path, payload=None, deadline=None):
+        """
+        Envía una petición y devuelve (conexión, respuesta)
+
+        Si una conexión reutilizada fue cerrada por el servidor,
+        se reintenta una vez con una conexión nueva. Con `deadline`
+        (instante de time.monotonic()), esperar la respuesta más allá
+        lanza DeadlineExceeded y cierra la conexión: Ollama cancela.
+        """
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+
+        # Lo que queda del deadline se mira antes de tomar una conexión: si
+        # ya se acabó, la conexión no se queda fuera del pool
+        timeout = self._left(deadline) if deadline is not None else None
+        conn, reused = self._acquire()
+        try:
+            if timeout is not None:
+                self._set_timeout(conn, timeout)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                conn.close()
+                if not reused:
+                    raise
+                timeout = self._left(deadline) if deadline is not None else None
+                conn = self._new_connection()
+                if timeout is not None:
+                    self._set_timeout(conn, timeout)
+                try:
+                    conn.request(method, path, body=body, headers=headers)
+                    response = conn.getresponse()
+                except Exception:
+                    conn.close()
+                    raise
+            except Exception:
+                conn.close()
+                raise
+        except socket.timeout:
+            if deadline is None:
+                raise
+            raise _timed_out()
+
+        if response.status >= 400:
+            detail = response.read().decode("utf-8", errors="replace")
+            self._release(conn)
+            try:
+                detail = json.loads(detail).get("error", detail)
+            except (ValueError, AttributeError):
+                pass
+            raise OllamaError(f"Ollama respondió {response.status}: {detail}")
+
+        return conn, response
+
+    def _request(self, method, path, payload=None, deadline=None):
+        """Hace una petición completa y devuelve el JSON de la respuesta"""
+        conn, response = self._send(method, path, payload, deadline)
+        try:
+            data = response.read()
+        except socket.timeout:
+            conn.close()
+            if deadline is not None:
+                raise _timed_out()
+            raise
+        except Exception:
+            conn.close()
+            raise
+        self._release(conn)
+        return json.loads(data) if data else {}
+
+    def is_available(self):
+        """Indica si la API de Ollama responde"""
+        try:
+            self._request("GET", "/api/version")
+            return True
+        except Exception:
+            return False
+
+    def list_models(self):
+        """
+        Lista los modelos instalados
+
+        Returns:
+            Lista de nombres de modelo (ej: ['gemma3:4b', 'llama3.2:latest'])
+        """
+        data = self._request("GET", "/api/tags")
+        return [m["name"] for m in data.get("models", [])]
+
+    def running_models(self):
+        """
+        Lista los modelos cargados en memoria ahora mismo (/api/ps)
+
+        Returns:
+            Lista de nombres de modelo
+        """
+        data = self._request("GET", "/api/ps")
+        return [m["name"] for m in data.get("models", [])]
+
+    def model_digest(self, model):
+        """
+        Devuelve el digest del modelo (cambia cuando el modelo se actualiza)
+
+        Returns:
+            El digest, o None si el modelo no está instalado
+        """
+        data = self._request("GET", "/api/tags")
+        for m in data.get("models", []):
+            if _same_model(m["name"], model):
+                return m.get("digest")
+        return None
+
+    def show(self, model):
+        """
+        Devuelve la información del modelo de /api/show
+
+        Returns:
+            Diccionario con 'parameters', 'model_info', 'details'...
+        """
+        return self._request("POST", "/api/show", {"model": model})
+
+    def load(self, model, keep_alive=None):
+        """
+        Carga el modelo en memoria sin generar nada
+
+        Args:
+            model: Nombre del modelo
+            keep_alive: Cuánto tiempo dejarlo cargado sin usarse
+                        (ej: "30m", 3600, -1 para siempre; default: el de Ollama)
+
+        Returns:
+            Diccionario de Ollama (con 'load_duration')
+        """
+        payload = {"model": model, "stream": False}
+        if keep_alive is not None:
+            payload["keep_alive"] = keep_alive
+        return self._request("POST", "/api/generate", payload)
+
+    def generate(self, model, prompt, options=None, deadline=None, **extra):
+        """
+        Genera una respuesta con /api/generate
+
+        Args:
+            model: Nombre del modelo
+            prompt: El texto a enviar al modelo
+            options: Opciones de generación de Ollama (temperature, num_ctx...)
+            deadline: Instante (time.monotonic()) en que se cancela la
+                      generación con DeadlineExceeded (default: sin límite)
+            **extra: Otros campos de la petición (system, keep_alive...)
+
+        Returns:
+            Diccionario de Ollama con 'response' y las estadísticas
+            (prompt_eval_count, eval_count, eval_duration...)
+        """
+        payload = {"model": model, "prompt": prompt, "stream": False}
+        if options:
+            payload["options"] = options
+        payload.update(extra)
+        return self._request("POST", "/api/generate", payload, deadline)
+
+    def chat(self, model, messages, options=None, deadline=None, **extra):
+        """
+        Genera una respuesta con /api/chat
+
+        Args:
+            model: Nombre del modelo
+            messages: Lista de mensajes [{'role': 'user', 'content': '...'}]
+            options: Opciones de generación de Ollama
+            deadline: Igual que en generate()
+
+        Returns:
+            Diccionario de Ollama con 'message' y las estadísticas
+        """
+        payload = {"model": model, "messages": messages, "stream": False}
+        if options:
+            payload["options"] = options
+        payload.update(extra)
+        return self._request("POST", "/api/chat", payload, deadline)
+
+    def embed(self, model, texts, **extra):
+        """
+        Calcula embeddings con /api/embed (varios textos en una petición)
+
+        Args:
+            model: Modelo de embeddings (ej: 'nomic-embed-text')
+            texts: Lista de textos
+
+        Returns:
+            Lista de vectores (listas de floats), uno por texto
+        """
+        payload = {"model": model, "input": list(texts)}
+        payload.update(extra)
+        return self._request("POST", "/api/embed", payload)["embeddings"]
+
+    def _stream(self, path, payload, deadline=None):
+        """
+        Hace una petición en modo streaming y va devolviendo cada línea JSON
+
+        Si el generador se cierra antes de terminar (o llega el deadline),
+        se cierra la conexión: Ollama detecta la desconexión y cancela la
+        generación.
+        """
+        conn, response = self._send("POST", path, payload, deadline)
+        finished = False
+        try:
+            while True:
+                if deadline is not None:
+                    # Esperar el siguiente trozo como mucho hasta el deadline
+                    self._set_timeout(conn, self._left(deadline))
+                try:
+                    line = response.readline()
+                except socket.timeout:
+                    if deadline is None:
+                        raise
+                    raise _timed_out()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                chunk = json.loads(line)
+                if "error" in chunk:
+                    raise OllamaError(chunk["error"])
+                yield chunk
+                if chunk.get("done"):
+                    response.read()
+                    finished = True
+                    break
+        finally:
+            if finished:
+                self._release(conn)
+            else:
+                conn.close()
+
+    def generate_stream(self, model, prompt, options=None, deadline=None, **extra):
+        """
+        Igual que generate() pero va devolviendo los trozos según llegan
+
+        Yields:
+            Diccionarios de Ollama; cada uno trae un trozo en 'response'
+            y el último ('done': True) trae las estadísticas. Al llegar el
+            deadline se lanza DeadlineExceeded (lo ya recibido es válido).
+        """
+        payload = {"model": model, "prompt": prompt, "stream": True}
+        if options:
+            payload["options"] = options
+        payload.update(extra)
+        return self._stream("/api/generate", payload, deadline)
+
+    def chat_stream(self, model, messages, options=None, deadline=None, **extra):
+        """Igual que chat() pero va devolviendo los trozos según llegan"""
+        payload = {"model": model, "messages": messages, "stream": True}
+        if options:
+            payload["options"] = options
+        payload.update(extra)
+        return self._stream("/api/chat", payload, deadline)
+
+    def close(self):
+        """Cierra todas las conexiones del pool"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class OllamaCLIClient:
+    """Backend alternativo que usa el binario `ollama` (un proceso por llamada)"""
+
+    def __init__(self, timeout=60):
+        """
+        Args:
+            timeout: Timeout en segundos de cada `ollama run`
+        """
+        self.timeout = timeout
+
+    def is_available(self):
+        """Indica si el binario de Ollama está instalado"""
+        try:
+            subprocess.run(["ollama", "--version"], capture_output=True, timeout=5)
+            return True
+        except (FileNotFoundError, subprocess.TimeoutExpired):
+            return False
+
+    def list_models(self):
+        """Lista los modelos instalados parseando `ollama list`"""
+        result = subprocess.run(
+            ["ollama", "list"],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+        lines = result.stdout.strip().split('\n')
+        return [line.split()[0] for line in lines[1:] if line.strip()]
+
+    def model_digest(self, model):
+        """Devuelve el ID (digest corto) del modelo según `ollama list`"""
+        result = subprocess.run(
+            ["ollama", "list"],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+        for line in result.stdout.strip().split('\n')[1:]:
+            fields = line.split()
+            if len(fields) > 1 and _same_model(fields[0], model):
+                return fields[1]
+        return None
+
+    def show(self, model):
+        """Devuelve los parámetros del modelo según `ollama show --parameters`"""
+        result = subprocess.run(
+            ["ollama", "show", model, "--parameters"],
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+        return {"parameters": result.stdout}
+
+    def load(self, model, keep_alive=None):
+        """Carga el modelo en memoria con `ollama run` sin prompt"""
+        command = ["ollama", "run", model]
+        if keep_alive is not None:
+            # La CLI quiere una duración con unidad ("30m"); los números son segundos
+            if isinstance(keep_alive, (int, float)):
+                keep_alive = f"{keep_alive}s"
+            command[2:2] = ["--keepalive", keep_alive]
+        subprocess.run(command, input="", capture_output=True, text=True, timeout=self.timeout)
+        return {}
+
+    def _timeout(self, deadline):
+        """Timeout del proceso: el del cliente o lo que quede hasta el deadline"""
+        left = remaining(deadline)
+        if left is None:
+            return self.timeout
+        if left <= 0:
+            raise _timed_out()
+        return min(left, self.timeout)
+
+    def generate(self, model, prompt, options=None, deadline=None, **extra):
+        """
+        Genera una respuesta con `ollama run`
+
+        Las opciones de generación no están disponibles por la CLI
+        y se ignoran. No hay estadísticas de tokens. Si llega el deadline
+        se mata el proceso.
+        """
+        try:
+            result = subprocess.run(
+                ["ollama", "run", model, prompt],
+                capture_output=True,
+                text=True,
+                timeout=self._timeout(deadline)
+            )
+        except subprocess.TimeoutExpired:
+            if deadline is None:
+                raise
+            raise _timed_out()
+        if result.returncode != 0:
+            raise OllamaError(result.stderr.strip() or "ollama run falló")
+        return {"model": model, "response": result.stdout.strip(), "done": True}
+
+    def generate_stream(self, model, prompt, options=None, deadline=None, **extra):
+        """
+        Genera con `ollama run` leyendo la salida según se produce
+
+        Si el generador se cierra antes de terminar, o llega el deadline,
+        se mata el proceso.
+        """
+        left = self._timeout(deadline) if deadline is not None else None
+        process = subprocess.Popen(
+            ["ollama", "run", model, prompt],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+        # Matar el proceso al llegar el deadline desbloquea la lectura
+        killer = None
+        if left is not None:
+            killer = threading.Timer(left, process.kill)
+            killer.daemon = True
+            killer.start()
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        try:
+            while True:
+                data = os.read(process.stdout.fileno(), 1024)
+                if not data:
+                    break
+                text = decoder.decode(data)
+                if text:
+                    yield {"model": model, "response": text, "done": False}
+            if killer is not None and not killer.is_alive():
+                # El proceso terminó porque se mató al llegar el deadline
+                raise _timed_out()
+            process.wait(timeout=self.timeout)
+            yield {"model": model, "response": decoder.decode(b"", final=True), "done": True}
+        finally:
+            if killer is not None:
+                killer.cancel()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+
+    def embed(self, model, texts, **extra):
+        """La CLI no calcula embeddings: hace falta la API HTTP"""
+        raise OllamaError("Los embeddings necesitan la API HTTP de Ollama (ollama serve)")
+
+    def chat(self, model, messages, options=None, deadline=None, **extra):
+        """Chat con `ollama run` aplanando los mensajes en un solo prompt"""
+        result = self.generate(model, _flatten_messages(messages), options, deadline)
+        return {
+            "model": model,
+            "message": {"role": "assistant", "content": result["response"]},
+            "done": True,
+        }
+
+    def chat_stream(self, model, messages, options=None, deadline=None, **extra):
+        """Igual que chat() pero va devolviendo los trozos según llegan"""
+        for chunk in self.generate_stream(model, _flatten_messages(messages), options, deadline):
+            yield {
+                "model": model,
+                "message": {"role": "assistant", "content": chunk["response"]},
+                "done": chunk["done"],
+            }
+
+    def close(self):
+        """No hay recursos que liberar"""
+
+
+def _same_model(name, model):
+    """Compara nombres de modelo teniendo en cuenta el tag ':latest' implícito"""
+    if ":" not in model:
+        model += ":latest"
+    if ":" not in name:
+        name += ":latest"
+    return name == model
+
+
+def _flatten_messages(messages):
+    """Convierte una lista de mensajes de chat en un solo prompt de texto"""
+    return "\n\n".join(f"{m['role']}: {m['content']}" for m in messages)
+
+
+def __getattr__(name):
+    # AsyncOllamaClient vive en async_llm.py; se importa solo si se pide
+    if name == "AsyncOllamaClient":
+        from async_llm import AsyncOllamaClient
+        return AsyncOllamaClient
+    raise AttributeError(f"module 'llm' has no attribute '{name}'")
+
+
+def create_backend(host=None):
+    """
+    Crea el backend por defecto
+
+    Usa la API HTTP de Ollama si responde; si no, `ollama run`.
+
+    Args:
+        host: URL de Ollama (default: $OLLAMA_HOST o http://localhost:11434)
+    """
+    client = OllamaHTTPClient(host)
+    if client.is_available():
+        return client
+    return OllamaCLIClient()
@@ -0,0 +1,465 @@
+"""
+Buscador local: índice invertido en disco sobre una carpeta de documentos
+Para buscar en documentación interna o trabajar sin conexión a internet
+
+Uso:
+    python local_index.py build ./docs
+    python local_index.py search ./docs "¿Cómo se despliega el servicio?"
+"""
+import hashlib
+import heapq
+import math
+import mmap
+import os
+import sqlite3
+import sys
+import threading
+from array import array
+from collections import Counter, defaultdict
+
+from cache import default_cache_dir
+from fetch import extract_text
+from search import SearchBackend, keywords
+
+
+# Tipos de archivo que se indexan
+EXTENSIONS = {
+    ".txt": "text", ".md": "text", ".markdown": "text", ".rst": "text",
+    ".html": "html", ".htm": "html",
+}
+
+# Caracteres del documento que se devuelven como 'content'
+MAX_CONTENT = 20000
+
+
+def read_document(path):
+    """
+    Lee un documento y devuelve su título y texto
+
+    Returns:
+        Diccionario con 'title' y 'text'
+    """
+    with open(path, encoding="utf-8", errors="replace") as f:
+        raw = f.read()
+
+    if EXTENSIONS.get(os.path.splitext(path)[1].lower()) == "html":
+        document = extract_text(raw, max_chars=len(raw))
+        if not document["text"]:
+            document["text"] = " ".join(raw.split())
+    else:
+        title = ""
+        for line in raw.splitlines():
+            if line.strip():
+                title = line.strip().lstrip("#").strip()
+                break
+        document = {"title": title, "text": raw}
+
+    document["title"] = document["title"][:200] or os.path.basename(path)
+    return document
+
+
+class LocalIndex:
+    """
+    Índice invertido en disco con puntuación BM25
+
+    Los documentos se indexan por segmentos: cada actualización solo lee
+    los archivos nuevos o cambiados y escribe un segmento nuevo. Los
+    listados de cada término (postings) se guardan como enteros de 32 bits
+    y se leen con mmap, así que la memoria no depende del tamaño del índice.
+    """
+
+    def __init__(self, index_dir, max_segments=8):
+        """
+        Abre (o crea) un índice
+
+        Args:
+            index_dir: Carpeta donde se guarda el índice
+            max_segments: Segmentos a partir de los cuales se fusionan en uno
+        """
+        self.index_dir = index_dir
+        self.max_segments = max_segments
+        os.makedirs(index_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._maps = {}
+        self._db = sqlite3.connect(os.path.join(index_dir, "index.sqlite"), check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " path TEXT UNIQUE NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " title TEXT NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS segments (id INTEGER PRIMARY KEY AUTOINCREMENT);"
+            "CREATE TABLE IF NOT EXISTS lexicon ("
+            " term TEXT NOT NULL,"
+            " segment INTEGER NOT NULL,"
+            " offset INTEGER NOT NULL,"
+            " count INTEGER NOT NULL,"
+            " PRIMARY KEY (term, segment)) WITHOUT ROWID;"
+        )
+        self._db.commit()
+        self._load_lengths()
+
+    # --- Longitudes de documento -------------------------------------------------
+
+    def _lengths_path(self):
+        return os.path.join(self.index_dir, "lengths.bin")
+
+    def _load_lengths(self):
+        """
+        Carga la longitud (en términos) de cada documento, indexada por id
+
+        Una longitud 0 significa que el documento ya no existe: así se
+        ignoran sus entradas en segmentos antiguos sin reescribirlos.
+        """
+        self._lengths = array("I")
+        if os.path.exists(self._lengths_path()):
+            with open(self._lengths_path(), "rb") as f:
+                self._lengths.frombytes(f.read())
+        live = [n for n in self._lengths if n]
+        self._doc_count = len(live)
+        self._avg_length = (sum(live) / len(live)) if live else 1.0
+
+    def _save_lengths(self):
+        tmp = self._lengths_path() + ".tmp"
+        with open(tmp, "wb") as f:
+            self._lengths.tofile(f)
+        os.replace(tmp, self._lengths_path())
+
+    def _set_length(self, doc_id, length):
+        if doc_id >= len(self._lengths):
+            self._lengths.extend([0] * (doc_id + 1 - len(self._lengths)))
+        self._lengths[doc_id] = length
+
+    # --- Segmentos -----------------------------------------------------------
+
+    def _segment_path(self, segment):
+        return os.path.join(self.index_dir, f"seg_{segment}.post")
+
+    def _segment_map(self, segment):
+        """Devuelve el mmap de un segmento (o None si está vacío)"""
+        if segment not in self._maps:
+            path = self._segment_path(segment)
+            if os.path.getsize(path) == 0:
+                self._maps[segment] = None
+            else:
+                with open(path, "rb") as f:
+                    self._maps[segment] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._maps[segment]
+
+    def _close_maps(self):
+        for m in self._maps.values():
+            if m is not None:
+                m.close()
+        self._maps = {}
+
+    def _postings(self, segment, offset, count):
+        """Lee las parejas (doc, frecuencia) de un término en un segmento"""
+        m = self._segment_map(segment)
+        data = array("I")
+        data.frombytes(m[offset * 4:(offset + count * 2) * 4])
+        return data
+
+    def _write_segment(self, postings):
+        """
+        Escribe un segmento nuevo
+
+        Args:
+            postings: Diccionario término -> array('I') de parejas (doc, frecuencia)
+        """
+        segment = self._db.execute("INSERT INTO segments DEFAULT VALUES").lastrowid
+        rows = []
+        offset = 0
+        with open(self._segment_path(segment), "wb") as f:
+            for term in sorted(postings):
+                data = postings[term]
+                data.tofile(f)
+                rows.append((term, segment, offset, len(data) // 2))
+                offset += len(data)
+        self._db.executemany(
+            "INSERT INTO lexicon (term, segment, offset, count) VALUES (?, ?, ?, ?)", rows
+        )
+
+    def merge(self):
+        """Fusiona todos los segmentos en uno, quitando documentos borrados"""
+        with self._lock:
+            segments = [r[0] for r in self._db.execute("SELECT id FROM segments")]
+            if len(segments) < 2:
+                return
+
+            merged = self._db.execute("INSERT INTO segments DEFAULT VALUES").lastrowid
+            self._db.execute(
+                "CREATE TEMP TABLE lexicon_merged (term TEXT, segment INTEGER,"
+                " offset INTEGER, count INTEGER)"
+            )
+            reader = self._db.cursor()
+            reader.execute(
+                "SELECT term, segment, offset, count FROM lexicon ORDER BY term, segment"
+            )
+
+            offset = 0
+            batch = []
+            with open(self._segment_path(merged), "wb") as f:
+                def flush_term(term, data):
+                    nonlocal offset
+                    if data:
+                        data.tofile(f)
+                        batch.append((term, merged, offset, len(data) // 2))
+                        offset += len(data)
+
+                current, data = None, array("I")
+                for term, segment, seg_offset, count in reader:
+                    if term != current:
+                        flush_term(current, data)
+                        current, data = term, array("I")
+                        if len(batch) >= 10000:
+                            self._db.executemany(
+                                "INSERT INTO lexicon_merged VALUES (?, ?, ?, ?)", batch
+                            )
+                            batch.clear()
+                    postings = self._postings(segment, seg_offset, count)
+                    for i in range(0, len(postings), 2):
+                        if self._lengths[postings[i]]:
+                            data.append(postings[i])
+                            data.append(postings[i + 1])
+                flush_term(current, data)
+                self._db.executemany("INSERT INTO lexicon_merged VALUES (?, ?, ?, ?)", batch)
+
+            self._db.execute("DELETE FROM lexicon")
+            self._db.execute("INSERT INTO lexicon SELECT * FROM lexicon_merged")
+            self._db.execute("DROP TABLE lexicon_merged")
+            self._db.execute("DELETE FROM segments WHERE id != ?", (merged,))
+            self._db.commit()
+
+            self._close_maps()
+            for segment in segments:
+                os.remove(self._segment_path(segment))
+
+    # --- Indexación ----------------------------------------------------------
+
+    def update(self, corpus_dir, segment_docs=20000):
+        """
+        Indexa una carpeta, leyendo solo los archivos nuevos o cambiados
+
+        Args:
+            corpus_dir: Carpeta con los documentos (se recorre entera)
+            segment_docs: Documentos por segmento (limita la memoria al indexar)
+
+        Returns:
+            Diccionario con cuántos documentos se añadieron, actualizaron y borraron
+        """
+        files = {}
+        for root, _, names in os.walk(corpus_dir):
+            for name in names:
+                if os.path.splitext(name)[1].lower() in EXTENSIONS:
+                    path = os.path.abspath(os.path.join(root, name))
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    files[path] = (st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            known = {
+                path: (doc_id, mtime_ns, size)
+                for doc_id, path, mtime_ns, size in self._db.execute(
+                    "SELECT id, path, mtime_ns, size FROM docs"
+                )
+            }
+
+            stats = {"added": 0, "updated": 0, "removed": 0}
+            pending = []
+            for path, (doc_id, mtime_ns, size) in known.items():
+                if path not in files:
+                    stats["removed"] += 1
+                elif files[path] != (mtime_ns, size):
+                    stats["updated"] += 1
+                    pending.append(path)
+                else:
+                    continue
+                self._set_length(doc_id, 0)
+                self._db.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+            new = [path for path in files if path not in known]
+            stats["added"] = len(new)
+            pending.extend(new)
+
+            postings = defaultdict(lambda: array("I"))
+            in_segment = 0
+            for path in pending:
+                try:
+                    document = read_document(path)
+                except OSError:
+                    continue
+                terms = Counter(keywords(document["text"]))
+                doc_id = self._db.execute(
+                    "INSERT INTO docs (path, mtime_ns, size, title) VALUES (?, ?, ?, ?)",
+                    (path, *files[path], document["title"])
+                ).lastrowid
+                self._set_length(doc_id, max(1, sum(terms.values())))
+                for term, tf in terms.items():
+                    data = postings[term]
+                    data.append(doc_id)
+                    data.append(tf)
+
+                in_segment += 1
+                if in_segment >= segment_docs:
+                    self._write_segment(postings)
+                    postings = defaultdict(lambda: array("I"))
+                    in_segment = 0
+
+            if postings:
+                self._write_segment(postings)
+            self._save_lengths()
+            self._db.commit()
+            self._load_lengths()
+
+            segments = self._db.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+            if segments > self.max_segments:
+                self.merge()
+
+        return stats
+
+    # --- Búsqueda ------------------------------------------------------------
+
+    def search(self, query, max_results=3, k1=1.2, b=0.75):
+        """
+        Busca los documentos más relevantes (BM25)
+
+        Returns:
+            Lista de (doc_id, puntuación), de mayor a menor
+        """
+        terms = set(keywords(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            placeholders = ",".join("?" * len(terms))
+            rows = self._db.execute(
+                f"SELECT term, segment, offset, count FROM lexicon WHERE term IN ({placeholders})",
+                tuple(terms)
+            ).fetchall()
+
+            by_term = defaultdict(list)
+            for term, segment, offset, count in rows:
+                by_term[term].append(self._postings(segment, offset, count))
+
+            lengths = self._lengths
+            n = self._doc_count
+            # Parte de la normalización por longitud que no depende del documento
+            base = k1 * (1 - b)
+            per_length = k1 * b / self._avg_length
+            scores = defaultdict(float)
+            for term, lists in by_term.items():
+                # df incluye entradas de documentos borrados hasta la próxima fusión
+                df = sum(len(data) for data in lists) // 2
+                weight = math.log(1 + (n - df + 0.5) / (df + 0.5)) * (k1 + 1)
+                for data in lists:
+                    pairs = iter(data)
+                    for doc_id, tf in zip(pairs, pairs):
+                        length = lengths[doc_id]
+                        if length:
+                            scores[doc_id] += weight * tf / (tf + base + per_length * length)
+
+        return heapq.nlargest(max_results, scores.items(), key=lambda item: item[1])
+
+    def documents(self, doc_ids):
+        """Devuelve {doc_id: (ruta, título)} de unos documentos"""
+        if not doc_ids:
+            return {}
+        with self._lock:
+            placeholders = ",".join("?" * len(doc_ids))
+            return {
+                doc_id: (path, title)
+                for doc_id, path, title in self._db.execute(
+                    f"SELECT id, path, title FROM docs WHERE id IN ({placeholders})",
+                    tuple(doc_ids)
+                )
+            }
+
+    def stats(self):
+        """Devuelve el número de documentos, términos y segmentos"""
+        with self._lock:
+            terms = self._db.execute("SELECT COUNT(DISTINCT term) FROM lexicon").fetchone()[0]
+            segments = self._db.execute("SELECT COUNT(*) FROM segments").fetchone()[0]
+        return {"documents": self._doc_count, "terms": terms, "segments": segments}
+
+    def close(self):
+        with self._lock:
+            self._close_maps()
+            self._db.close()
+
+
+def _snippet(text, terms, size=300):
+    """Devuelve el trozo del texto alrededor de la primera palabra buscada"""
+    lowered = text.casefold()
+    positions = [p for p in (lowered.find(t) for t in terms) if p >= 0]
+    start = max(0, min(positions) - size // 3) if positions else 0
+    return " ".join(text[start:start + size].split())
+
+
+class LocalIndexBackend(SearchBackend):
+    """Buscador sobre una carpeta local de documentos (sin internet)"""
+
+    name = "local"
+
+    # El índice ya es rápido y la caché podría devolver documentos antiguos
+    cacheable = False
+
+    def __init__(self, corpus_dir, index_dir=None, update=True):
+        """
+        Abre el índice de una carpeta
+
+        Args:
+            corpus_dir: Carpeta con los documentos (.txt, .md, .html...)
+            index_dir: Dónde guardar el índice (default: en la carpeta de caché)
+            update: Reindexar los archivos cambiados al abrir (default: True)
+        """
+        self.corpus_dir = os.path.abspath(corpus_dir)
+        if index_dir is None:
+            digest = hashlib.sha1(self.corpus_dir.encode("utf-8")).hexdigest()[:12]
+            index_dir = os.path.join(default_cache_dir(), "local_index", digest)
+        self.index = LocalIndex(index_dir)
+        if update:
+            self.refresh()
+
+    def refresh(self):
+        """Reindexa los archivos nuevos, cambiados o borrados"""
+        return self.index.update(self.corpus_dir)
+
+    def search(self, query, max_results=3):
+        hits = self.index.search(query, max_results)
+        documents = self.index.documents([doc_id for doc_id, _ in hits])
+        terms = keywords(query)
+
+        results = []
+        for doc_id, _ in hits:
+            if doc_id not in documents:
+                continue
+            path, title = documents[doc_id]
+            try:
+                text = read_document(path)["text"]
+            except OSError:
+                continue
+            results.append({
+                "title": title,
+                "body": _snippet(text, terms),
+                "href": "file://" + path,
+                "content": text[:MAX_CONTENT],
+            })
+        return results
+
+
+# Prueba rápida
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("build", "search"):
+        print(__doc__)
+        sys.exit(1)
+
+    backend = LocalIndexBackend(sys.argv[2], update=False)
+    if sys.argv[1] == "build":
+        print(f"📚 Indexando {backend.corpus_dir}...")
+        print(f"✅ {backend.refresh()} -> {backend.index.stats()}")
+    else:
+        for i, result in enumerate(backend.search(" ".join(sys.argv[3:]), max_results=5), 1):
+            print(f"{i}. {result['title']}\n   {result['body'][:200]}...\n   🔗 {result['href']}\n")
@@ -0,0 +1,304 @@
+"""
+Modo interactivo del agente (python run_agent.py -i)
+El agente y el modelo se quedan cargados entre preguntas, así que cada
+respuesta solo cuesta la búsqueda y la generación. Mientras se lee una
+respuesta se buscan en segundo plano las preguntas que probablemente
+vengan después ("¿y sus ventajas?", "ejemplos de ..."): si llegan, la
+búsqueda ya está hecha
+
+Comandos:
+    <pregunta>          Investiga (o chatea, según el modo)
+    /research [texto]   Investiga el texto, o vuelve al modo investigación
+    /chat [texto]       Chatea sin búsqueda (recuerda la conversación),
+                        o cambia al modo chat
+    /nuevo              Olvida el tema y la conversación
+    /ayuda              Muestra esta ayuda
+    /salir              Sale (también Ctrl-D)
+"""
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from answer_store import question_features
+from search import SearchBackend, keywords, search_results
+
+
+# Lo que se suele preguntar después de una respuesta
+FOLLOW_UPS = ("ejemplos", "ventajas", "desventajas", "alternativas", "historia")
+
+# Pronombres que solo tienen sentido con lo anterior ("ejemplos de eso").
+# "este", "esta"... no: casi siempre acompañan a un nombre ("esta librería")
+REFERENCES = frozenset("eso esto ello it".split())
+
+# Expresiones que hacen referencia a lo anterior
+REFERENCE_PHRASES = ("lo anterior", "lo mismo")
+
+# Primeras palabras de una pregunta que sigue a la anterior ("¿y en Java?",
+# "¿sus ventajas?")
+LEADING = frozenset("y and su sus its their".split())
+
+# Búsquedas que se precargan después de cada respuesta
+PREFETCH = 4
+
+HELP = __doc__[__doc__.index("Comandos:"):]
+
+
+def is_follow_up(question):
+    """Indica si una pregunta depende de la anterior ("¿y sus ventajas?")"""
+    words = re.findall(r"\w+", question.casefold())
+    if not words:
+        return False
+    if words[0] in LEADING or REFERENCES & set(words):
+        return True
+    text = f" {' '.join(words)} "
+    if any(f" {phrase} " in text for phrase in REFERENCE_PHRASES):
+        return True
+    terms = keywords(question)
+    return bool(terms) and all(t in FOLLOW_UPS for t in terms)
+
+
+def follow_up_queries(topic, answer, asked=(), limit=PREFETCH):
+    """
+    Búsquedas probables después de responder sobre `topic`
+
+    Args:
+        topic: Palabras clave del tema (ej: "python")
+        answer: La respuesta que se acaba de mostrar
+        asked: Palabras ya preguntadas sobre el tema (no se repiten)
+        limit: Búsquedas como máximo
+
+    Returns:
+        Ejemplos, ventajas... (lo que no se haya preguntado ya) y el
+        término que más se repite en la respuesta y no estaba en la
+        pregunta (ej: "python django")
+    """
+    skip = set(topic.split()) | set(asked)
+    counts = Counter(
+        w for w in keywords(answer)
+        if w not in skip and w not in FOLLOW_UPS and len(w) > 3 and not w.isdigit()
+    )
+    terms = [w for w, n in counts.most_common(1) if n >= 2]
+    facets = [f for f in FOLLOW_UPS if f not in skip]
+    return [f"{topic} {word}" for word in facets[:limit - len(terms)] + terms]
+
+
+def _prefetch_key(query, max_results):
+    """Clave de una búsqueda precargada: sus palabras clave en cualquier orden"""
+    return " ".join(sorted(question_features(query)[0].split())), max_results
+
+
+class FollowUpPrefetcher(SearchBackend):
+    """
+    Buscador que responde con búsquedas lanzadas por adelantado
+
+    Envuelve el buscador del agente. Una búsqueda precargada se usa si
+    tiene las mismas palabras clave, aunque estén en otro orden o con
+    otras tildes ("ventajas de Python" y "python ventajas").
+    """
+
+    name = "prefetch"
+
+    def __init__(self, backend=None, use_cache=True, workers=PREFETCH):
+        """
+        Args:
+            backend: Buscador real (default: DuckDuckGo)
+            use_cache: Guardar lo precargado en la caché de búsquedas
+            workers: Búsquedas en segundo plano a la vez
+        """
+        self.backend = backend
+        self.use_cache = use_cache
+        self.cacheable = backend.cacheable if backend is not None else True
+        self.hits = 0
+        self.misses = 0
+        self.last_hit = False
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+
+    def prefetch(self, queries, max_results=3):
+        """Empieza a buscar en segundo plano (olvida lo precargado antes)"""
+        with self._lock:
+            for future in self._pending.values():
+                future.cancel()
+            self._pending = {
+                _prefetch_key(q, max_results): self._executor.submit(
+                    search_results, q, max_results, self.use_cache, self.backend
+                )
+                for q in queries
+            }
+
+    def search(self, query, max_results=3):
+        with self._lock:
+            future = self._pending.pop(_prefetch_key(query, max_results), None)
+        self.last_hit = False
+        if future is not None and not future.cancelled():
+            try:
+                # Si aún no ha terminado, al menos empezó antes
+                results = future.result()
+            except Exception:
+                pass
+            else:
+                self.hits += 1
+                self.last_hit = True
+                return results
+        self.misses += 1
+        return search_results(query, max_results, use_cache=False, backend=self.backend)
+
+    def close(self):
+        with self._lock:
+            for future in self._pending.values():
+                future.cancel()
+            self._pending = {}
+        self._executor.shutdown(wait=False)
+
+
+class Repl:
+    """Bucle de preguntas con el agente siempre cargado"""
+
+    def __init__(self, agent, prefetch=True):
+        """
+        Args:
+            agent: ResearchAgent ya creado
+            prefetch: Buscar por adelantado las preguntas probables
+        """
+        self.agent = agent
+        self.mode = "research"
+        self.topic = ""
+        self.asked = set()
+        self.session = None
+        self.prefetcher = None
+        if prefetch:
+            self.prefetcher = FollowUpPrefetcher(agent.search_backend, agent.search_cache)
+            agent.search_backend = self.prefetcher
+        # Entre pregunta y pregunta el usuario lee: que Ollama no descargue el modelo
+        if agent.keep_alive is None:
+            agent.keep_alive = "30m"
+
+    def _contextualize(self, question):
+        """Añade el tema a las preguntas que dependen de la anterior"""
+        words = keywords(question)
+        topic = set(self.topic.split())
+        if self.topic and is_follow_up(question):
+            self.asked.update(words)
+            return f"{question} (sobre: {self.topic})"
+        if topic and topic < set(words):
+            # Sigue con el mismo tema ("ejemplos de python" tras "¿qué es python?")
+            self.asked.update(set(words) - topic)
+            return question
+        self.topic = " ".join(words)
+        self.asked = set()
+        return question
+
+    def _show(self, chunks):
+        """
+        Muestra una respuesta según llega
+
+        Returns:
+            (respuesta, segundos hasta el primer trozo), o (None, None) si
+            se interrumpió con Ctrl-C
+        """
+        start = time.perf_counter()
+        first = None
+        parts = []
+        try:
+            for text in chunks:
+                if first is None:
+                    first = time.perf_counter() - start
+                    print()
+                print(text, end="", flush=True)
+                parts.append(text)
+        except KeyboardInterrupt:
+            # Cerrar el generador cancela la generación en Ollama
+            chunks.close()
+            print("\n⏹️  Respuesta interrumpida")
+            return None, None
+        print()
+        return "".join(parts), first
+
+    def research(self, question):
+        question = self._contextualize(question)
+        start = time.perf_counter()
+        answer, first = self._show(self.agent.research_stream(question))
+        if answer is None:
+            return
+        timings = self.agent.last_timings
+        line = f"⚡ Primer token: {first or 0:.2f}s | Total: {time.perf_counter() - start:.2f}s"
+        if "search" in timings:
+            line += f" | Búsqueda: {timings['search']:.2f}s"
+            if self.prefetcher is not None and self.prefetcher.last_hit:
+                line += " (precargada)"
+        print(f"\n{line}")
+        if self.prefetcher is not None and self.topic:
+            # Mientras se lee la respuesta
+            self.prefetcher.prefetch(follow_up_queries(self.topic, answer, self.asked))
+
+    def chat(self, message):
+        if self.session is None:
+            self.session = self.agent.session(store_dir=False)
+        self._show(self.session.send_stream(message))
+
+    def handle(self, line):
+        """
+        Atiende una línea del usuario
+
+        Returns:
+            False si hay que salir
+        """
+        line = line.strip()
+        if not line:
+            return True
+        if not line.startswith("/"):
+            if self.mode == "chat":
+                self.chat(line)
+            else:
+                self.research(line)
+            return True
+        command, _, text = line.partition(" ")
+        text = text.strip()
+        if command in ("/salir", "/exit", "/quit"):
+            return False
+        if command in ("/research", "/chat"):
+            if text:
+                (self.chat if command == "/chat" else self.research)(text)
+            else:
+                self.mode = command[1:]
+                print(f"Modo: {self.mode}")
+        elif command == "/nuevo":
+            self.topic = ""
+            self.asked = set()
+            if self.session is not None:
+                self.session.delete()
+                self.session = None
+            print("🧹 Tema y conversación olvidados")
+        elif command == "/ayuda":
+            print(HELP)
+        else:
+            print(f"❓ Comando desconocido: {command} (usa /ayuda)")
+        return True
+
+    def run(self):
+        """Lee preguntas hasta /salir o Ctrl-D"""
+        try:
+            # Historial y edición de línea (no existe en todas las plataformas)
+            import readline  # noqa: F401
+        except ImportError:
+            pass
+        print(f"🤖 Modelo {self.agent.model} listo. Escribe una pregunta o /ayuda")
+        try:
+            while True:
+                prompt = "💬 > " if self.mode == "chat" else "🔍 > "
+                try:
+                    line = input(f"\n{prompt}")
+                except KeyboardInterrupt:
+                    print()
+                    continue
+                if not self.handle(line):
+                    break
+        except EOFError:
+            print()
+        finally:
+            if self.prefetcher is not None:
+                self.prefetcher.close()
+        print("👋 Hasta luego")
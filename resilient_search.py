@@ -0,0 +1,280 @@
+"""
+Búsqueda con varios buscadores que aguanta fallos y lentitud
+Si el buscador principal limita las peticiones, se reintenta con esperas
+aleatorias; si falla muchas veces seguidas, se deja de usar un rato
+(circuit breaker); y si tarda más de lo normal (su p95), se lanza la misma
+búsqueda en el siguiente buscador y se usa la primera que responda
+
+Uso:
+    backend = ResilientSearchBackend([
+        DuckDuckGoBackend("duckduckgo"), DuckDuckGoBackend("brave"),
+    ])
+    agent = ResearchAgent(search_backend=backend)
+"""
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from search import DuckDuckGoBackend, SearchBackend
+from tracing import span
+
+
+# Estados del circuit breaker de cada buscador
+CLOSED = "closed"        # funciona: se usa
+OPEN = "open"            # falla: no se usa hasta que pase reset_seconds
+HALF_OPEN = "half_open"  # a prueba: una búsqueda decide si vuelve o no
+
+
+def is_rate_limit(error):
+    """Indica si un error es un límite de peticiones (ej: RatelimitException de ddgs)"""
+    text = f"{type(error).__name__} {error}".lower()
+    return "ratelimit" in text or "rate limit" in text or "429" in text
+
+
+def _retryable(error):
+    """Errores que pueden salir bien al reintentar (límites, timeouts, red)"""
+    return is_rate_limit(error) or isinstance(error, OSError)
+
+
+def engines_backend(engines, **kwargs):
+    """
+    ResilientSearchBackend con varios buscadores de ddgs
+
+    Args:
+        engines: Nombres en orden de preferencia, en lista o separados
+                 por comas (ej: "duckduckgo,brave,mojeek")
+        **kwargs: Opciones de ResilientSearchBackend
+    """
+    if isinstance(engines, str):
+        engines = [e.strip() for e in engines.split(",") if e.strip()]
+    return ResilientSearchBackend([DuckDuckGoBackend(e) for e in engines], **kwargs)
+
+
+class _Provider:
+    """Un buscador y su estado"""
+
+    def __init__(self, backend, history):
+        self.backend = backend
+        self.name = backend.name
+        self.latencies = deque(maxlen=history)
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial = False
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.hedges = 0
+        self.wins = 0
+
+    def percentile(self, q):
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+
+
+class ResilientSearchBackend(SearchBackend):
+    """
+    Buscador que combina varios con reintentos, circuit breaker y hedging
+
+    Tiene la misma interfaz que cualquier SearchBackend, así que se puede
+    pasar como search_backend a ResearchAgent o a search_results().
+    """
+
+    def __init__(self, backends, retries=2, backoff=0.5, max_backoff=4.0,
+                 failure_threshold=5, reset_seconds=30, hedge=True, hedge_quantile=0.95,
+                 hedge_delay=1.0, min_samples=20, history=200, workers=8, seed=None):
+        """
+        Args:
+            backends: Lista de SearchBackend, en orden de preferencia
+            retries: Reintentos en el mismo buscador si limita las peticiones
+                     o falla la red
+            backoff: Espera base antes del primer reintento; se dobla en cada
+                     uno y se sortea entre 0 y ese valor (jitter)
+            max_backoff: Espera máxima entre reintentos
+            failure_threshold: Fallos seguidos para dejar de usar un buscador
+            reset_seconds: Segundos sin usarlo antes de probarlo otra vez
+            hedge: Lanzar la búsqueda en el siguiente buscador si el primero
+                   tarda más de lo normal (default: True)
+            hedge_quantile: Qué es "más de lo normal" (default: su p95)
+            hedge_delay: Espera antes del hedge mientras no hay latencias
+                         suficientes para calcular el percentil
+            min_samples: Latencias necesarias para usar el percentil
+            history: Latencias recientes que se guardan por buscador
+            workers: Búsquedas simultáneas máximas (entre todos los buscadores)
+            seed: Semilla del jitter (para pruebas reproducibles)
+        """
+        if not backends:
+            raise ValueError("Hace falta al menos un buscador")
+        self.providers = [_Provider(backend, history) for backend in backends]
+        self.name = "+".join(p.name for p in self.providers)
+        self.cacheable = all(backend.cacheable for backend in backends)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_delay = hedge_delay
+        self.min_samples = min_samples
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers,
+                                            thread_name_prefix="resilient-search")
+
+    # --- Circuit breaker ---
+
+    def _admit(self, provider, now):
+        """Indica si se puede usar el buscador (y reserva la prueba si está a prueba)"""
+        if provider.state == OPEN and now - provider.opened_at >= self.reset_seconds:
+            provider.state = HALF_OPEN
+            provider.trial = False
+        if provider.state == HALF_OPEN:
+            # Solo una búsqueda de prueba a la vez
+            if provider.trial:
+                return False
+            provider.trial = True
+            return True
+        return provider.state == CLOSED
+
+    def _succeeded(self, provider, seconds):
+        with self._lock:
+            provider.latencies.append(seconds)
+            provider.failures = 0
+            provider.state = CLOSED
+            provider.trial = False
+
+    def _failed(self, provider):
+        with self._lock:
+            provider.errors += 1
+            provider.failures += 1
+            provider.trial = False
+            if provider.state == HALF_OPEN or provider.failures >= self.failure_threshold:
+                if provider.state != OPEN:
+                    print(f"⚠️  Buscador {provider.name} desactivado "
+                          f"{self.reset_seconds:g}s tras {provider.failures} fallos")
+                provider.state = OPEN
+                provider.opened_at = time.monotonic()
+
+    # --- Búsqueda ---
+
+    def _sleep_before_retry(self, attempt):
+        """Espera exponencial con jitter completo (los clientes no se sincronizan)"""
+        with self._lock:
+            limit = min(self.max_backoff, self.backoff * 2 ** attempt)
+            delay = self._random.uniform(0, limit)
+        time.sleep(delay)
+
+    def _attempt(self, provider, query, max_results):
+        """Busca en un buscador reintentando los fallos pasajeros"""
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            with self._lock:
+                provider.calls += 1
+            try:
+                results = provider.backend.search(query, max_results)
+            except Exception as e:
+                if attempt < self.retries and _retryable(e):
+                    with self._lock:
+                        provider.retries += 1
+                    self._sleep_before_retry(attempt)
+                    attempt += 1
+                    continue
+                self._failed(provider)
+                raise
+            self._succeeded(provider, time.perf_counter() - start)
+            return results
+
+    def _hedge_after(self, provider):
+        """Segundos que se espera a un buscador antes de lanzar el siguiente"""
+        with self._lock:
+            if len(provider.latencies) < self.min_samples:
+                return self.hedge_delay
+            return provider.percentile(self.hedge_quantile)
+
+    def search(self, query, max_results=3):
+        """
+        Busca en el primer buscador disponible, con hedging y failover
+
+        Returns:
+            Los resultados del primer buscador que responda bien
+
+        Raises:
+            La excepción del último buscador si fallan todos
+        """
+        with span("resilient_search", backends=self.name) as s:
+            pending = list(self.providers)
+            running = {}
+            last_error = None
+
+            def launch(hedged):
+                """Lanza la búsqueda en el siguiente buscador disponible (o None)"""
+                while pending:
+                    provider = pending.pop(0)
+                    with self._lock:
+                        if not self._admit(provider, time.monotonic()):
+                            continue
+                        if hedged:
+                            provider.hedges += 1
+                    future = self._executor.submit(self._attempt, provider, query, max_results)
+                    running[future] = provider
+                    return provider
+                return None
+
+            current = launch(False)
+            if current is None:
+                raise ConnectionError(
+                    "Todos los buscadores están desactivados por fallos: " + self.name
+                )
+            while running:
+                # Mientras quede otro buscador, no esperar más que el p95 del actual
+                timeout = self._hedge_after(current) if self.hedge and pending else None
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    current = launch(True) or current
+                    continue
+                for future in done:
+                    provider = running.pop(future)
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    with self._lock:
+                        provider.wins += 1
+                    s.set(backend=provider.name, in_flight=len(running))
+                    # Las demás búsquedas terminan solas en segundo plano
+                    return results
+                if not running:
+                    # Fallaron todas las lanzadas: pasar al siguiente sin esperar
+                    current = launch(False) or current
+            s.set_error(str(last_error))
+            raise last_error
+
+    def stats(self):
+        """Estado, latencias y reintentos de cada buscador"""
+        with self._lock:
+            data = []
+            for p in self.providers:
+                p50, p95 = p.percentile(0.5), p.percentile(0.95)
+                data.append({
+                    "name": p.name,
+                    "state": p.state,
+                    "calls": p.calls,
+                    "errors": p.errors,
+                    "retries": p.retries,
+                    "hedges": p.hedges,
+                    "wins": p.wins,
+                    "p50_seconds": round(p50, 4) if p50 is not None else None,
+                    "p95_seconds": round(p95, 4) if p95 is not None else None,
+                })
+            return data
+
+    def close(self):
+        """Libera los hilos (las búsquedas en curso terminan solas)"""
+        self._executor.shutdown(wait=False)
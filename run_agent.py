@@ -3,26 +3,157 @@ Script para usar el agente desde la línea de comandos
 
 Uso:
     python run_agent.py "Tu pregunta aquí"
+    python run_agent.py --batch preguntas.txt --output respuestas.jsonl
 
 Ejemplo:
     python run_agent.py "¿Qué es machine learning?"
 """
+import argparse
+import atexit
 import sys
+import time
 from agent import ResearchAgent
 
 
+def parse_args():
+    """Lee los argumentos de la línea de comandos"""
+    parser = argparse.ArgumentParser(
+        description="Agente de investigación con Ollama + DuckDuckGo"
+    )
+    parser.add_argument("question", nargs="*", help="La pregunta a investigar")
+    parser.add_argument("--interactive", "-i", action="store_true",
+                        help="Modo interactivo: varias preguntas con el modelo siempre cargado")
+    parser.add_argument("--no-prefetch", action="store_true",
+                        help="En modo interactivo, no buscar por adelantado las preguntas probables")
+    parser.add_argument("--batch", metavar="ARCHIVO",
+                        help="Archivo con una pregunta por línea ('-' para stdin)")
+    parser.add_argument("--output", "-o", metavar="ARCHIVO",
+                        help="Archivo JSONL de salida del lote (default: stdout)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Saltar las preguntas ya respondidas en --output")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="Respuestas que se generan a la vez (default: 2)")
+    parser.add_argument("--search-workers", type=int, default=4,
+                        help="Búsquedas que se hacen a la vez (default: 4)")
+    parser.add_argument("--local", metavar="CARPETA",
+                        help="Buscar en una carpeta de documentos en vez de en internet")
+    parser.add_argument("--search-engines", metavar="LISTA",
+                        help="Buscadores de ddgs separados por comas (ej: duckduckgo,brave); "
+                             "si uno falla o tarda, se usa el siguiente")
+    parser.add_argument("--timeout", type=float, metavar="SEG",
+                        help="Segundos máximos para responder; al acabarse se muestra "
+                             "lo generado hasta entonces (default: sin límite)")
+    parser.add_argument("--reuse-answers", action="store_true",
+                        help="Responder con lo guardado si ya se preguntó algo casi igual")
+    parser.add_argument("--record", metavar="ARCHIVO",
+                        help="Grabar preguntas, búsquedas y respuestas (ej: trafico.jsonl.gz) "
+                             "para reproducirlas después con benchmarks/replay.py")
+    parser.add_argument("--trace", action="store_true",
+                        help="Escribir en stderr la duración de cada etapa (líneas JSON)")
+    return parser.parse_args()
+
+
+def create_agent(args):
+    """Crea el agente con las opciones de la línea de comandos"""
+    search_backend = None
+    if args.local:
+        # Importar aquí: solo hace falta con --local
+        from local_index import LocalIndexBackend
+        search_backend = LocalIndexBackend(args.local)
+    elif args.search_engines:
+        # Importar aquí: solo hace falta con --search-engines
+        from resilient_search import engines_backend
+        search_backend = engines_backend(args.search_engines)
+    agent = ResearchAgent(search_backend=search_backend,
+                          answer_store=args.reuse_answers or None,
+                          timeout=args.timeout)
+    if args.record:
+        # Importar aquí: solo hace falta con --record
+        from cassette import record
+        # Se cierra solo al salir (el archivo se completa aunque se corte con Ctrl-C)
+        atexit.register(record(agent, args.record).close)
+    return agent
+
+
+def batch(args):
+    """Modo lote: responde todas las preguntas de un archivo"""
+    # Importar aquí: solo hace falta con --batch
+    from batch import run_batch
+    
+    if args.resume and not args.output:
+        print("❌ Error: --resume necesita --output", file=sys.stderr)
+        sys.exit(1)
+    
+    # Con la salida en stdout, los mensajes van a stderr
+    log = sys.stderr
+    
+    def progress(record):
+        status = "❌" if "error" in record else "✅"
+        print(f"{status} [{record['index']}] {record['question'][:60]} "
+              f"({record['seconds']:.1f}s)", file=log, flush=True)
+    
+    try:
+        agent = create_agent(args)
+        start = time.perf_counter()
+        answered, failed = run_batch(
+            agent, args.batch, args.output, resume=args.resume,
+            workers=args.workers, search_workers=args.search_workers,
+            progress=progress, timeout=args.timeout
+        )
+    except RuntimeError as e:
+        print(f"\n❌ {e}", file=log)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\n⏸️  Lote interrumpido. Retómalo con --resume", file=log)
+        sys.exit(130)
+    
+    total = time.perf_counter() - start
+    print(f"\n📊 {answered} respondidas, {failed} con error en {total:.1f}s", file=log)
+    if failed:
+        sys.exit(1)
+
+
+def interactive(args):
+    """Modo interactivo: el agente se crea una vez y responde hasta /salir"""
+    # Importar aquí: solo hace falta con -i
+    from repl import Repl
+    
+    try:
+        agent = create_agent(args)
+    except RuntimeError as e:
+        print(f"\n❌ {e}")
+        sys.exit(1)
+    Repl(agent, prefetch=not args.no_prefetch).run()
+
+
 def main():
+    args = parse_args()
+    
+    if args.trace:
+        import tracing
+        tracing.add_hook(tracing.JSONLogExporter(sys.stderr))
+    
+    if args.batch:
+        batch(args)
+        return
+    
+    if args.interactive:
+        interactive(args)
+        return
+    
     # Verificar que se pasó una pregunta
-    if len(sys.argv) < 2:
+    if not args.question:
         print("❌ Error: Debes proporcionar una pregunta")
         print("\nUso:")
         print('   python run_agent.py "Tu pregunta aquí"')
+        print('   python run_agent.py --batch preguntas.txt --output respuestas.jsonl')
+        print('   python run_agent.py -i   (modo interactivo)')
         print("\nEjemplo:")
         print('   python run_agent.py "¿Qué es Python?"')
         sys.exit(1)
     
     # Obtener la pregunta (juntar todos los argumentos)
-    question = " ".join(sys.argv[1:])
+    question = " ".join(args.question)
     
     print("=" * 60)
     print("🤖 AGENTE DE INVESTIGACIÓN")
@@ -31,16 +162,37 @@ def main():
     
     try:
         # Crear el agente
-        agent = ResearchAgent()
+        agent = create_agent(args)
         
-        # Hacer la investigación
-        respuesta = agent.research(question)
+        # Hacer la investigación mostrando la respuesta según se genera
+        start = time.perf_counter()
+        first_token = None
         
-        # Mostrar resultado
-        print("\n" + "=" * 60)
-        print("📝 RESPUESTA")
-        print("=" * 60)
-        print(f"\n{respuesta}\n")
+        for i, token in enumerate(agent.research_stream(question)):
+            if i == 0:
+                first_token = time.perf_counter() - start
+                print("\n" + "=" * 60)
+                print("📝 RESPUESTA")
+                print("=" * 60 + "\n")
+            print(token, end="", flush=True)
+        
+        total = time.perf_counter() - start
+        
+        # Mostrar tiempos
+        print("\n\n" + "=" * 60)
+        if first_token is not None:
+            print(f"⚡ Primer token: {first_token:.2f}s | Total: {total:.2f}s")
+            timings = agent.last_timings
+            if timings.get("timed_out"):
+                print(f"⏱️  Respuesta cortada a los {args.timeout:g}s (--timeout)")
+            elif "saved" in timings:
+                print(f"♻️  Respuesta reutilizada: ahorrados {timings['saved']:.2f}s")
+            elif "load" in timings:
+                print(f"🔍 Búsqueda: {timings['search']:.2f}s | "
+                      f"🧠 Carga del modelo: {timings['load']:.2f}s "
+                      f"({timings['load_saved']:.2f}s mientras se buscaba)")
+        else:
+            print(f"⚠️  El modelo no devolvió respuesta ({total:.2f}s)")
         print("=" * 60)
         
     except RuntimeError as e:
@@ -0,0 +1,191 @@
+"""
+Turnos de acceso a Ollama agrupados por modelo
+Si varios agentes usan modelos distintos sobre el mismo Ollama, cada
+cambio de modelo obliga a descargar uno y cargar otro (segundos en CPU).
+El planificador deja pasar primero las peticiones del modelo que ya está
+cargado y solo cambia de modelo cuando no quedan, o cuando alguien lleva
+esperando más de `max_wait` segundos
+
+Uso:
+    scheduler = ModelScheduler(slots=1, max_wait=5)
+    rapido = ResearchAgent(model="llama3.2:1b", scheduler=scheduler)
+    grande = ResearchAgent(model="llama3.1:8b", scheduler=scheduler, priority="low")
+"""
+import contextlib
+import itertools
+import threading
+import time
+from collections import Counter, deque
+
+from deadline import DeadlineExceeded, remaining
+from tracing import span
+
+
+# Clases de prioridad, de más a menos urgente
+PRIORITIES = ("high", "normal", "low")
+
+
+class _Ticket:
+    """Una petición esperando turno"""
+
+    __slots__ = ("model", "rank", "seq", "enqueued")
+
+    def __init__(self, model, rank, seq):
+        self.model = model
+        self.rank = rank
+        self.seq = seq
+        self.enqueued = time.monotonic()
+
+
+class ModelScheduler:
+    """
+    Da turnos para llamar al modelo agrupando las peticiones por modelo
+
+    Reglas, en orden:
+      1. Si alguien lleva más de `max_wait` segundos esperando, solo pasan
+         las atrasadas: primero las del modelo cargado y después la más
+         antigua (si es de otro modelo, cuando terminen las que están en
+         curso se cambia)
+      2. Si no, van las peticiones del modelo cargado (por prioridad y
+         orden de llegada), hasta `slots` a la vez
+      3. Si no queda ninguna, se cambia al modelo de la petición más urgente
+    """
+
+    def __init__(self, slots=1, max_wait=5.0, history=1000):
+        """
+        Args:
+            slots: Peticiones al modelo a la vez (como OLLAMA_NUM_PARALLEL)
+            max_wait: Segundos máximos que una petición cede su turno a las
+                      del modelo cargado antes de forzar el cambio
+                      (None: sin límite, 0: por orden de llegada)
+            history: Esperas recientes que se guardan para las estadísticas
+        """
+        self.slots = slots
+        self.max_wait = max_wait
+        self.current_model = None
+        self.running = 0
+        self.served = 0
+        self.swaps = 0
+        self.forced = 0
+        self._waiting = []
+        self._waits = deque(maxlen=history)
+        self._served_by_model = Counter()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _pick(self):
+        """La petición que puede empezar ya (o None)"""
+        if self.running >= self.slots or not self._waiting:
+            return None
+        overdue = None
+        if self.max_wait is not None:
+            now = time.monotonic()
+            overdue = [t for t in self._waiting if now - t.enqueued >= self.max_wait]
+        if overdue:
+            # Primero las atrasadas del modelo cargado (sin cambiar de modelo),
+            # luego la más antigua; las que aún pueden esperar, esperan
+            same = [t for t in overdue if t.model == self.current_model]
+            if same:
+                return min(same, key=lambda t: (t.rank, t.seq))
+            if self.running:
+                return None
+            return min(overdue, key=lambda t: t.seq)
+        same = [t for t in self._waiting if t.model == self.current_model]
+        if same:
+            return min(same, key=lambda t: (t.rank, t.seq))
+        if self.running:
+            return None
+        return min(self._waiting, key=lambda t: (t.rank, t.seq))
+
+    def acquire(self, model, priority="normal", deadline=None):
+        """
+        Espera turno para llamar a `model`
+
+        Args:
+            model: Nombre del modelo
+            priority: "high", "normal" o "low"
+            deadline: Instante (time.monotonic()) en que se deja de esperar
+                      y se lanza DeadlineExceeded (default: sin límite)
+
+        Returns:
+            Segundos esperados
+        """
+        if priority not in PRIORITIES:
+            raise ValueError(f"Prioridad desconocida: {priority} (usa {', '.join(PRIORITIES)})")
+        with span("schedule", model=model, priority=priority) as s:
+            with self._cond:
+                ticket = _Ticket(model, PRIORITIES.index(priority), next(self._seq))
+                self._waiting.append(ticket)
+                # Revisar cada poco: max_wait puede cumplirse sin que nadie
+                # llegue ni termine
+                timeout = self.max_wait / 4 if self.max_wait else None
+                while self._pick() is not ticket:
+                    left = remaining(deadline)
+                    if left is not None and left <= 0:
+                        # Sale de la cola: puede que ahora pase otra
+                        self._waiting.remove(ticket)
+                        self._cond.notify_all()
+                        s.set_error("deadline")
+                        raise DeadlineExceeded(
+                            f"⏱️  Se acabó el tiempo esperando turno para {model}"
+                        )
+                    self._cond.wait(timeout if left is None else min(left, timeout or left))
+                self._waiting.remove(ticket)
+                waited = time.monotonic() - ticket.enqueued
+                swap = self.current_model is not None and model != self.current_model
+                if swap:
+                    self.swaps += 1
+                    if self.max_wait is not None and waited >= self.max_wait:
+                        self.forced += 1
+                self.current_model = model
+                self.running += 1
+                self.served += 1
+                self._served_by_model[model] += 1
+                self._waits.append(waited)
+                # Puede que haya sitio para otra del mismo modelo
+                self._cond.notify_all()
+            s.set(wait_seconds=waited, swap=swap)
+        return waited
+
+    def release(self):
+        """Termina un turno"""
+        with self._cond:
+            self.running -= 1
+            self._cond.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self, model, priority="normal", deadline=None):
+        """
+        Turno como bloque with:
+
+            with scheduler.slot("llama3.2"):
+                backend.generate(...)
+        """
+        self.acquire(model, priority, deadline)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self):
+        """Cambios de modelo y tiempos de espera en la cola"""
+        with self._cond:
+            waits = sorted(self._waits)
+            queued = Counter(t.model for t in self._waiting)
+            data = {
+                "model": self.current_model,
+                "running": self.running,
+                "queued": len(self._waiting),
+                "queued_by_model": dict(queued),
+                "served": self.served,
+                "served_by_model": dict(self._served_by_model),
+                "swaps": self.swaps,
+                "forced_swaps": self.forced,
+            }
+        if waits:
+            data["wait_seconds"] = {
+                "p50": round(waits[len(waits) // 2], 4),
+                "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 4),
+                "max": round(waits[-1], 4),
+            }
+        return data
@@ -1,38 +1,437 @@
 """
 Búsqueda web gratuita usando DuckDuckGo
-No requiere API key
+No requiere API key. Otros buscadores se enchufan con SearchBackend
 """
-from ddgs import DDGS
+import re
+from itertools import zip_longest
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
+from cache import SearchCache
+from deadline import DeadlineExceeded, remaining
+from tracing import span
 
-def search_web(query, max_results=3):
+
+# Búsquedas simultáneas máximas (versión asíncrona y búsquedas múltiples)
+SEARCH_WORKERS = 8
+
+# Caracteres de cada página descargada que se incluyen en los resultados
+CONTENT_CHARS = 1500
+
+_search_cache = None
+_search_executor = None
+
+
+def get_search_cache():
     """
-    Busca en internet usando DuckDuckGo (gratis, sin API key)
+    Devuelve la caché de búsquedas compartida (se crea la primera vez)
+
+    Returns:
+        La SearchCache, o None si no se pudo abrir (ej: disco de solo lectura)
+    """
+    global _search_cache
+    if _search_cache is None:
+        try:
+            _search_cache = SearchCache()
+        except Exception:
+            return None
+    return _search_cache
+
+
+class SearchBackend:
+    """
+    Interfaz de un buscador
+
+    Para añadir otro buscador, hereda de esta clase e implementa search().
+    """
+    
+    name = "base"
+    
+    # Si sus resultados se pueden guardar en la caché de búsquedas
+    cacheable = True
+    
+    def search(self, query, max_results=3):
+        """
+        Busca y devuelve los resultados
+        
+        Returns:
+            Lista de diccionarios con 'title', 'body' y 'href'
+            (y opcionalmente 'content' con el texto completo)
+        """
+        raise NotImplementedError
+
+
+class DuckDuckGoBackend(SearchBackend):
+    """Búsqueda web en DuckDuckGo (gratis, sin API key)"""
+    
+    name = "duckduckgo"
+    
+    def __init__(self, engine=None):
+        """
+        Args:
+            engine: Buscador que usa ddgs por debajo ("duckduckgo", "brave",
+                    "bing", "mojeek"...; default: el que elija ddgs). Con
+                    varios se puede combinar en ResilientSearchBackend
+        """
+        self.engine = engine
+        if engine:
+            self.name = engine
+    
+    def search(self, query, max_results=3):
+        # ddgs tarda en importarse: solo se carga en la primera búsqueda
+        from ddgs import DDGS
+        ddgs = DDGS()
+        kwargs = {"backend": self.engine} if self.engine else {}
+        return [
+            {"title": r["title"], "body": r["body"], "href": r["href"]}
+            for r in ddgs.text(query, max_results=max_results, **kwargs)
+        ]
+
+
+_default_backend = DuckDuckGoBackend()
+
+
+def set_default_backend(backend):
+    """Cambia el buscador que se usa cuando no se indica ninguno"""
+    global _default_backend
+    _default_backend = backend
+
+
+def search_results(query, max_results=3, use_cache=True, backend=None, deadline=None):
+    """
+    Busca y devuelve los resultados sin formatear
     
     Args:
         query: Lo que quieres buscar
         max_results: Cuántos resultados quieres (default: 3)
+        use_cache: Usar la caché de búsquedas (default: True)
+        backend: Buscador a usar (default: DuckDuckGo)
+        deadline: Instante (time.monotonic()) a partir del cual se deja de
+                  esperar al buscador y se lanza DeadlineExceeded
+                  (default: sin límite)
     
     Returns:
-        String con los resultados formateados
+        Lista de diccionarios con 'title', 'body' y 'href'
     """
-    try:
-        ddgs = DDGS()
-        results = list(ddgs.text(query, max_results=max_results))
+    backend = backend or _default_backend
+    with span("web_search", backend=backend.name) as s:
+        cache = get_search_cache() if use_cache and backend.cacheable else None
+        if cache is not None:
+            cached = cache.get(query, max_results)
+            s.set(cache_hit=cached is not None)
+            if cached is not None:
+                s.set(results=len(cached))
+                return cached
         
-        if not results:
-            return "No se encontraron resultados."
+        if deadline is None:
+            results = backend.search(query, max_results)
+        else:
+            results = _search_until(backend, query, max_results, deadline)
+        s.set(results=len(results))
         
-        # Formatear resultados
-        output = f"\n🔍 Resultados de búsqueda para: '{query}'\n"
-        output += "=" * 60 + "\n\n"
+        # No guardar búsquedas vacías: suelen ser fallos temporales
+        if cache is not None and results:
+            cache.set(query, max_results, results)
         
-        for i, result in enumerate(results, 1):
-            output += f"{i}. {result['title']}\n"
+        return results
+
+
+def _get_search_executor():
+    """Hilos compartidos para búsquedas en paralelo (ddgs es bloqueante)"""
+    global _search_executor
+    if _search_executor is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _search_executor = ThreadPoolExecutor(
+            max_workers=SEARCH_WORKERS, thread_name_prefix="search"
+        )
+    return _search_executor
+
+
+def _search_until(backend, query, max_results, deadline):
+    """backend.search() esperando como mucho hasta el deadline"""
+    from concurrent.futures import TimeoutError as FutureTimeout
+    left = remaining(deadline)
+    if left <= 0:
+        raise DeadlineExceeded("⏱️  Se acabó el tiempo antes de buscar")
+    # El buscador no se puede interrumpir: se deja terminar en su hilo
+    # mientras la petición sigue sin sus resultados
+    future = _get_search_executor().submit(backend.search, query, max_results)
+    try:
+        return future.result(timeout=left)
+    except FutureTimeout:
+        future.cancel()
+        raise DeadlineExceeded(f"⏱️  El buscador no respondió a tiempo ({left:.1f}s)")
+
+
+async def search_results_async(query, max_results=3, use_cache=True, backend=None):
+    """
+    Versión asyncio de search_results()
+    
+    Los aciertos de caché se resuelven sin cambiar de hilo; las búsquedas
+    reales se hacen en un pool de hilos limitado para no bloquear el
+    event loop ni lanzar miles de peticiones a la vez.
+    """
+    backend = backend or _default_backend
+    cache = get_search_cache() if use_cache and backend.cacheable else None
+    if cache is not None:
+        cached = cache.get(query, max_results)
+        if cached is not None:
+            return cached
+    
+    import asyncio
+    loop = asyncio.get_running_loop()
+    results = await loop.run_in_executor(
+        _get_search_executor(), backend.search, query, max_results
+    )
+    
+    if cache is not None and results:
+        cache.set(query, max_results, results)
+    
+    return results
+
+
+# Palabras que no aportan a una búsqueda por palabras clave
+STOPWORDS = frozenset("""
+a al algo algún alguna algunas alguno algunos ante cómo como con cuál cuáles
+cual cuales cuándo cuando cuánto cuanto de del donde dónde el ella ellas ellos en entre era es
+esa esas ese eso esos esta estas este esto estos explica explícame fue ha hay
+la las le les lo los más me mi mis muy no nos o para pero por qué que quién
+quien se sea ser si sí sin sobre son su sus también te tiene tu un una unas
+uno unos y ya
+about an and are as at be by can does for from how in is it of on or the
+this to was what when where which who why with
+""".split())
+
+# Parámetros de URL que solo sirven para seguimiento: estos nombres exactos
+# y los que empiezan por TRACKING_PREFIX ("reference" o "ref_id" sí cuentan)
+TRACKING_PARAMS = frozenset(("fbclid", "gclid", "ref", "ref_src", "mc_cid", "mc_eid"))
+TRACKING_PREFIX = "utm_"
+
+
+def _words(text):
+    """Separa un texto en palabras en minúsculas, sin puntuación"""
+    return re.findall(r"\w+", text.casefold())
+
+
+def keywords(text):
+    """Devuelve las palabras clave de un texto (sin palabras vacías)"""
+    return [w for w in _words(text) if w not in STOPWORDS and len(w) > 1]
+
+
+def query_variants(question, max_variants=4):
+    """
+    Genera variantes de búsqueda para una pregunta
+
+    Además de la pregunta original, prueba con solo las palabras clave y
+    con las subpreguntas si compara o enumera varias cosas
+    (ej: "diferencias entre Python y Java" -> "python", "java").
+
+    Args:
+        question: La pregunta del usuario
+        max_variants: Máximo de variantes (incluida la original)
+
+    Returns:
+        Lista de búsquedas distintas, la original primero
+    """
+    variants = [question.strip()]
+
+    key = " ".join(keywords(question))
+    if key:
+        variants.append(key)
+
+    # Subpreguntas: partes unidas por "y", "vs", "o", comas...
+    parts = re.split(r"\s*(?:,|;|\by\b|\be\b|\bvs\.?|\bversus\b|\band\b|\bor\b|\bo\b)\s*",
+                     question, flags=re.IGNORECASE)
+    parts = [" ".join(keywords(p)) for p in parts]
+    parts = [p for p in parts if p]
+    if len(parts) > 1:
+        variants.extend(parts)
+
+    unique = []
+    seen = set()
+    for variant in variants:
+        normalized = " ".join(variant.casefold().split())
+        if normalized and normalized not in seen:
+            seen.add(normalized)
+            unique.append(variant)
+    return unique[:max_variants]
+
+
+def _is_tracking(param):
+    name = param.casefold()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIX)
+
+
+def canonicalize_url(url):
+    """
+    Normaliza una URL para detectar duplicados
+
+    Ignora http/https, 'www.', el fragmento (#...), la barra final
+    y los parámetros de seguimiento (utm_*, fbclid...).
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").casefold()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking(k)
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("https", host, path, urlencode(query), ""))
+
+
+def _shingles(text, size=3):
+    """Grupos de `size` palabras seguidas, para comparar textos"""
+    words = _words(text)
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def dedupe_results(results, threshold=0.7):
+    """
+    Quita resultados repetidos
+
+    Un resultado se descarta si su URL canónica ya apareció, o si su
+    texto es casi igual (similitud de Jaccard >= threshold) al de uno anterior.
+
+    Args:
+        results: Lista de resultados, en orden de preferencia
+        threshold: Similitud a partir de la cual dos textos son duplicados
+
+    Returns:
+        Lista de resultados sin duplicados, en el mismo orden
+    """
+    unique = []
+    seen_urls = set()
+    seen_shingles = []
+    for result in results:
+        url = canonicalize_url(result["href"])
+        if url in seen_urls:
+            continue
+        shingles = _shingles(result["body"])
+        if shingles and any(
+            len(shingles & other) / len(shingles | other) >= threshold
+            for other in seen_shingles
+        ):
+            continue
+        seen_urls.add(url)
+        seen_shingles.append(shingles)
+        unique.append(result)
+    return unique
+
+
+def search_many(queries, max_results=3, use_cache=True, max_total=None, backend=None,
+                deadline=None):
+    """
+    Hace varias búsquedas a la vez y mezcla los resultados sin duplicados
+
+    El tiempo total es el de la búsqueda más lenta, no la suma.
+    Las búsquedas que fallan se ignoran si alguna otra funciona, y con
+    `deadline` las que no terminan a tiempo también.
+
+    Args:
+        queries: Lista de búsquedas (ej: de query_variants())
+        max_results: Resultados por búsqueda
+        use_cache: Usar la caché de búsquedas
+        max_total: Máximo de resultados tras mezclar (default: sin límite)
+        backend: Buscador a usar (default: DuckDuckGo)
+        deadline: Instante (time.monotonic()) en que se usan las búsquedas
+                  terminadas hasta entonces (default: esperar a todas)
+
+    Returns:
+        Lista de resultados: primero el mejor de cada búsqueda, luego el
+        segundo de cada una, etc.
+    """
+    executor = _get_search_executor()
+    futures = [
+        executor.submit(search_results, q, max_results, use_cache, backend) for q in queries
+    ]
+    if deadline is not None:
+        from concurrent.futures import wait
+        done, _ = wait(futures, timeout=remaining(deadline))
+        futures = [f for f in futures if f in done]
+        if not futures:
+            raise DeadlineExceeded("⏱️  Ninguna búsqueda terminó a tiempo")
+
+    ranked = []
+    errors = []
+    for future in futures:
+        try:
+            ranked.append(future.result())
+        except Exception as e:
+            errors.append(e)
+    if errors and not ranked:
+        raise errors[0]
+
+    merged = [r for group in zip_longest(*ranked) for r in group if r is not None]
+    merged = dedupe_results(merged)
+    return merged[:max_total] if max_total else merged
+
+
+def format_results(query, results):
+    """
+    Formatea resultados de búsqueda como texto para el modelo
+    
+    Args:
+        query: La búsqueda que se hizo
+        results: Lista de resultados de search_results()
+    
+    Returns:
+        String con los resultados formateados
+    """
+    if not results:
+        return "No se encontraron resultados."
+    
+    output = f"\n🔍 Resultados de búsqueda para: '{query}'\n"
+    output += "=" * 60 + "\n\n"
+    
+    for i, result in enumerate(results, 1):
+        output += f"{i}. {result['title']}\n"
+        if result.get("content"):
+            # Texto de la página descargada (ver fetch.py)
+            output += f"   {result['content'][:CONTENT_CHARS]}...\n"
+        else:
             output += f"   {result['body'][:200]}...\n"
-            output += f"   🔗 {result['href']}\n\n"
+        output += f"   🔗 {result['href']}\n\n"
+    
+    return output
+
+
+def search_web(query, max_results=3, use_cache=True, backend=None, deadline=None):
+    """
+    Busca en internet usando DuckDuckGo (gratis, sin API key)
+    
+    Args:
+        query: Lo que quieres buscar
+        max_results: Cuántos resultados quieres (default: 3)
+        use_cache: Usar la caché de búsquedas (default: True)
+        backend: Buscador a usar (default: DuckDuckGo)
+        deadline: Instante (time.monotonic()) límite para la búsqueda
+    
+    Returns:
+        String con los resultados formateados
+    """
+    try:
+        results = search_results(query, max_results, use_cache, backend, deadline)
+        return format_results(query, results)
         
-        return output
+    except Exception as e:
+        return f"Error en la búsqueda: {str(e)}"
+
+
+async def search_web_async(query, max_results=3, use_cache=True, backend=None):
+    """
+    Versión asyncio de search_web()
+    
+    Returns:
+        String con los resultados formateados
+    """
+    try:
+        results = await search_results_async(query, max_results, use_cache, backend)
+        return format_results(query, results)
         
     except Exception as e:
         return f"Error en la búsqueda: {str(e)}"
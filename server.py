@@ -0,0 +1,422 @@
+"""
+Servidor HTTP del agente de investigación
+Mantiene el agente (y el modelo) cargado entre peticiones y limita
+cuántas llegan a Ollama; si hay demasiadas, responde 429/503 al momento
+en vez de acumular esperas
+
+Endpoints:
+    POST /research  {"question": "...", "stream": false, "timeout": 30}
+    POST /chat      {"message": "...", "stream": false, "session": "id opcional"}
+    GET  /health
+    GET  /metrics   (formato Prometheus)
+
+Con "stream": true la respuesta es NDJSON: una línea {"response": "..."}
+por trozo y una última {"done": true, ...}.
+
+Con "session" el chat recuerda los mensajes anteriores con ese id
+(ver session.py); las conversaciones se guardan en disco y sobreviven
+a un reinicio del servidor.
+
+Con "timeout" (segundos, contando la espera en la cola) la generación
+se corta al acabarse y se responde con lo generado hasta entonces.
+
+Con --record se graban las preguntas, las búsquedas y las respuestas de
+Ollama (ver cassette.py); con --replay se sirve una grabación sin
+internet ni Ollama, para comparar versiones con el mismo tráfico.
+
+Ejecuta: python server.py --port 8000 --workers 2 --queue 16
+"""
+import argparse
+import json
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import tracing
+
+
+# Tamaño máximo del cuerpo de una petición
+MAX_BODY_BYTES = 1024 * 1024
+
+# Conversaciones que se mantienen en memoria (las demás se leen del disco)
+MAX_SESSIONS = 256
+
+
+class Admission:
+    """
+    Control de entrada: `workers` peticiones a la vez y hasta `queue_size`
+    esperando turno; el resto se rechaza sin esperar
+    """
+
+    def __init__(self, workers=2, queue_size=16):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout=None):
+        """
+        Espera turno
+
+        Args:
+            timeout: Segundos máximos en la cola (default: sin límite)
+
+        Returns:
+            "ok", "full" (cola llena) o "timeout" (demasiado tiempo en la cola)
+        """
+        with self._cond:
+            if self.active >= self.workers and self.waiting >= self.queue_size:
+                self.rejected += 1
+                return "full"
+            self.waiting += 1
+            try:
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while self.active >= self.workers:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        self.timed_out += 1
+                        return "timeout"
+                    self._cond.wait(remaining)
+                self.active += 1
+                return "ok"
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        """Libera el turno para la siguiente petición de la cola"""
+        with self._cond:
+            self.active -= 1
+            self._cond.notify()
+
+
+class ResearchServer(ThreadingHTTPServer):
+    """Servidor HTTP con un ResearchAgent compartido"""
+
+    daemon_threads = True
+    # Conexiones pendientes de aceptar (el default de socketserver, 5, hace que
+    # los picos de clientes reciban "connection reset" en vez de un 429)
+    request_queue_size = 128
+
+    def __init__(self, agent, host="127.0.0.1", port=8000, workers=2, queue_size=16,
+                 queue_timeout=30, timeout=None):
+        """
+        Args:
+            agent: ResearchAgent ya creado (se reutiliza en todas las peticiones)
+            host: Dirección en la que escuchar
+            port: Puerto (0 para uno libre)
+            workers: Peticiones que se atienden a la vez (hacia Ollama)
+            queue_size: Peticiones que pueden esperar turno; más allá, 429
+            queue_timeout: Segundos máximos esperando turno; después, 503
+            timeout: Segundos máximos por petición si no indica "timeout"
+                     (default: None, el del agente)
+        """
+        self.agent = agent
+        self.admission = Admission(workers, queue_size)
+        self.queue_timeout = queue_timeout
+        self.timeout = timeout
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self.metrics = tracing.PrometheusExporter()
+        tracing.add_hook(self.metrics)
+        super().__init__((host, port), _Handler)
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Atiende peticiones en un hilo aparte y devuelve el servidor"""
+        threading.Thread(target=self.serve_forever, name="server", daemon=True).start()
+        return self
+
+    def stop(self):
+        """Deja de atender peticiones y quita las métricas"""
+        self.shutdown()
+        self.server_close()
+        tracing.remove_hook(self.metrics)
+
+    def session(self, session_id):
+        """La conversación con ese id (de memoria, del disco o nueva)"""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+                return session
+        session = self.agent.session(session_id)
+        with self._lock:
+            # Si otro hilo la abrió a la vez, usar la suya
+            session = self._sessions.setdefault(session_id, session)
+            while len(self._sessions) > MAX_SESSIONS:
+                self._sessions.popitem(last=False)
+        return session
+
+    def render_metrics(self):
+        """Métricas del agente más las de la cola del servidor"""
+        admission = self.admission
+        lines = [
+            "# HELP deepagents_server_requests_total Peticiones recibidas",
+            "# TYPE deepagents_server_requests_total counter",
+            f"deepagents_server_requests_total {self.requests}",
+            "# HELP deepagents_server_rejected_total Peticiones rechazadas",
+            "# TYPE deepagents_server_rejected_total counter",
+            f'deepagents_server_rejected_total{{reason="queue_full"}} {admission.rejected}',
+            f'deepagents_server_rejected_total{{reason="queue_timeout"}} {admission.timed_out}',
+            "# HELP deepagents_server_active Peticiones en curso",
+            "# TYPE deepagents_server_active gauge",
+            f"deepagents_server_active {admission.active}",
+            "# HELP deepagents_server_queued Peticiones esperando turno",
+            "# TYPE deepagents_server_queued gauge",
+            f"deepagents_server_queued {admission.waiting}",
+        ]
+        return self.metrics.render() + "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    # Cortar clientes que no terminan de enviar la petición
+    timeout = 30
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        """Lee el cuerpo JSON (o responde el error y devuelve None)"""
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self.close_connection = True
+            self._send_json(413, {"error": "Petición demasiado grande"})
+            return None
+        try:
+            data = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "El cuerpo debe ser JSON"})
+            return None
+        if not isinstance(data, dict):
+            self._send_json(400, {"error": "El cuerpo debe ser un objeto JSON"})
+            return None
+        return data
+
+    def do_GET(self):
+        server = self.server
+        if self.path == "/health":
+            admission = server.admission
+            health = {
+                "status": "ok",
+                "model": server.agent.model,
+                "active": admission.active,
+                "queued": admission.waiting,
+                "workers": admission.workers,
+                "queue_size": admission.queue_size,
+            }
+            if server.agent.answer_store is not None:
+                # Respuestas reutilizadas y tiempo de generación ahorrado
+                health["answer_store"] = server.agent.answer_store.stats()
+            if hasattr(server.agent.backend, "stats"):
+                # Varios servidores de Ollama: estado de cada uno
+                health["ollama"] = server.agent.backend.stats()
+            if hasattr(server.agent.search_backend, "stats"):
+                # Varios buscadores: circuit breaker y latencias de cada uno
+                health["search"] = server.agent.search_backend.stats()
+            self._send_json(200, health)
+        elif self.path == "/metrics":
+            body = server.render_metrics().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self._send_json(404, {"error": "No existe"})
+
+    def do_POST(self):
+        server = self.server
+        if self.path == "/research":
+            field, run, run_stream = ("question", server.agent.research,
+                                      server.agent.research_stream)
+        elif self.path == "/chat":
+            field, run, run_stream = ("message", server.agent.chat, server.agent.chat_stream)
+        else:
+            self._send_json(404, {"error": "No existe"})
+            return
+
+        data = self._read_json()
+        if data is None:
+            return
+        text = data.get(field)
+        if not isinstance(text, str) or not text.strip():
+            self._send_json(400, {"error": f"Falta '{field}'"})
+            return
+        timeout = data.get("timeout", server.timeout)
+        if timeout is not None and (
+            isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0
+        ):
+            self._send_json(400, {"error": "'timeout' debe ser un número de segundos"})
+            return
+        session_id = data.get("session") if self.path == "/chat" else None
+        if session_id is not None:
+            try:
+                session = server.session(session_id)
+            except (TypeError, ValueError):
+                self._send_json(400, {"error": "'session' no válido (letras, números, - y _)"})
+                return
+            run, run_stream = session.send, session.send_stream
+
+        with server._lock:
+            server.requests += 1
+
+        start = time.perf_counter()
+        status = server.admission.acquire(server.queue_timeout)
+        if status == "full":
+            self._send_json(429, {"error": "Demasiadas peticiones, prueba más tarde"},
+                            {"Retry-After": "1"})
+            return
+        if status == "timeout":
+            self._send_json(503, {"error": "El servidor está ocupado, prueba más tarde"},
+                            {"Retry-After": "5"})
+            return
+
+        try:
+            queued = time.perf_counter() - start
+            if timeout is not None:
+                # El tiempo en la cola también cuenta
+                timeout = max(0.001, timeout - queued)
+            if data.get("stream"):
+                self._stream(run_stream(text, timeout), start, queued)
+            else:
+                try:
+                    answer = run(text, timeout)
+                except Exception as e:
+                    self._send_json(500, {"error": str(e)})
+                    return
+                self._send_json(200, {
+                    "response": answer,
+                    "queue_seconds": round(queued, 4),
+                    "seconds": round(time.perf_counter() - start, 4),
+                })
+        finally:
+            server.admission.release()
+
+    def _stream(self, chunks, start, queued):
+        """Envía la respuesta trozo a trozo (NDJSON con chunked encoding)"""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for text in chunks:
+                self._write_chunk({"response": text, "done": False})
+            self._write_chunk({
+                "response": "", "done": True,
+                "queue_seconds": round(queued, 4),
+                "seconds": round(time.perf_counter() - start, 4),
+            })
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # El cliente se fue: cerrar el generador cancela la generación en Ollama
+            self.close_connection = True
+        finally:
+            chunks.close()
+
+    def _write_chunk(self, data):
+        line = (json.dumps(data, ensure_ascii=False) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor HTTP del agente de investigación")
+    parser.add_argument("--host", default="127.0.0.1", help="Dirección (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="Puerto (default: 8000)")
+    parser.add_argument("--model", help="Modelo de Ollama (default: auto-detectar)")
+    parser.add_argument("--ollama", action="append", metavar="URL",
+                        help="Servidor de Ollama; repítelo para repartir entre varios "
+                             "(default: $OLLAMA_HOST o http://localhost:11434)")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="Peticiones atendidas a la vez (default: 2)")
+    parser.add_argument("--queue", type=int, default=16,
+                        help="Peticiones en espera antes de responder 429 (default: 16)")
+    parser.add_argument("--queue-timeout", type=float, default=30,
+                        help="Segundos máximos en la cola antes de responder 503 (default: 30)")
+    parser.add_argument("--keep-alive", default="30m",
+                        help="Tiempo que Ollama mantiene el modelo cargado (default: 30m)")
+    parser.add_argument("--search-engines", metavar="LISTA",
+                        help="Buscadores de ddgs separados por comas (ej: duckduckgo,brave); "
+                             "si uno falla o tarda, se usa el siguiente")
+    parser.add_argument("--timeout", type=float, metavar="SEG",
+                        help="Segundos máximos por pregunta; después se responde con lo "
+                             "generado hasta entonces (default: sin límite)")
+    parser.add_argument("--reuse-answers", action="store_true",
+                        help="Responder con lo guardado si ya se preguntó algo casi igual")
+    parser.add_argument("--local", metavar="CARPETA",
+                        help="Buscar en una carpeta de documentos en vez de en internet")
+    parser.add_argument("--record", metavar="ARCHIVO",
+                        help="Grabar preguntas, búsquedas y respuestas (ej: trafico.jsonl.gz)")
+    parser.add_argument("--replay", metavar="ARCHIVO",
+                        help="Responder con una grabación, sin internet ni Ollama")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                        help="Velocidad de --replay (default: 1, la grabada; 0 = sin esperas)")
+    args = parser.parse_args()
+
+    from agent import ResearchAgent
+
+    search_backend = None
+    if args.local:
+        from local_index import LocalIndexBackend
+        search_backend = LocalIndexBackend(args.local)
+    elif args.search_engines:
+        from resilient_search import engines_backend
+        search_backend = engines_backend(args.search_engines)
+
+    recorder = None
+    try:
+        if args.replay:
+            from cassette import replay_agent
+            agent, _ = replay_agent(args.replay, speed=args.replay_speed, model=args.model,
+                                    answer_store=args.reuse_answers or None)
+        else:
+            host = args.ollama[0] if args.ollama and len(args.ollama) == 1 else args.ollama
+            agent = ResearchAgent(model=args.model, host=host, search_backend=search_backend,
+                                  keep_alive=args.keep_alive,
+                                  answer_store=args.reuse_answers or None)
+        if args.record:
+            from cassette import record
+            recorder = record(agent, args.record)
+    except (RuntimeError, OSError, ValueError) as e:
+        print(f"\n{e}")
+        raise SystemExit(1)
+
+    server = ResearchServer(agent, args.host, args.port, workers=args.workers,
+                            queue_size=args.queue, queue_timeout=args.queue_timeout,
+                            timeout=args.timeout)
+    print(f"🚀 Servidor en {server.url} (modelo: {agent.model}, "
+          f"{args.workers} a la vez, cola de {args.queue})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Parando el servidor")
+    finally:
+        server.server_close()
+        if recorder is not None:
+            recorder.close()
+            print(f"📼 {recorder.events} eventos grabados en {args.record}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+Conversaciones de varios turnos con el modelo
+En vez de reenviar toda la conversación en cada turno, se reutiliza el
+`context` que devuelve Ollama: cada turno solo paga los tokens nuevos.
+Cuando la conversación se acerca a la ventana del modelo, los turnos
+antiguos se resumen (o se descartan), y la sesión se guarda en disco
+para retomarla después de reiniciar
+
+Uso:
+    session = agent.session("usuario-42")
+    session.send("Hola, me llamo Ana")
+    session.send("¿Cómo me llamo?")
+"""
+import json
+import os
+import re
+import threading
+import time
+import uuid
+
+from agent import _stats
+from cache import default_cache_dir
+from context import CHARS_PER_TOKEN, estimate_tokens, model_num_ctx
+from deadline import DeadlineExceeded, exceeded_message, incomplete_message
+
+
+# Identificadores válidos (también son el nombre del archivo)
+SESSION_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+SUMMARY_PROMPT = """Resume en pocas frases la siguiente conversación entre un usuario y un asistente.
+Conserva los datos concretos (nombres, cifras, decisiones) que puedan hacer falta más adelante.
+
+{summary}{transcript}
+
+Resumen:"""
+
+
+def _transcript(turns):
+    """Los turnos como texto ('Usuario: ...' / 'Asistente: ...')"""
+    names = {"user": "Usuario", "assistant": "Asistente"}
+    return "\n".join(f"{names[t['role']]}: {t['content']}" for t in turns)
+
+
+class ChatSession:
+    """
+    Una conversación con el modelo que recuerda los turnos anteriores
+
+    Atributos:
+        session_id: Identificador (y nombre del archivo en disco)
+        turns: Turnos desde el último resumen [{'role', 'content'}]
+        summary: Resumen de los turnos anteriores ("" si no hay)
+        context: Tokens de la conversación que devolvió Ollama
+                 (None si hay que volver a enviarla como texto)
+        last_stats: Estadísticas del último turno (prompt_eval_count...)
+    """
+
+    def __init__(self, agent, session_id=None, store_dir=None, max_tokens=None,
+                 keep_turns=2, summarize=True):
+        """
+        Args:
+            agent: ResearchAgent (se usan su backend, modelo y opciones)
+            session_id: Identificador; si ya hay una sesión guardada con
+                        ese id se retoma (default: uno nuevo)
+            store_dir: Carpeta donde guardar la sesión, o False para no
+                       guardarla (default: <carpeta de caché>/sessions)
+            max_tokens: Tokens a partir de los cuales se compacta la
+                        conversación (default: 3/4 de la ventana del modelo)
+            keep_turns: Pares pregunta/respuesta recientes que se conservan
+                        enteros al compactar
+            summarize: Resumir los turnos antiguos con el modelo; si es
+                       False simplemente se descartan
+        """
+        if session_id is None:
+            session_id = uuid.uuid4().hex
+        if not SESSION_ID.match(session_id):
+            raise ValueError(f"Identificador de sesión no válido: {session_id!r}")
+        self.agent = agent
+        self.session_id = session_id
+        self.keep_turns = keep_turns
+        self.summarize = summarize
+        if max_tokens is None:
+            max_tokens = model_num_ctx(agent.backend, agent.model, agent.options) * 3 // 4
+        self.max_tokens = max_tokens
+        self.turns = []
+        self.summary = ""
+        self.context = None
+        self.tokens = 0
+        self.compactions = 0
+        self.last_stats = {}
+        self._lock = threading.Lock()
+
+        self.path = None
+        if store_dir is not False:
+            store_dir = store_dir or os.path.join(default_cache_dir(), "sessions")
+            os.makedirs(store_dir, exist_ok=True)
+            self.path = os.path.join(store_dir, f"{session_id}.json")
+            self._load()
+
+    # --- Disco ---
+
+    def _load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.turns = data.get("turns", [])
+        self.summary = data.get("summary", "")
+        self.tokens = data.get("tokens", 0)
+        self.compactions = data.get("compactions", 0)
+        # Los tokens del context solo valen para el mismo modelo
+        if data.get("model") == self.agent.model:
+            self.context = data.get("context")
+
+    def save(self):
+        """Guarda la sesión en disco (lo hace solo después de cada turno)"""
+        if self.path is None:
+            return
+        data = {
+            "id": self.session_id,
+            "model": self.agent.model,
+            "summary": self.summary,
+            "turns": self.turns,
+            "context": self.context,
+            "tokens": self.tokens,
+            "compactions": self.compactions,
+            "updated": time.time(),
+        }
+        # Escribir a un temporal y renombrar: nunca queda un JSON a medias
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+    def delete(self):
+        """Olvida la conversación y borra el archivo"""
+        with self._lock:
+            self.turns, self.summary, self.context, self.tokens = [], "", None, 0
+            if self.path is not None:
+                try:
+                    os.remove(self.path)
+                except FileNotFoundError:
+                    pass
+
+    # --- Turnos ---
+
+    def _request(self, message):
+        """Prompt y campos extra del siguiente turno"""
+        extra = self.agent._extra()
+        if self.context:
+            extra["context"] = self.context
+            return message, extra
+        if not self.turns and not self.summary:
+            return message, extra
+        # Sin context (sesión nueva tras compactar, otro modelo o `ollama run`):
+        # la conversación va como texto, ya acotada por _compact()
+        history = ""
+        if self.summary:
+            history += f"Resumen de la conversación anterior: {self.summary}\n\n"
+        if self.turns:
+            history += _transcript(self.turns) + "\n\n"
+        return f"{history}Usuario: {message}\nAsistente:", extra
+
+    def _finish(self, message, response, result):
+        """Apunta el turno, compacta si hace falta y guarda"""
+        self.turns.append({"role": "user", "content": message})
+        self.turns.append({"role": "assistant", "content": response})
+        self.context = result.get("context") or None
+        if self.context:
+            self.tokens = len(self.context)
+        else:
+            self.tokens = estimate_tokens(self.summary + _transcript(self.turns))
+        if self.tokens > self.max_tokens:
+            self._compact()
+        self.save()
+
+    def _compact(self):
+        """Resume (o descarta) los turnos antiguos y empieza un context nuevo"""
+        turns = self.turns
+        split = max(0, len(turns) - self.keep_turns * 2)
+        # Dejar sitio para varios turnos más: si los recientes ya ocupan
+        # media ventana, también van al resumen
+        while split < len(turns) and (
+            estimate_tokens(_transcript(turns[split:])) > self.max_tokens // 2
+        ):
+            split += 2
+        old, self.turns = turns[:split], turns[split:]
+        if old and self.summarize:
+            summary = f"Resumen anterior: {self.summary}\n\n" if self.summary else ""
+            prompt = SUMMARY_PROMPT.format(summary=summary, transcript=_transcript(old))
+            try:
+                with self.agent._turn():
+                    result = self.agent.backend.generate(
+                        self.agent.model, prompt, self.agent.options, **self.agent._extra()
+                    )
+                summary = result.get("response", "").strip()
+                # Un resumen que no resume no puede comerse la ventana
+                limit = int(self.max_tokens // 4 * CHARS_PER_TOKEN)
+                self.summary = summary[:limit] or self.summary
+            except Exception:
+                # Sin resumen: los turnos antiguos simplemente se pierden
+                pass
+        elif old:
+            self.summary = ""
+        # El context incluye los turnos antiguos: el siguiente turno envía
+        # el resumen y los turnos recientes como texto y empieza uno nuevo
+        self.context = None
+        self.tokens = estimate_tokens(self.summary + _transcript(self.turns))
+        self.compactions += 1
+
+    def send(self, message, timeout=None):
+        """
+        Envía un mensaje y devuelve la respuesta
+
+        Args:
+            message: El mensaje del usuario
+            timeout: Segundos máximos para responder (default: el del agente)
+
+        Returns:
+            La respuesta del modelo
+        """
+        if timeout is not None or self.agent.timeout is not None:
+            # En streaming, al acabarse el tiempo queda lo generado hasta entonces
+            return "".join(self.send_stream(message, timeout)).strip()
+        with self._lock:
+            prompt, extra = self._request(message)
+            try:
+                with self.agent._turn():
+                    result = self.agent.backend.generate(
+                        self.agent.model, prompt, self.agent.options, **extra
+                    )
+            except Exception as e:
+                return f"Error al llamar a Ollama: {str(e)}"
+            response = result.get("response", "").strip()
+            self.last_stats = _stats(result)
+            self._finish(message, response, result)
+            return response
+
+    def send_stream(self, message, timeout=None):
+        """
+        Igual que send() pero devuelve la respuesta en trozos
+
+        Yields:
+            Trozos de texto según los genera el modelo. Si se deja de leer
+            o se acaba el tiempo, la generación se cancela y el turno no
+            se guarda.
+        """
+        # El lock solo para leer y apuntar la conversación: si se tuviera
+        # entre trozos, un stream abandonado bloquearía la sesión
+        with self._lock:
+            prompt, extra = self._request(message)
+        deadline = self.agent._deadline(timeout)
+        if deadline is not None:
+            extra["deadline"] = deadline.at
+        parts = []
+        try:
+            with self.agent._turn(extra.get("deadline")):
+                stream = self.agent.backend.generate_stream(
+                    self.agent.model, prompt, self.agent.options, **extra
+                )
+                try:
+                    for chunk in stream:
+                        text = chunk.get("response", "")
+                        if not parts:
+                            text = text.lstrip()
+                        if text:
+                            parts.append(text)
+                            yield text
+                        if chunk.get("done"):
+                            with self._lock:
+                                self.last_stats = _stats(chunk)
+                                self._finish(message, "".join(parts).strip(), chunk)
+                finally:
+                    stream.close()
+        except DeadlineExceeded:
+            if parts:
+                yield incomplete_message(deadline.seconds)
+            else:
+                yield exceeded_message(deadline.seconds, "la generación")
+        except Exception as e:
+            yield f"Error al llamar a Ollama: {str(e)}"
+
+    def stats(self):
+        """Tamaño de la conversación y cuántas veces se ha compactado"""
+        with self._lock:
+            return {
+                "id": self.session_id,
+                "turns": len(self.turns) // 2,
+                "tokens": self.tokens,
+                "max_tokens": self.max_tokens,
+                "incremental": bool(self.context),
+                "compactions": self.compactions,
+            }
+
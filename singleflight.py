@@ -0,0 +1,180 @@
+"""
+Agrupación de peticiones idénticas en curso ("single flight")
+Si llega la misma pregunta varias veces a la vez, solo la primera
+busca y genera; las demás esperan y reciben el mismo resultado
+"""
+import threading
+
+from deadline import DeadlineExceeded, remaining
+
+
+class _Call:
+    """Una llamada en curso y su resultado"""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Broadcast:
+    """Un stream en curso: los trozos se guardan para todos los que lo leen"""
+
+    __slots__ = ("cond", "chunks", "finished", "error", "subscribers")
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.chunks = []
+        self.finished = False
+        self.error = None
+        self.subscribers = 0
+
+
+class SingleFlight:
+    """
+    Comparte el trabajo de llamadas idénticas simultáneas
+
+    La clave decide qué llamadas son "la misma" (ej: modelo + pregunta
+    normalizada). Solo se comparten llamadas en curso: cuando una termina,
+    la siguiente con la misma clave vuelve a ejecutarse.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+        self.coalesced = 0
+
+    def do(self, key, fn, deadline=None):
+        """
+        Ejecuta fn() o, si ya hay una llamada con la misma clave, espera su resultado
+
+        Args:
+            key: Clave de la llamada (cualquier valor hashable)
+            fn: Función sin argumentos que hace el trabajo
+            deadline: Instante (time.monotonic()) hasta el que se espera a
+                      otra llamada igual; después se lanza DeadlineExceeded
+                      (default: sin límite). Quien ejecuta fn() no lo usa:
+                      fn() debe respetar su propio límite
+
+        Returns:
+            El resultado de fn() (si falla, todos reciben la misma excepción)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not call.done.wait(remaining(deadline)):
+                raise DeadlineExceeded("⏱️  Se acabó el tiempo esperando a una pregunta igual")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stream(self, key, make_stream, deadline=None):
+        """
+        Igual que do() pero para generadores
+
+        El generador se consume en un hilo aparte y cada llamada recibe
+        todos los trozos desde el principio, aunque llegue tarde. Si todos
+        dejan de leer, el generador se cierra (y la generación se cancela).
+
+        Args:
+            key: Clave de la llamada
+            make_stream: Función sin argumentos que devuelve el generador
+            deadline: Como en do(): quien se une a otra llamada deja de
+                      esperar trozos en ese instante (DeadlineExceeded)
+
+        Yields:
+            Los trozos del generador compartido
+        """
+        with self._lock:
+            broadcast = self._streams.get(key)
+            leader = broadcast is None
+            if leader:
+                broadcast = self._streams[key] = _Broadcast()
+            else:
+                self.coalesced += 1
+            with broadcast.cond:
+                broadcast.subscribers += 1
+
+        if leader:
+            threading.Thread(
+                target=self._produce, args=(key, broadcast, make_stream),
+                name="singleflight", daemon=True
+            ).start()
+
+        if leader:
+            # El generador compartido ya respeta el límite de quien lo creó
+            deadline = None
+        read = 0
+        try:
+            while True:
+                with broadcast.cond:
+                    while read == len(broadcast.chunks) and not broadcast.finished:
+                        left = remaining(deadline)
+                        if left == 0:
+                            raise DeadlineExceeded(
+                                "⏱️  Se acabó el tiempo esperando a una pregunta igual"
+                            )
+                        broadcast.cond.wait(left)
+                    pending = broadcast.chunks[read:]
+                    finished = broadcast.finished
+                read += len(pending)
+                yield from pending
+                if finished and read == len(broadcast.chunks):
+                    break
+            if broadcast.error is not None:
+                raise broadcast.error
+        finally:
+            with broadcast.cond:
+                broadcast.subscribers -= 1
+
+    def _produce(self, key, broadcast, make_stream):
+        """Consume el generador compartido y reparte sus trozos"""
+        stream = None
+        try:
+            stream = make_stream()
+            for chunk in stream:
+                with broadcast.cond:
+                    if broadcast.subscribers == 0:
+                        # Nadie lo está leyendo: cancelar
+                        break
+                    broadcast.chunks.append(chunk)
+                    broadcast.cond.notify_all()
+        except Exception as e:
+            broadcast.error = e
+        finally:
+            if stream is not None:
+                stream.close()
+            with self._lock:
+                if self._streams.get(key) is broadcast:
+                    del self._streams[key]
+            with broadcast.cond:
+                broadcast.finished = True
+                broadcast.cond.notify_all()
+
+    def stats(self):
+        """Llamadas en curso y cuántas se ahorraron uniéndose a otra"""
+        with self._lock:
+            return {
+                "in_flight": len(self._calls) + len(self._streams),
+                "coalesced": self.coalesced,
+            }
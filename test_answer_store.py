@@ -0,0 +1,60 @@
+"""
+Pruebas de answer_store.py (respuestas para preguntas casi iguales)
+Ejecuta: python -m pytest test_answer_store.py
+"""
+import pytest
+
+from answer_store import AnswerStore, question_features
+from llm import OllamaHTTPClient
+
+
+class BrokenStream(OllamaHTTPClient):
+    """Cliente que pierde la conexión después del primer trozo"""
+
+    def generate_stream(self, model, prompt, options=None, **kwargs):
+        yield {"response": "Python es un lenguaje", "done": False}
+        raise ConnectionResetError("peer reset")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = AnswerStore(path=str(tmp_path / "answers.sqlite"))
+    yield store
+    store.close()
+
+
+def test_same_question_other_spelling(store):
+    store.put("¿Qué es Python?", "m", "Un lenguaje")
+    hit = store.get("que es PYTHON", "m")
+    assert hit is not None and hit["answer"] == "Un lenguaje"
+
+
+@pytest.mark.parametrize("first, second", [
+    ("¿Quién creó Python?", "¿Cuándo se creó Python?"),
+    ("¿Qué es Python?", "¿Por qué Python?"),
+    ("¿Qué es Python?", "¿Dónde está Python?"),
+    ("¿Por qué Python?", "¿Dónde está Python?"),
+    ("¿Cómo instalar Python?", "¿Dónde instalar Python?"),
+    ("Novedades de Python 2", "Novedades de Python 3"),
+    ("¿Cómo convertir una lista en un diccionario en Python?",
+     "¿Cómo convertir un diccionario en una lista en Python?"),
+])
+def test_different_question_words_never_match(store, first, second):
+    assert question_features(first)[0] != question_features(second)[0]
+    store.put(first, "m", "primera")
+    assert store.get(second, "m") is None
+
+
+def test_other_model_does_not_match(store):
+    store.put("¿Qué es Python?", "a", "Un lenguaje")
+    assert store.get("¿Qué es Python?", "b") is None
+
+
+def test_stream_broken_halfway_is_not_stored(ollama, make_agent, store):
+    agent = make_agent(ollama, preload=False, answer_store=store,
+                       backend=BrokenStream(ollama.host))
+    answer = "".join(agent.research_stream("¿Qué es Python?"))
+    assert answer.startswith("Python es un lenguaje")
+    assert "peer reset" in answer
+    assert agent.last_timings["error"]
+    assert store.get("¿Qué es Python?", agent.model) is None
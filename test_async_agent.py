@@ -0,0 +1,62 @@
+"""
+Pruebas del agente asyncio (async_agent.py)
+Ejecuta: python -m pytest test_async_agent.py
+"""
+import asyncio
+
+from async_agent import AsyncResearchAgent
+from async_llm import AsyncOllamaClient
+from fake_search import FakeSearchBackend
+
+
+class PromptSpy:
+    """Cliente asíncrono que apunta los prompts que llegan al modelo"""
+
+    def __init__(self, client):
+        self.client = client
+        self.prompts = []
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    async def generate(self, model, prompt, options=None, **extra):
+        self.prompts.append(prompt)
+        return await self.client.generate(model, prompt, options, **extra)
+
+    def generate_stream(self, model, prompt, options=None, **extra):
+        self.prompts.append(prompt)
+        return self.client.generate_stream(model, prompt, options, **extra)
+
+
+def _research(ollama, search, questions, stream=False):
+    async def run():
+        client = PromptSpy(AsyncOllamaClient(ollama.host))
+        agent = AsyncResearchAgent(client=client, search_cache=False, search_backend=search)
+
+        async def one(question):
+            if stream:
+                return "".join([t async for t in agent.research_stream(question)])
+            return await agent.research(question)
+
+        try:
+            answers = await asyncio.gather(*(one(q) for q in questions))
+        finally:
+            await agent.close()
+        return answers, client.prompts
+
+    return asyncio.run(run())
+
+
+def test_many_questions_at_once(ollama):
+    answers, prompts = _research(ollama, FakeSearchBackend(0.05, jitter=0),
+                                 [f"Pregunta {i}" for i in range(8)])
+    assert len(prompts) == 8 and all(answers)
+    assert all("Resultado 1 sobre" in p for p in prompts)
+
+
+def test_search_errors_never_reach_the_model(ollama):
+    failing = FakeSearchBackend(0, jitter=0, error_rate=1.0)
+    for stream in (False, True):
+        answers, prompts = _research(ollama, failing, ["¿Qué es Python?"], stream)
+        assert answers[0] and not answers[0].startswith("Error")
+        assert not any("Error en la búsqueda" in p for p in prompts)
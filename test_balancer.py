@@ -0,0 +1,126 @@
+"""
+Pruebas del reparto entre varios servidores de Ollama (balancer.py)
+Ejecuta: python -m pytest test_balancer.py
+"""
+import time
+
+import pytest
+
+from balancer import BalancedBackend
+from deadline import DeadlineExceeded
+from fake_ollama import FakeOllama
+from llm import OllamaError, OllamaHTTPClient
+
+MODEL = "fake:latest"
+
+
+class BreaksAfterFirstChunk(OllamaHTTPClient):
+    """Cliente que pierde la conexión después del primer trozo"""
+
+    def generate_stream(self, model, prompt, options=None, **kwargs):
+        yield {"response": "Python", "done": False}
+        raise ConnectionResetError("peer reset")
+
+
+@pytest.fixture
+def servers():
+    servers = [FakeOllama(tokens_per_second=1000, response_tokens=5).start() for _ in range(3)]
+    yield servers
+    for server in servers:
+        server.stop()
+
+
+def _balancer(servers, **kwargs):
+    # Sin comprobaciones en segundo plano: cada prueba decide cuándo se hacen
+    kwargs.setdefault("load_penalty", 0)
+    return BalancedBackend([s.host for s in servers], health_interval=0, **kwargs)
+
+
+def test_goes_to_the_node_with_fewer_requests(servers):
+    backend = _balancer(servers)
+    busy = backend.generate_stream(MODEL, "Pregunta larga")
+    next(busy)
+    for i in range(4):
+        backend.generate(MODEL, f"Pregunta {i}")
+    # El primero sigue con el stream abierto: el resto va a los otros dos
+    assert servers[0].requests == 1
+    assert servers[1].requests + servers[2].requests == 4
+    assert [n["outstanding"] for n in backend.stats()] == [1, 0, 0]
+    busy.close()
+    assert [n["outstanding"] for n in backend.stats()] == [0, 0, 0]
+    backend.close()
+
+
+def test_prefers_the_node_with_the_model_loaded(servers):
+    OllamaHTTPClient(servers[2].host).load(MODEL)
+    backend = _balancer(servers, load_penalty=2)
+    backend.check_health()
+    assert [n["loaded"] for n in backend.stats()] == [[], [], [MODEL]]
+    for i in range(3):
+        backend.generate(MODEL, f"Pregunta {i}")
+    assert [s.loads for s in servers] == [0, 0, 1]
+    assert [s.requests for s in servers] == [0, 0, 4]
+    backend.close()
+
+
+def test_dead_node_is_ejected_and_readmitted_by_check_health(servers):
+    servers[0].stop()
+    backend = _balancer(servers, max_failures=1, eject_seconds=60)
+    # Las peticiones que iban al caído se reintentan en otro servidor
+    for i in range(6):
+        assert backend.generate(MODEL, f"Pregunta {i}")["response"]
+    stats = backend.stats()
+    assert stats[0]["ejected"] and stats[0]["failures"] == 1 and stats[0]["requests"] == 1
+    assert servers[1].requests + servers[2].requests == 6
+
+    servers[0].start()
+    backend.check_health()
+    assert not backend.stats()[0]["ejected"]
+    for i in range(6):
+        backend.generate(MODEL, f"Otra pregunta {i}")
+    assert servers[0].requests == 2
+    backend.close()
+
+
+def test_all_nodes_down(servers):
+    for server in servers:
+        server.stop()
+    backend = _balancer(servers)
+    with pytest.raises(OSError):
+        backend.generate(MODEL, "Pregunta")
+    assert all(n["failures"] == 1 for n in backend.stats())
+    backend.close()
+
+
+def test_stream_retries_only_before_the_first_chunk(servers):
+    servers[0].stop()
+    backend = _balancer(servers[:2])
+    # El primero no acepta conexiones: el stream entero sale del segundo
+    chunks = list(backend.generate_stream(MODEL, "Pregunta"))
+    assert chunks[-1]["done"] and servers[1].requests == 1
+
+    backend = _balancer(servers[1:])
+    backend.nodes[0].client = BreaksAfterFirstChunk(servers[1].host)
+    stream = backend.generate_stream(MODEL, "Pregunta")
+    assert next(stream)["response"] == "Python"
+    # Ya se devolvió un trozo: repetir la respuesta en otro servidor la duplicaría
+    with pytest.raises(ConnectionResetError):
+        next(stream)
+    assert servers[2].requests == 0
+    assert backend.stats()[0]["failures"] == 1
+    backend.close()
+
+
+def test_failed_stream_does_not_mark_the_model_loaded(servers):
+    backend = _balancer(servers[:1])
+    # El servidor no tiene ese modelo (404): responde, pero no lo carga
+    with pytest.raises(OllamaError):
+        list(backend.generate_stream("otro:latest", "Pregunta"))
+    slow = FakeOllama(tokens_per_second=5, response_tokens=50).start()
+    timed = _balancer([slow])
+    with pytest.raises(DeadlineExceeded):
+        list(timed.generate_stream(MODEL, "Pregunta", deadline=time.monotonic() + 0.2))
+    for b in (backend, timed):
+        assert b.stats()[0]["loaded"] == [] and b.stats()[0]["failures"] == 0
+        b.close()
+    slow.stop()
@@ -0,0 +1,98 @@
+"""
+Pruebas del modo lote (batch.py)
+Ejecuta: python -m pytest test_batch.py
+"""
+import json
+
+from batch import completed_indexes, iter_batch, run_batch
+from fake_search import FakeSearchBackend
+
+
+class PromptSpy:
+    """Backend que apunta los prompts que llegan al modelo"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.prompts = []
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def generate(self, model, prompt, options=None, **extra):
+        self.prompts.append(prompt)
+        return self.backend.generate(model, prompt, options, **extra)
+
+
+def _questions(tmp_path, count):
+    path = tmp_path / "preguntas.txt"
+    path.write_text("".join(f"Pregunta {i}\n\n" for i in range(count)), encoding="utf-8")
+    return str(path)
+
+
+def test_run_batch_writes_every_answer(ollama, make_agent, tmp_path):
+    output = str(tmp_path / "respuestas.jsonl")
+    answered, failed = run_batch(make_agent(ollama), _questions(tmp_path, 5), output)
+    records = [json.loads(line) for line in open(output, encoding="utf-8")]
+    assert (answered, failed) == (5, 0)
+    assert sorted(r["index"] for r in records) == list(range(5))
+    assert all(r["answer"] for r in records)
+
+
+def test_resume_skips_answered_and_truncates_partial_line(ollama, make_agent, tmp_path):
+    output = tmp_path / "respuestas.jsonl"
+    output.write_text(
+        '{"index": 0, "question": "Pregunta 0", "answer": "a"}\n'
+        '{"index": 1, "question": "Pregunta 1", "error": "x"}\n'
+        '{"index": 2, "question": "Preg',
+        encoding="utf-8"
+    )
+    assert completed_indexes(str(output)) == {0}
+    answered, _ = run_batch(make_agent(ollama), _questions(tmp_path, 3), str(output),
+                            resume=True)
+    records = [json.loads(line) for line in open(output, encoding="utf-8")]
+    assert answered == 2
+    assert sorted(r["index"] for r in records if "answer" in r) == [0, 1, 2]
+
+
+def test_lines_without_index_are_skipped(tmp_path):
+    output = tmp_path / "respuestas.jsonl"
+    output.write_text(
+        '{"question": "sin índice", "answer": "b"}\n'
+        '["otra", "cosa"]\n'
+        '{"index": 3, "question": "Pregunta 3", "answer": "c"}\n',
+        encoding="utf-8"
+    )
+    assert completed_indexes(str(output)) == {3}
+
+
+def test_search_errors_never_reach_the_model(ollama, make_agent):
+    agent = make_agent(ollama, search_backend=FakeSearchBackend(0, jitter=0, error_rate=1.0))
+    agent.backend = spy = PromptSpy(agent.backend)
+    records = list(iter_batch(agent, enumerate(["Pregunta 0", "Pregunta 1"])))
+    assert all("answer" in r for r in records)
+    assert spy.prompts and not any("Error en la búsqueda" in p for p in spy.prompts)
+
+
+class WatchingSearch(FakeSearchBackend):
+    """Buscador falso que apunta qué buscador tiene el agente en cada búsqueda"""
+
+    agent = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.seen = []
+
+    def search(self, query, max_results=3):
+        self.seen.append(self.agent.search_backend)
+        return super().search(query, max_results)
+
+
+def test_batch_searches_each_question_once(ollama, make_agent):
+    search = WatchingSearch(0.05, jitter=0)
+    agent = search.agent = make_agent(ollama, search_backend=search)
+    records = list(iter_batch(agent, enumerate(f"Pregunta {i}" for i in range(6))))
+    assert len(records) == 6
+    assert search.searches == 6
+    # El lote no cambia el buscador del agente, ni siquiera mientras dura
+    assert agent.search_backend is search
+    assert all(backend is search for backend in search.seen)
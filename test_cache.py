@@ -0,0 +1,143 @@
+"""
+Pruebas de las cachés en disco (cache.py)
+Ejecuta: python -m pytest test_cache.py
+"""
+from cache import ResponseCache, SearchCache, response_key
+from fake_search import FakeSearchBackend
+from search import search_results
+
+
+RESULTS = [{"title": "Python", "body": "Un lenguaje", "href": "https://python.org"}]
+
+
+class CacheableSearch(FakeSearchBackend):
+    """Buscador falso que sí se guarda en la caché"""
+
+    cacheable = True
+
+
+class Models:
+    """Backend con un digest de modelo que se puede cambiar"""
+
+    def __init__(self, digest="sha256:1"):
+        self.digest = digest
+        self.lookups = 0
+
+    def model_digest(self, model):
+        self.lookups += 1
+        return self.digest
+
+
+def _answer(text):
+    return {"response": text, "stats": {"eval_count": 1}}
+
+
+def test_search_cache_normalizes_queries(tmp_path):
+    cache = SearchCache(path=str(tmp_path / "search.sqlite"))
+    cache.set("¿Qué es Python?", 3, RESULTS)
+    assert cache.get("  ¿qué ES   python? ", 3) == RESULTS
+    assert cache.get("¿Qué es Python?", 5) is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+
+def test_search_cache_survives_restarts(tmp_path):
+    path = str(tmp_path / "search.sqlite")
+    SearchCache(path=path).set("python", 3, RESULTS)
+    assert SearchCache(path=path).get("python", 3) == RESULTS
+
+
+def test_search_cache_expires_entries(tmp_path):
+    path = str(tmp_path / "search.sqlite")
+    cache = SearchCache(path=path)
+    cache.set("python", 3, RESULTS, ttl=0)
+    cache.set("rust", 3, RESULTS)
+    assert cache.get("python", 3) is None
+    assert SearchCache(path=path, ttl=0).get("rust", 3) == RESULTS
+    assert [key for key, _ in cache.items()] == ["3:rust"]
+
+
+def test_search_cache_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / "search.sqlite")
+    cache = SearchCache(path=path, max_entries=2)
+    cache.set("python", 3, RESULTS)
+    cache.set("rust", 3, RESULTS)
+    # "python" se lee de la capa de memoria: también cuenta como usada
+    assert cache.get("python", 3) == RESULTS
+    cache.set("go", 3, RESULTS)
+    fresh = SearchCache(path=path)
+    assert fresh.get("python", 3) == RESULTS
+    assert fresh.get("go", 3) == RESULTS
+    assert fresh.get("rust", 3) is None
+
+
+def test_search_results_use_the_cache():
+    search = CacheableSearch(0, jitter=0)
+    first = search_results("¿Qué es Python?", backend=search)
+    assert search_results("¿qué es python?", backend=search) == first
+    assert search.searches == 1
+    search_results("¿qué es python?", backend=search, use_cache=False)
+    assert search.searches == 2
+
+
+def test_response_key_depends_on_everything_that_changes_the_answer():
+    key = response_key("gemma3:4b", "sha256:1", {"temperature": 0}, "hola")
+    assert key == response_key("gemma3:4b", "sha256:1", {"temperature": 0}, "hola")
+    assert len({
+        key,
+        response_key("gemma3:1b", "sha256:1", {"temperature": 0}, "hola"),
+        response_key("gemma3:4b", "sha256:2", {"temperature": 0}, "hola"),
+        response_key("gemma3:4b", "sha256:1", {"temperature": 1}, "hola"),
+        response_key("gemma3:4b", "sha256:1", {"temperature": 0}, "hola "),
+    }) == 5
+
+
+def test_response_cache_drops_answers_of_an_updated_model(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    models = Models()
+    cache = ResponseCache(path=path, digest_ttl=0)
+    digest = cache.model_digest(models, "gemma3:4b")
+    old = response_key("gemma3:4b", digest, None, "hola")
+    other = response_key("llama3:8b", "sha256:9", None, "hola")
+    cache.set(old, "gemma3:4b", digest, _answer("vieja"))
+    cache.set(other, "llama3:8b", "sha256:9", _answer("otra"))
+    assert cache.get(old) == _answer("vieja")
+
+    models.digest = "sha256:2"
+    assert cache.model_digest(models, "gemma3:4b") == "sha256:2"
+    assert cache.get(old) is None
+    assert ResponseCache(path=path).get(old) is None
+    assert cache.get(other) == _answer("otra")
+
+
+def test_response_cache_reuses_the_digest_for_digest_ttl(tmp_path):
+    models = Models()
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite"), digest_ttl=60)
+    for _ in range(3):
+        assert cache.model_digest(models, "gemma3:4b") == "sha256:1"
+    assert models.lookups == 1
+
+
+def test_response_cache_expires_and_evicts_least_recently_used(tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    assert ResponseCache(path=path, max_age=0).get("a") is None
+    size = len('{"response": "a", "stats": {"eval_count": 1}}')
+    cache = ResponseCache(path=path, max_bytes=2 * size)
+    cache.set("a", "m", None, _answer("a"))
+    cache.set("b", "m", None, _answer("b"))
+    assert cache.get("a") == _answer("a")
+    cache.set("c", "m", None, _answer("c"))
+    fresh = ResponseCache(path=path)
+    assert fresh.get("a") == _answer("a")
+    assert fresh.get("b") is None
+    assert fresh.get("c") == _answer("c")
+    assert ResponseCache(path=path, max_age=0).get("a") is None
+
+
+def test_agent_reuses_cached_responses(ollama, make_agent, tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite"))
+    agent = make_agent(ollama, preload=False, response_cache=cache)
+    answer = agent.research("¿Qué es Python?")
+    assert agent.research("¿Qué es Python?") == answer
+    assert "".join(agent.research_stream("¿Qué es Python?")).strip() == answer
+    assert ollama.requests == 1
+    assert agent.last_cache_hit
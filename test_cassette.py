@@ -0,0 +1,47 @@
+"""
+Pruebas de las grabaciones de tráfico (cassette.py)
+Ejecuta: python -m pytest test_cassette.py
+"""
+import gzip
+import json
+
+from batch import iter_batch
+from cassette import CassetteWriter, RecordingLLM, record, replay_agent
+from llm import OllamaCLIClient
+
+
+def _events(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_replay_gives_the_recorded_answers(ollama, make_agent, tmp_path):
+    path = str(tmp_path / "trafico.jsonl.gz")
+    agent = make_agent(ollama)
+    writer = record(agent, path)
+    answer = agent.research("¿Qué es Python?")
+    streamed = "".join(agent.research_stream("¿Qué es Rust?"))
+    writer.close()
+
+    replayed, cassette = replay_agent(path, speed=0)
+    assert replayed.research("¿Qué es Python?") == answer
+    assert "".join(replayed.research_stream("¿Qué es Rust?")) == streamed
+    assert cassette.stats()["misses"] == 0
+    assert [q["text"] for q in cassette.questions] == ["¿Qué es Python?", "¿Qué es Rust?"]
+
+
+def test_recording_without_http_host(tmp_path):
+    # Sin API HTTP el agente usa `ollama run`, que no tiene host
+    writer = CassetteWriter(str(tmp_path / "cli.jsonl.gz"))
+    assert RecordingLLM(OllamaCLIClient(), writer).host == "cli"
+    writer.close()
+
+
+def test_batch_questions_are_recorded(ollama, make_agent, tmp_path):
+    path = str(tmp_path / "lote.jsonl.gz")
+    agent = make_agent(ollama)
+    writer = record(agent, path)
+    list(iter_batch(agent, enumerate(["Pregunta 0", "Pregunta 1"])))
+    writer.close()
+    questions = sorted(e["text"] for e in _events(path) if e["kind"] == "question")
+    assert questions == ["Pregunta 0", "Pregunta 1"]
@@ -0,0 +1,101 @@
+"""
+Pruebas del contexto con presupuesto de tokens (context.py)
+Ejecuta: python -m pytest test_context.py
+"""
+from context import (ContextBuilder, bm25_scores, estimate_tokens, model_num_ctx,
+                     split_passages)
+from fake_ollama import FakeOllama
+from fake_search import FakeSearchBackend
+
+
+FILLER = "Este texto de relleno no dice nada útil sobre el tema que se pregunta. "
+
+
+class PromptSpy:
+    """Backend que apunta los prompts que llegan al modelo"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.prompts = []
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def generate(self, model, prompt, options=None, **extra):
+        self.prompts.append(prompt)
+        return self.backend.generate(model, prompt, options, **extra)
+
+
+class Show:
+    """Backend con lo que devolvería /api/show"""
+
+    def __init__(self, parameters=None):
+        self.parameters = parameters
+
+    def show(self, model):
+        if self.parameters is None:
+            raise ConnectionError("sin Ollama")
+        return {"parameters": self.parameters}
+
+
+def _result(i, text):
+    return {"title": f"Resultado {i}", "href": f"https://example.com/{i}", "body": text}
+
+
+def test_model_num_ctx():
+    assert model_num_ctx(Show("num_ctx 8192"), "m", {"num_ctx": 4096}) == 4096
+    assert model_num_ctx(Show("stop <eos>\nnum_ctx 8192"), "m") == 8192
+    assert model_num_ctx(Show("stop <eos>"), "m") == 2048
+    assert model_num_ctx(Show(None), "m") == 2048
+
+
+def test_split_passages():
+    results = [
+        {"body": "Resumen corto.", "content": "Frase uno. " * 100},
+        {"body": "x" * 1500},
+    ]
+    passages = split_passages(results, passage_chars=200)
+    assert all(len(p["text"]) <= 200 for p in passages)
+    assert all("Resumen" not in p["text"] for p in passages)
+    assert [p["source"] for p in passages].count(1) == 8
+
+
+def test_bm25_prefers_passages_about_the_question():
+    documents = [FILLER * 3, "Python es un lenguaje de programación. " + FILLER,
+                 "Python y Rust. Rust es un lenguaje de sistemas."]
+    scores = bm25_scores("¿Qué es Rust?", documents)
+    assert scores[0] == scores[1] == 0
+    assert scores[2] > 0
+    assert bm25_scores("¿qué es?", documents) == [0.0, 0.0, 0.0]
+
+
+def test_context_fits_the_budget_and_keeps_relevant_passages():
+    results = [_result(i, FILLER * 30) for i in range(5)]
+    results.append(_result(5, FILLER * 5 + "Rust es un lenguaje de sistemas muy rápido. "))
+    builder = ContextBuilder(num_ctx=1024, reserve_tokens=512)
+    fixed = "Pregunta: ¿Qué es Rust?\nResponde usando la información:\n"
+    context = builder.build("¿Qué es Rust?", results, fixed_text=fixed)
+    assert estimate_tokens(context) <= builder.budget(fixed)
+    assert "Rust es un lenguaje de sistemas" in context
+    assert context.startswith("[6] Resultado 5")
+
+
+def test_without_relevant_passages_fill_in_search_order():
+    results = [_result(i, FILLER * 30) for i in range(3)]
+    builder = ContextBuilder(num_ctx=700, reserve_tokens=200)
+    context = builder.build("¿Qué es Rust?", results)
+    assert estimate_tokens(context) <= builder.budget()
+    assert context.startswith("[1] Resultado 0")
+    assert builder.build("¿Qué es Rust?", []) == "No se encontraron resultados."
+    assert ContextBuilder(num_ctx=100).build("¿Qué es Rust?", results) == \
+        "No se encontraron resultados."
+
+
+def test_agent_prompt_fits_the_model_window(make_agent):
+    with FakeOllama(tokens_per_second=1000, response_tokens=20, num_ctx=1024) as server:
+        agent = make_agent(server, preload=False, context_builder=True,
+                           search_backend=FakeSearchBackend(0, jitter=0, body_chars=6000))
+        agent.backend = spy = PromptSpy(agent.backend)
+        agent.research("¿Qué es Python?")
+        assert agent.context_builder.num_ctx == 1024
+        assert estimate_tokens(spy.prompts[0]) <= 1024 - agent.context_builder.reserve_tokens
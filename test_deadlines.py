@@ -0,0 +1,100 @@
+"""
+Pruebas de los timeouts por pregunta (deadline.py y su uso en el agente)
+Ejecuta: python -m pytest test_deadlines.py
+"""
+import threading
+import time
+
+from answer_store import AnswerStore
+from batch import iter_batch
+from fake_ollama import FakeOllama
+
+
+def _run_all(calls):
+    """Ejecuta las funciones a la vez y devuelve sus resultados en orden"""
+    results = [None] * len(calls)
+
+    def run(i):
+        results[i] = calls[i]()
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(calls))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_research_stops_at_timeout(make_agent):
+    with FakeOllama(tokens_per_second=20, response_tokens=200) as server:
+        agent = make_agent(server, preload=False)
+        start = time.perf_counter()
+        answer = agent.research("¿Qué es Python?", timeout=0.5)
+        assert time.perf_counter() - start < 1.5
+        assert "se acabó el tiempo" in answer
+        assert agent.last_timings["timed_out"]
+
+
+def test_zero_timeout_is_a_limit_not_the_default(make_agent):
+    with FakeOllama(tokens_per_second=20, response_tokens=200) as server:
+        agent = make_agent(server, preload=False, timeout=30)
+        start = time.perf_counter()
+        assert "acabó el tiempo (0s)" in agent.research("¿Qué es Python?", timeout=0)
+        assert "acabó el tiempo (0s)" in agent.chat("Hola", timeout=0)
+        assert "acabó el tiempo (0s)" in agent.session(store_dir=False).send("Hola", timeout=0)
+        assert time.perf_counter() - start < 1.0
+
+
+def test_identical_questions_coalesce_with_different_timeouts(make_agent):
+    # El servidor resta la espera en la cola: cada petición trae otro timeout
+    with FakeOllama(tokens_per_second=100, response_tokens=50) as server:
+        agent = make_agent(server, search_latency=0.1, preload=False)
+        answers = _run_all([
+            lambda t=t: agent.research("¿Qué es Python?", timeout=t)
+            for t in (30, 29.9, 29.8, 29.7)
+        ])
+        assert server.requests == 1
+        assert agent.singleflight.stats()["coalesced"] == 3
+        assert len(set(answers)) == 1
+
+
+def test_waiter_applies_its_own_timeout(make_agent):
+    with FakeOllama(tokens_per_second=50, response_tokens=100) as server:
+        agent = make_agent(server, preload=False)
+
+        def waiter():
+            time.sleep(0.1)
+            start = time.perf_counter()
+            answer = "".join(agent.research_stream("¿Qué es Python?", timeout=0.5))
+            return time.perf_counter() - start, answer
+
+        leader, (seconds, answer) = _run_all([
+            lambda: "".join(agent.research_stream("¿Qué es Python?")), waiter
+        ])
+        assert seconds < 1.0
+        assert "Respuesta incompleta" in answer
+        assert "se acabó el tiempo" not in leader
+
+
+def test_timeout_of_one_request_does_not_leak_to_another(make_agent, tmp_path):
+    store = AnswerStore(path=str(tmp_path / "answers.sqlite"))
+    with FakeOllama(tokens_per_second=40, response_tokens=40, parallel=8) as server:
+        agent = make_agent(server, preload=False, answer_store=store)
+        _run_all([
+            lambda: agent.research("¿Qué es Rust?", timeout=0.3),
+            lambda: agent.research("¿Qué es Python?"),
+        ])
+    # Solo se guarda la respuesta completa, nunca la cortada
+    assert store.get("¿Qué es Python?", agent.model) is not None
+    assert store.get("¿Qué es Rust?", agent.model) is None
+    store.close()
+
+
+def test_batch_applies_timeout_to_each_question(make_agent):
+    with FakeOllama(tokens_per_second=20, response_tokens=200) as server:
+        agent = make_agent(server, preload=False)
+        start = time.perf_counter()
+        records = list(iter_batch(agent, enumerate(["Pregunta 0", "Pregunta 1"]),
+                                  workers=1, timeout=0.5))
+        assert time.perf_counter() - start < 2.0
+        assert all("se acabó el tiempo" in r["answer"] for r in records)
@@ -0,0 +1,110 @@
+"""
+Pruebas de la búsqueda semántica (embeddings.py)
+Ejecuta: python -m pytest test_embeddings.py
+"""
+import pytest
+
+pytest.importorskip("numpy")
+
+from embeddings import EmbeddingIndex  # noqa: E402
+from fake_search import FakeSearchBackend  # noqa: E402
+from llm import OllamaHTTPClient  # noqa: E402
+
+
+DOCUMENTS = [
+    {"title": "Python", "href": "https://python.org",
+     "text": "Python es un lenguaje interpretado con tipado dinámico y muchas bibliotecas."},
+    {"title": "Rust", "href": "https://rust-lang.org",
+     "text": "Rust gestiona la memoria sin recolector gracias al sistema de préstamos."},
+    {"title": "Cocina", "href": "https://recetas.com",
+     "text": "La tortilla de patatas lleva huevos, patatas, aceite de oliva y sal."},
+]
+
+
+@pytest.fixture
+def client(ollama):
+    return OllamaHTTPClient(ollama.host)
+
+
+def test_search_finds_the_closest_passage(client, tmp_path):
+    index = EmbeddingIndex(client, index_dir=str(tmp_path / "emb"))
+    assert index.search("tortilla") == []
+    assert index.add_documents(DOCUMENTS) == 3
+    hits = index.search("¿Lleva huevos la tortilla de patatas?", k=2)
+    assert len(hits) == 2 and hits[0][1] >= hits[1][1]
+    results = index.search_results("¿Lleva huevos la tortilla de patatas?", k=1)
+    assert results[0]["href"] == "https://recetas.com"
+    assert results[0]["content"] == DOCUMENTS[2]["text"]
+    # Los documentos ya indexados no se vuelven a añadir
+    assert index.add_documents(DOCUMENTS) == 0
+    index.close()
+
+
+def test_int8_gives_the_same_order(client, tmp_path):
+    exact = EmbeddingIndex(client, index_dir=str(tmp_path / "f32"))
+    small = EmbeddingIndex(client, index_dir=str(tmp_path / "int8"), quantize=True)
+    for index in (exact, small):
+        index.add_documents(DOCUMENTS)
+    for query in ("memoria sin recolector", "lenguaje interpretado", "aceite de oliva"):
+        a, b = exact.search(query, k=3), small.search(query, k=3)
+        assert [i for i, _ in a] == [i for i, _ in b]
+        assert all(abs(x - y) < 0.02 for (_, x), (_, y) in zip(a, b))
+
+
+def test_index_is_reopened_and_checks_the_model(client, tmp_path):
+    path = str(tmp_path / "emb")
+    index = EmbeddingIndex(client, index_dir=path, quantize=True)
+    index.add_documents(DOCUMENTS)
+    hits = index.search("lenguaje interpretado")
+    index.close()
+
+    reopened = EmbeddingIndex(client, index_dir=path)
+    assert len(reopened) == 3 and reopened.quantize
+    assert reopened.search("lenguaje interpretado") == hits
+    reopened.close()
+    with pytest.raises(RuntimeError):
+        EmbeddingIndex(client, index_dir=path, model="otro-modelo")
+
+
+def test_rows_of_an_interrupted_write_are_discarded(client, tmp_path):
+    path = tmp_path / "emb"
+    index = EmbeddingIndex(client, index_dir=str(path))
+    index.add_documents(DOCUMENTS[:2])
+    index.close()
+    # Vectores escritos sin sus metadatos (el proceso se cortó entre medias)
+    with open(path / "vectors.bin", "ab") as f:
+        f.write(b"\x00" * 64 * 4)
+
+    index = EmbeddingIndex(client, index_dir=str(path))
+    index.add_documents(DOCUMENTS[2:])
+    assert (path / "vectors.bin").stat().st_size == 3 * index.dim * 4
+    assert index.search_results("tortilla de patatas", k=1)[0]["title"] == "Cocina"
+    index.close()
+
+
+def test_agent_answers_from_the_index_without_search(ollama, make_agent, client, tmp_path):
+    index = EmbeddingIndex(client, index_dir=str(tmp_path / "emb"))
+    index.add_documents(DOCUMENTS)
+    agent = make_agent(ollama, preload=False, embedding_index=index,
+                       search_backend=FakeSearchBackend(0, jitter=0, error_rate=1.0))
+    context = agent._search("¿Qué lleva la tortilla de patatas?")
+    assert "huevos" in context and "Error" not in context
+    index.close()
+
+
+def test_broken_index_keeps_the_web_results(ollama, make_agent):
+    class Broken:
+        def search_results(self, question):
+            raise OSError("índice roto")
+
+    agent = make_agent(ollama, preload=False, embedding_index=Broken())
+    context = agent._search("¿Qué es Python?")
+    assert "Resultado 1 sobre" in context and "Error" not in context
+    agent.research("¿Qué es Python?")
+    assert "search_error" not in agent.last_timings
+    agent.search_backend = FakeSearchBackend(0, jitter=0, error_rate=1.0)
+    with pytest.raises(ConnectionError):
+        agent._search("¿Qué es Python?")
+    # Sin resultados de ningún sitio, el modelo responde sin contexto
+    assert agent.research("¿Qué es Python?")
+    assert agent.last_timings["search_error"]
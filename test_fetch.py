@@ -0,0 +1,132 @@
+"""
+Pruebas de la descarga de páginas (fetch.py)
+Ejecuta: python -m pytest test_fetch.py
+"""
+import time
+
+import pytest
+
+import fetch
+from cache import DocumentCache
+from deadline import DeadlineExceeded
+from fake_web import FakeWeb, page_html
+from fetch import PageFetcher, extract_text
+
+
+@pytest.fixture
+def web():
+    """Servidor web local con páginas de relleno"""
+    with FakeWeb() as server:
+        yield server
+
+
+@pytest.fixture
+def fetcher():
+    fetcher = PageFetcher(cache=None, extract_processes=0)
+    yield fetcher
+    fetcher.close()
+
+
+def test_extract_text_keeps_title_and_main_text():
+    document = extract_text(page_html(7, paragraphs=2))
+    assert document["title"] == "Página 7"
+    assert document["text"].count("Este párrafo de relleno") == 6
+    assert "menú" not in document["text"] and "Pie de página" not in document["text"]
+
+
+def test_keep_alive_reuses_one_connection(web, fetcher):
+    for i in range(4):
+        assert fetcher.fetch(web.url(f"/page/{i}"))["title"] == f"Página {i}"
+    assert web.connections == 1
+
+
+def test_redirects_and_gzip(web, fetcher):
+    document = fetcher.fetch(web.url("/redirect/3/5"))
+    assert document["title"] == "Página 5"
+    assert document["url"] == web.url("/redirect/3/5")
+    assert fetcher.fetch(web.url("/gzip/2"))["title"] == "Página 2"
+    with pytest.raises(OSError):
+        fetcher.fetch(web.url("/redirect/4/5"))
+    with pytest.raises(OSError):
+        fetcher.fetch(web.url("/missing"))
+
+
+def test_non_html_is_skipped(web, fetcher):
+    assert fetcher.fetch(web.url("/image")) is None
+
+
+def test_big_pages_are_cut_at_max_bytes(web):
+    fetcher = PageFetcher(cache=None, extract_processes=0, max_bytes=16 * 1024)
+    document = fetcher.fetch(web.url("/big/512"))
+    assert document["title"] == "Página grande"
+    assert 0 < len(document["text"].encode("utf-8")) <= 16 * 1024
+    # La conexión no se guarda con el resto de la página sin leer
+    fetcher.fetch(web.url("/page/1"))
+    assert web.connections == 2
+    fetcher.close()
+
+
+def test_extraction_in_process_pool_matches_inline(web, fetcher):
+    processes = PageFetcher(cache=None, extract_processes=2)
+    urls = [web.url(f"/page/{i}") for i in range(6)]
+    try:
+        assert processes.fetch_all(urls) == fetcher.fetch_all(urls)
+        assert processes._processes is not None
+    finally:
+        processes.close()
+
+
+def test_fetch_all_drops_pages_after_the_deadline(web, fetcher):
+    urls = [web.url("/page/1"), web.url("/slow/2/2"), web.url("/missing"), web.url("/page/3")]
+    start = time.perf_counter()
+    documents = fetcher.fetch_all(urls, timeout=0.5)
+    assert time.perf_counter() - start < 1.0
+    assert sorted(documents) == [urls[0], urls[3]]
+
+
+def test_enrich_only_adds_pages_that_arrived_in_time(web, fetcher):
+    results = [{"title": f"R{i}", "href": web.url(path), "body": "..."}
+               for i, path in enumerate(["/page/1", "/slow/2/2", "/page/3", "/page/4"])]
+    start = time.perf_counter()
+    enriched = fetcher.enrich(results, top=3, timeout=0.5)
+    assert time.perf_counter() - start < 1.0
+    assert ["content" in r for r in enriched] == [True, False, True, False]
+    assert "content" not in results[0]
+
+
+def test_max_per_host_limits_concurrent_downloads():
+    with FakeWeb(latency=0.2) as web:
+        fetcher = PageFetcher(cache=None, extract_processes=0, max_per_host=1)
+        start = time.perf_counter()
+        assert len(fetcher.fetch_all([web.url(f"/page/{i}") for i in range(3)])) == 3
+        assert time.perf_counter() - start >= 0.6
+        fetcher.close()
+
+
+def test_documents_are_cached(web):
+    fetcher = PageFetcher(cache=DocumentCache(), extract_processes=0)
+    url = web.url("/page/1")
+    first = fetcher.fetch(url)
+    assert fetcher.fetch(url) == first
+    assert web.requests == 1
+    fetcher.close()
+
+
+def _slow_extract(html, max_chars=20000):
+    """extract_text que tarda (se ejecuta en el pool de procesos)"""
+    time.sleep(3)
+    return {"title": "", "text": "tarde"}
+
+
+def test_slow_extraction_stops_at_the_deadline(web, monkeypatch):
+    # Los procesos se crean después del cambio y lo heredan
+    monkeypatch.setattr(fetch, "extract_text", _slow_extract)
+    fetcher = PageFetcher(cache=None, extract_processes=1)
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded):
+        fetcher.fetch(web.url("/page/1"), time.monotonic() + 0.5)
+    assert time.perf_counter() - start < 1.5
+    # enrich se queda con el fragmento de la búsqueda
+    results = [{"title": "R", "href": web.url("/page/2"), "body": "fragmento"}]
+    assert fetcher.enrich(results, timeout=0.5) == results
+    fetcher.close()
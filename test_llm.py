@@ -0,0 +1,85 @@
+"""
+Pruebas del cliente HTTP de Ollama (llm.py)
+Ejecuta: python -m pytest test_llm.py
+"""
+import socket
+import threading
+import time
+
+import pytest
+
+from deadline import DeadlineExceeded
+from fake_ollama import FakeOllama
+from llm import OllamaHTTPClient
+
+
+def _one_response_per_connection():
+    """
+    Servidor que responde una vez por conexión y la cierra sin avisar
+    (como Ollama al reiniciarse o un proxy que corta las conexiones inactivas)
+
+    Returns:
+        (host, lista con el número de conexiones aceptadas)
+    """
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen()
+    accepted = [0]
+    body = b'{"models": [{"name": "fake:latest"}]}'
+
+    def serve():
+        while True:
+            conn, _ = listener.accept()
+            accepted[0] += 1
+            conn.recv(65536)
+            conn.sendall(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+            conn.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return f"http://127.0.0.1:{listener.getsockname()[1]}", accepted
+
+
+def test_connection_is_reused(ollama):
+    client = OllamaHTTPClient(ollama.host)
+    client.list_models()
+    conn = client._pool.queue[-1]
+    sock = conn.sock
+    client.generate("fake:latest", "hola")
+    assert client._pool.qsize() == 1
+    assert client._pool.queue[-1] is conn and conn.sock is sock
+    client.close()
+
+
+def test_closed_connection_is_retried_once():
+    host, accepted = _one_response_per_connection()
+    client = OllamaHTTPClient(host)
+    assert client.list_models() == ["fake:latest"]
+    # La conexión guardada ya está cerrada por el servidor: se reintenta con otra
+    time.sleep(0.05)
+    assert client.list_models() == ["fake:latest"]
+    assert accepted[0] == 2
+
+
+def test_expired_deadline_keeps_the_connection_in_the_pool(ollama):
+    client = OllamaHTTPClient(ollama.host)
+    client.list_models()
+    assert client._pool.qsize() == 1
+    with pytest.raises(DeadlineExceeded):
+        client.generate("fake:latest", "hola", deadline=time.monotonic() - 1)
+    assert client._pool.qsize() == 1
+    client.close()
+
+
+def test_closing_a_stream_cancels_the_generation():
+    with FakeOllama(tokens_per_second=50, response_tokens=500) as server:
+        client = OllamaHTTPClient(server.host)
+        stream = client.generate_stream("fake:latest", "hola")
+        next(stream)
+        stream.close()
+        for _ in range(50):
+            if server.cancelled:
+                break
+            time.sleep(0.05)
+        assert server.cancelled == 1
+        assert client._pool.qsize() == 0
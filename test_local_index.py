@@ -0,0 +1,111 @@
+"""
+Pruebas del buscador local (local_index.py)
+Ejecuta: python -m pytest test_local_index.py
+"""
+import os
+
+import pytest
+
+from local_index import LocalIndex, LocalIndexBackend
+
+
+DOCS = {
+    "python.md": "# Python\n\nPython es un lenguaje interpretado. Python tiene tipado dinámico.",
+    "rust.md": "# Rust\n\nRust es un lenguaje compilado con gestión de memoria sin recolector.",
+    "go.txt": "Go\n\nGo es un lenguaje compilado creado en Google, con recolector de basura.",
+    "web/despliegue.html": "<html><head><title>Despliegue</title></head><body>"
+                           "<nav>Inicio | Ayuda</nav><p>El servicio se despliega con "
+                           "Kubernetes en tres zonas, con un canario del cinco por ciento.</p>"
+                           "</body></html>",
+    "notas.pdf": "no se indexa",
+}
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    root = tmp_path / "docs"
+    for name, text in DOCS.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+    return root
+
+
+def _names(index, query, max_results=5):
+    """Nombres de los archivos encontrados, del más relevante al menos"""
+    hits = [doc_id for doc_id, _ in index.search(query, max_results)]
+    documents = index.documents(hits)
+    return [os.path.basename(documents[doc_id][0]) for doc_id in hits]
+
+
+def test_update_only_reads_what_changed(corpus, tmp_path):
+    index = LocalIndex(str(tmp_path / "index"))
+    assert index.update(str(corpus)) == {"added": 4, "updated": 0, "removed": 0}
+    assert index.update(str(corpus)) == {"added": 0, "updated": 0, "removed": 0}
+
+    (corpus / "rust.md").write_text("# Rust\n\nRust ahora habla de ferrocarriles.",
+                                    encoding="utf-8")
+    (corpus / "go.txt").unlink()
+    (corpus / "zig.md").write_text("# Zig\n\nZig es un lenguaje compilado.", encoding="utf-8")
+    assert index.update(str(corpus)) == {"added": 1, "updated": 1, "removed": 1}
+    assert index.stats()["documents"] == 4
+
+    assert _names(index, "ferrocarriles") == ["rust.md"]
+    assert _names(index, "recolector") == []
+    assert _names(index, "compilado") == ["zig.md"]
+    index.close()
+
+
+def test_bm25_ranking(corpus, tmp_path):
+    index = LocalIndex(str(tmp_path / "index"))
+    index.update(str(corpus))
+    assert _names(index, "python")[0] == "python.md"
+    assert set(_names(index, "lenguaje compilado")[:2]) == {"rust.md", "go.txt"}
+    assert index.search("¿qué es?") == []
+    index.close()
+
+
+def test_merge_keeps_results_and_drops_removed_documents(corpus, tmp_path):
+    index = LocalIndex(str(tmp_path / "index"), max_segments=100)
+    index.update(str(corpus), segment_docs=1)
+    (corpus / "go.txt").unlink()
+    index.update(str(corpus))
+    assert index.stats()["segments"] == 4
+    before = {q: index.search(q) for q in ("lenguaje", "recolector", "kubernetes")}
+    terms = index.stats()["terms"]
+
+    index.merge()
+    assert index.stats()["segments"] == 1
+    assert index.stats()["terms"] < terms
+    for query, hits in before.items():
+        assert [d for d, _ in index.search(query)] == [d for d, _ in hits]
+    assert len(os.listdir(str(tmp_path / "index"))) == 3
+    index.close()
+
+
+def test_update_merges_when_there_are_too_many_segments(corpus, tmp_path):
+    index = LocalIndex(str(tmp_path / "index"), max_segments=2)
+    index.update(str(corpus), segment_docs=1)
+    assert index.stats()["segments"] == 1
+    assert _names(index, "python") == ["python.md"]
+    index.close()
+
+
+def test_index_is_reopened_from_disk(corpus, tmp_path):
+    index = LocalIndex(str(tmp_path / "index"))
+    index.update(str(corpus))
+    hits = index.search("lenguaje")
+    index.close()
+    reopened = LocalIndex(str(tmp_path / "index"))
+    assert reopened.search("lenguaje") == hits
+    assert reopened.update(str(corpus))["added"] == 0
+    reopened.close()
+
+
+def test_backend_results(corpus, tmp_path):
+    backend = LocalIndexBackend(str(corpus), index_dir=str(tmp_path / "index"))
+    results = backend.search("¿Cómo se despliega el servicio con Kubernetes?")
+    assert results[0]["title"] == "Despliegue"
+    assert results[0]["href"] == "file://" + str(corpus / "web" / "despliegue.html")
+    assert "Kubernetes" in results[0]["body"] and "Inicio" not in results[0]["content"]
+    assert backend.search("python", max_results=1)[0]["title"] == "Python"
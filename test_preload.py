@@ -0,0 +1,38 @@
+"""
+Pruebas de la carga del modelo mientras se busca (preload)
+Ejecuta: python -m pytest test_preload.py
+"""
+import time
+
+from fake_ollama import FakeOllama
+
+
+def _research_seconds(agent):
+    start = time.perf_counter()
+    agent.research("¿Qué es Python?")
+    return time.perf_counter() - start
+
+
+def test_model_loads_while_searching(make_agent):
+    with FakeOllama(tokens_per_second=1000, response_tokens=10, load_seconds=0.5) as server:
+        agent = make_agent(server, search_latency=0.5)
+        seconds = _research_seconds(agent)
+        assert seconds < 0.9
+        assert server.loads == 1
+        assert agent.last_timings["load_saved"] > 0.3
+
+
+def test_without_preload_load_and_search_add_up(make_agent):
+    with FakeOllama(tokens_per_second=1000, response_tokens=10, load_seconds=0.5) as server:
+        agent = make_agent(server, search_latency=0.5, preload=False)
+        assert _research_seconds(agent) >= 1.0
+        assert server.loads == 1
+
+
+def test_loaded_model_is_not_waited_for_again(make_agent):
+    with FakeOllama(tokens_per_second=1000, response_tokens=10, load_seconds=0.5) as server:
+        agent = make_agent(server, search_latency=0.1)
+        _research_seconds(agent)
+        assert _research_seconds(agent) < 0.4
+        assert server.loads == 1
+        assert agent.last_timings["load_wait"] < 0.05
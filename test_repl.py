@@ -0,0 +1,51 @@
+"""
+Pruebas del modo interactivo (repl.py)
+Ejecuta: python -m pytest test_repl.py
+"""
+import contextlib
+import io
+
+import pytest
+
+from fake_search import FakeSearchBackend
+from repl import Repl, is_follow_up
+
+
+@pytest.mark.parametrize("question", [
+    "¿Y sus ventajas?",
+    "¿Y en Java?",
+    "¿Sus desventajas?",
+    "Ejemplos de eso",
+    "Explica esto",
+    "¿Lo anterior aplica a Go?",
+    "¿Cuál es su historia?",
+    "Ventajas",
+])
+def test_follow_ups(question):
+    assert is_follow_up(question)
+
+
+@pytest.mark.parametrize("question", [
+    "¿Qué es Python?",
+    "¿Qué significa esta expresión en Python?",
+    "¿Por qué este lenguaje es tan popular?",
+    "¿Cómo funciona esta librería de Rust?",
+    "¿Qué es Python y sus ventajas?",
+    "",
+])
+def test_standalone_questions(question):
+    assert not is_follow_up(question)
+
+
+def test_follow_up_uses_prefetched_search(ollama, make_agent):
+    search = FakeSearchBackend(0.05, jitter=0)
+    agent = make_agent(ollama, search_backend=search)
+    repl = Repl(agent)
+    with contextlib.redirect_stdout(io.StringIO()):
+        repl.handle("¿Qué es Python?")
+        repl.handle("¿Y sus ventajas?")
+        repl.handle("¿Cómo funciona esta librería de Rust?")
+    repl.prefetcher.close()
+    assert repl.prefetcher.hits == 1
+    # La pregunta nueva cambia de tema en vez de añadir "(sobre: python)"
+    assert "rust" in repl.topic and "python" not in repl.topic
@@ -0,0 +1,144 @@
+"""
+Pruebas de la búsqueda con reintentos, circuit breaker y hedging (resilient_search.py)
+Ejecuta: python -m pytest test_resilient_search.py
+"""
+import time
+
+import pytest
+
+import resilient_search
+from resilient_search import CLOSED, HALF_OPEN, OPEN, ResilientSearchBackend
+from search import SearchBackend
+
+
+class ScriptedBackend(SearchBackend):
+    """Buscador falso que falla con los errores indicados, uno por búsqueda"""
+
+    cacheable = False
+
+    def __init__(self, name, errors=(), latency=0.0):
+        self.name = name
+        self.errors = list(errors)
+        self.latency = latency
+        self.calls = 0
+
+    def search(self, query, max_results=3):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.errors:
+            raise self.errors.pop(0)
+        return [{"title": f"{self.name}: {query}", "href": f"https://{self.name}.com",
+                 "body": f"Resultado de {self.name}"}]
+
+
+def _states(backend):
+    return [p["state"] for p in backend.stats()]
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Esperas entre reintentos (sin esperar de verdad)"""
+    delays = []
+    monkeypatch.setattr(resilient_search.time, "sleep", delays.append)
+    return delays
+
+
+def test_rate_limits_are_retried_with_seeded_jitter(sleeps):
+    def retried():
+        limited = ScriptedBackend("a", [Exception("RatelimitException: 202 Ratelimit"),
+                                        Exception("HTTP 429 Too Many Requests")])
+        backend = ResilientSearchBackend([limited], retries=2, backoff=0.5, seed=7)
+        assert backend.search("python")[0]["title"] == "a: python"
+        assert limited.calls == 3
+        stats = backend.stats()[0]
+        assert stats["retries"] == 2 and stats["errors"] == 0 and stats["state"] == CLOSED
+        backend.close()
+
+    retried()
+    first = list(sleeps)
+    assert len(first) == 2 and 0 <= first[0] <= 0.5 and 0 <= first[1] <= 1.0
+    # Con la misma semilla, las mismas esperas
+    retried()
+    assert sleeps[2:] == first
+
+
+def test_other_errors_are_not_retried(sleeps):
+    broken = ScriptedBackend("a", [ValueError("respuesta rara")])
+    backend = ResilientSearchBackend([broken], retries=2, seed=0)
+    with pytest.raises(ValueError):
+        backend.search("python")
+    assert broken.calls == 1 and sleeps == []
+    backend.close()
+
+
+def test_circuit_opens_then_half_opens_and_closes():
+    failing = ScriptedBackend("a", [ConnectionError("caído")] * 4)
+    spare = ScriptedBackend("b")
+    backend = ResilientSearchBackend([failing, spare], retries=0, failure_threshold=3,
+                                     reset_seconds=0.2, hedge=False)
+    for _ in range(3):
+        assert backend.search("python")[0]["title"] == "b: python"
+    assert _states(backend) == [OPEN, CLOSED]
+    # Abierto: ni se intenta
+    backend.search("python")
+    assert failing.calls == 3
+
+    time.sleep(0.25)
+    # A prueba: una búsqueda; si falla vuelve a abrirse sin esperar a otros 3 fallos
+    assert backend.search("python")[0]["title"] == "b: python"
+    assert failing.calls == 4 and _states(backend) == [OPEN, CLOSED]
+
+    time.sleep(0.25)
+    assert backend.search("python")[0]["title"] == "a: python"
+    assert _states(backend) == [CLOSED, CLOSED]
+    backend.close()
+
+
+def test_half_open_admits_a_single_trial():
+    backend = ResilientSearchBackend([ScriptedBackend("a")], reset_seconds=0)
+    provider = backend.providers[0]
+    provider.state, provider.opened_at = OPEN, time.monotonic()
+    assert backend._admit(provider, time.monotonic())
+    assert provider.state == HALF_OPEN
+    assert not backend._admit(provider, time.monotonic())
+    backend.close()
+
+
+def test_slow_backend_is_hedged_and_the_fastest_wins():
+    slow, fast = ScriptedBackend("a", latency=1.0), ScriptedBackend("b")
+    backend = ResilientSearchBackend([slow, fast], hedge_delay=0.1)
+    start = time.perf_counter()
+    assert backend.search("python")[0]["title"] == "b: python"
+    assert 0.1 <= time.perf_counter() - start < 0.5
+    a, b = backend.stats()
+    assert b["hedges"] == 1 and b["wins"] == 1 and a["wins"] == 0
+
+    # Si el primero responde antes del hedge_delay, el segundo ni se usa
+    slow.latency = 0.0
+    backend.search("rust")
+    assert fast.calls == 1
+    backend.close()
+
+
+def test_error_moves_to_the_next_backend_without_waiting():
+    broken, spare = ScriptedBackend("a", [ValueError("respuesta rara")]), ScriptedBackend("b")
+    backend = ResilientSearchBackend([broken, spare], hedge_delay=5.0)
+    start = time.perf_counter()
+    assert backend.search("python")[0]["title"] == "b: python"
+    assert time.perf_counter() - start < 1.0
+    a, b = backend.stats()
+    assert a["errors"] == 1 and b["hedges"] == 0 and b["wins"] == 1
+    backend.close()
+
+
+def test_all_circuits_open():
+    failing = ScriptedBackend("a", [ConnectionError("caído")])
+    backend = ResilientSearchBackend([failing], retries=0, failure_threshold=1,
+                                     reset_seconds=60)
+    with pytest.raises(ConnectionError, match="caído"):
+        backend.search("python")
+    with pytest.raises(ConnectionError, match="desactivados"):
+        backend.search("python")
+    assert failing.calls == 1
+    backend.close()
@@ -0,0 +1,114 @@
+"""
+Pruebas de los turnos agrupados por modelo (scheduler.py)
+Ejecuta: python -m pytest test_scheduler.py
+"""
+import threading
+import time
+
+import pytest
+
+from fake_ollama import FakeOllama
+from scheduler import ModelScheduler
+
+
+@pytest.fixture
+def server():
+    with FakeOllama(models=("a:latest", "b:latest"), tokens_per_second=1000,
+                    response_tokens=10, load_seconds=0.1) as server:
+        yield server
+
+
+def _wait_for(condition, seconds=5.0):
+    deadline = time.monotonic() + seconds
+    while not condition():
+        assert time.monotonic() < deadline, "la condición no se cumplió a tiempo"
+        time.sleep(0.01)
+
+
+def _ask(agent, message, order):
+    """Lanza agent.chat() en un hilo y apunta el mensaje al terminar"""
+    def run():
+        agent.chat(message)
+        order.append(message)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def _queued(scheduler, count):
+    _wait_for(lambda: scheduler.stats()["queued"] == count)
+
+
+def test_requests_are_grouped_by_loaded_model(server, make_agent):
+    scheduler = ModelScheduler(slots=1, max_wait=None)
+    a = make_agent(server, model="a:latest", scheduler=scheduler)
+    b = make_agent(server, model="b:latest", scheduler=scheduler)
+    order = []
+    # Otro turno de "a" en curso mientras llegan las peticiones mezcladas
+    scheduler.acquire("a:latest")
+    threads = []
+    for i in range(3):
+        threads.append(_ask(b, f"b{i}", order))
+        _queued(scheduler, 2 * i + 1)
+        threads.append(_ask(a, f"a{i}", order))
+        _queued(scheduler, 2 * i + 2)
+    assert scheduler.stats()["queued_by_model"] == {"a:latest": 3, "b:latest": 3}
+    scheduler.release()
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ["a0", "a1", "a2", "b0", "b1", "b2"]
+    # Un solo cambio de modelo en vez de uno por petición
+    stats = scheduler.stats()
+    assert stats["swaps"] == 1 and stats["forced_swaps"] == 0
+    assert server.loads == 2
+    assert stats["served"] == 7
+    assert stats["served_by_model"] == {"a:latest": 4, "b:latest": 3}
+    assert stats["wait_seconds"]["max"] > 0
+
+
+@pytest.mark.parametrize("max_wait, expected, swaps, forced", [
+    (None, ["a", "b"], 1, 0),
+    (0.3, ["b", "a"], 2, 1),
+])
+def test_max_wait_forces_the_swap(server, make_agent, max_wait, expected, swaps, forced):
+    scheduler = ModelScheduler(slots=1, max_wait=max_wait)
+    a = make_agent(server, model="a:latest", scheduler=scheduler)
+    b = make_agent(server, model="b:latest", scheduler=scheduler)
+    order = []
+    scheduler.acquire("a:latest")
+    threads = [_ask(b, "b", order)]
+    _queued(scheduler, 1)
+    time.sleep(0.2)
+    # "a" acaba de llegar y es el modelo cargado, pero "b" ya esperó demasiado
+    threads.append(_ask(a, "a", order))
+    _queued(scheduler, 2)
+    time.sleep(0.15)
+    scheduler.release()
+    for thread in threads:
+        thread.join(5)
+
+    assert order == expected
+    stats = scheduler.stats()
+    assert stats["swaps"] == swaps and stats["forced_swaps"] == forced
+
+
+def test_priority_classes(server, make_agent):
+    scheduler = ModelScheduler(slots=1, max_wait=None)
+    agents = {p: make_agent(server, model="a:latest", scheduler=scheduler, priority=p)
+              for p in ("low", "normal", "high")}
+    order = []
+    scheduler.acquire("a:latest")
+    threads = []
+    for i, priority in enumerate(("low", "normal", "high")):
+        threads.append(_ask(agents[priority], priority, order))
+        _queued(scheduler, i + 1)
+    scheduler.release()
+    for thread in threads:
+        thread.join(5)
+    assert order == ["high", "normal", "low"]
+    assert scheduler.stats()["swaps"] == 0
+
+    with pytest.raises(ValueError):
+        scheduler.acquire("a:latest", priority="urgente")
@@ -0,0 +1,100 @@
+"""
+Pruebas de las búsquedas en paralelo y sin duplicados (search.py)
+Ejecuta: python -m pytest test_search.py
+"""
+import time
+
+import pytest
+
+from deadline import DeadlineExceeded
+from fake_search import FakeSearchBackend
+from search import canonicalize_url, dedupe_results, query_variants, search_many
+
+
+class SlowFor(FakeSearchBackend):
+    """Buscador falso que tarda mucho con algunas búsquedas"""
+
+    def __init__(self, slow, seconds):
+        super().__init__(0, jitter=0)
+        self.slow = slow
+        self.seconds = seconds
+
+    def search(self, query, max_results=3):
+        if query in self.slow:
+            time.sleep(self.seconds)
+        return super().search(query, max_results)
+
+
+def _result(href, body):
+    return {"title": href, "href": href, "body": body}
+
+
+def test_query_variants():
+    assert query_variants("¿Qué es Python?") == ["¿Qué es Python?", "python"]
+    assert query_variants("diferencias entre Python y Java") == [
+        "diferencias entre Python y Java", "diferencias python java",
+        "diferencias python", "java",
+    ]
+    assert len(query_variants("a, b, c, d, e y f", max_variants=3)) <= 3
+
+
+@pytest.mark.parametrize("url", [
+    "http://www.example.com/page/?utm_source=x",
+    "https://example.com/page#seccion",
+    "https://EXAMPLE.com/page?fbclid=123",
+])
+def test_canonicalize_url(url):
+    assert canonicalize_url(url) == "https://example.com/page"
+
+
+@pytest.mark.parametrize("param", ["reference=2", "refresh=1", "ref_id=7", "page=3"])
+def test_canonicalize_url_keeps_other_params(param):
+    url = f"https://example.com/page?{param}&ref=home&utm_medium=x&gclid=1"
+    assert canonicalize_url(url) == f"https://example.com/page?{param}"
+
+
+def test_dedupe_results_by_url_and_text():
+    body = "Python es un lenguaje de programación interpretado y de tipado dinámico"
+    results = [
+        _result("https://python.org", body),
+        _result("https://www.python.org/", "otro texto"),
+        _result("https://espejo.com/python", body + " muy usado"),
+        _result("https://rust-lang.org", "Rust es un lenguaje de sistemas"),
+    ]
+    assert [r["href"] for r in dedupe_results(results)] == [
+        "https://python.org", "https://rust-lang.org"
+    ]
+
+
+def test_search_many_interleaves_and_takes_the_slowest_time():
+    search = FakeSearchBackend(0.2, jitter=0)
+    start = time.perf_counter()
+    results = search_many(["python", "rust", "go"], max_results=2, use_cache=False,
+                          backend=search)
+    assert time.perf_counter() - start < 0.4
+    # El buscador falso repite el texto en los resultados de una misma búsqueda
+    assert [r["title"] for r in results] == [
+        "Resultado 1 sobre python", "Resultado 1 sobre rust", "Resultado 1 sobre go"
+    ]
+    assert len(search_many(["python", "rust", "go", "java"], max_total=3, use_cache=False,
+                           backend=search)) == 3
+
+
+def test_search_many_ignores_errors_if_something_works():
+    with pytest.raises(ConnectionError):
+        search_many(["python"], use_cache=False,
+                    backend=FakeSearchBackend(0, jitter=0, error_rate=1.0))
+    flaky = FakeSearchBackend(0, jitter=0, error_rate=0.5, seed=3)
+    assert search_many([f"consulta {i}" for i in range(6)], use_cache=False, backend=flaky)
+
+
+def test_search_many_deadline_uses_what_arrived():
+    search = SlowFor({"lenta"}, 1.0)
+    start = time.perf_counter()
+    results = search_many(["rápida", "lenta"], use_cache=False, backend=search,
+                          deadline=time.monotonic() + 0.3)
+    assert time.perf_counter() - start < 0.6
+    assert [r["title"] for r in results] == ["Resultado 1 sobre rápida"]
+    with pytest.raises(DeadlineExceeded):
+        search_many(["lenta"], use_cache=False, backend=search,
+                    deadline=time.monotonic() + 0.1)
@@ -0,0 +1,143 @@
+"""
+Pruebas del servidor HTTP (server.py)
+Ejecuta: python -m pytest test_server.py
+"""
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+from server import ResearchServer
+
+
+class BlockedAgent:
+    """Agente que no responde hasta que se le deja (para llenar la cola)"""
+
+    model = "fake:latest"
+    answer_store = None
+    backend = None
+    search_backend = None
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.started = 0
+
+    def research(self, question, timeout=None):
+        self.started += 1
+        self.release.wait(5)
+        return f"Respuesta a {question}"
+
+    def research_stream(self, question, timeout=None):
+        yield self.research(question, timeout)
+
+    chat, chat_stream = research, research_stream
+
+
+@pytest.fixture
+def serve():
+    """Arranca servidores en un puerto libre y los para al terminar"""
+    servers = []
+
+    def start(agent, **kwargs):
+        server = ResearchServer(agent, port=0, **kwargs).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def _request(server, path, data=None, raw=None):
+    """Hace una petición y devuelve (status, cuerpo)"""
+    body = raw if raw is not None else (json.dumps(data).encode("utf-8") if data else None)
+    request = urllib.request.Request(server.url + path, data=body)
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, response.read().decode("utf-8")
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode("utf-8")
+
+
+def _wait_for(condition, seconds=5.0):
+    end = time.monotonic() + seconds
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    return condition()
+
+
+def _in_thread(call):
+    result = []
+    thread = threading.Thread(target=lambda: result.append(call()))
+    thread.start()
+    return thread, result
+
+
+def test_research_chat_and_stream(ollama, make_agent, serve):
+    server = serve(make_agent(ollama, preload=False))
+    status, body = _request(server, "/research", {"question": "¿Qué es Python?"})
+    assert status == 200 and json.loads(body)["response"]
+
+    status, body = _request(server, "/chat", {"message": "hola", "stream": True})
+    lines = [json.loads(line) for line in body.splitlines()]
+    assert status == 200 and lines[-1]["done"]
+    assert "".join(line["response"] for line in lines)
+
+    status, body = _request(server, "/health")
+    assert status == 200 and json.loads(body)["active"] == 0
+    assert "deepagents_server_requests_total 2" in _request(server, "/metrics")[1]
+
+
+@pytest.mark.parametrize("path, data, raw", [
+    ("/research", {"pregunta": "sin el campo bueno"}, None),
+    ("/research", {"question": "  "}, None),
+    ("/research", {"question": "¿Qué es Python?", "timeout": "mucho"}, None),
+    ("/research", None, b"esto no es JSON"),
+    ("/research", None, b"[1, 2]"),
+])
+def test_bad_requests(serve, path, data, raw):
+    server = serve(BlockedAgent())
+    status, _ = _request(server, path, data, raw)
+    assert status == 400
+    assert server.agent.started == 0
+
+
+def test_unknown_path(serve):
+    server = serve(BlockedAgent())
+    assert _request(server, "/nada")[0] == 404
+    assert _request(server, "/nada", {"question": "x"})[0] == 404
+
+
+def test_full_queue_is_rejected_at_once(serve):
+    agent = BlockedAgent()
+    server = serve(agent, workers=1, queue_size=1)
+    ask = lambda: _request(server, "/research", {"question": "¿Qué es Python?"})  # noqa: E731
+    first, first_result = _in_thread(ask)
+    assert _wait_for(lambda: agent.started == 1)
+    second, second_result = _in_thread(ask)
+    assert _wait_for(lambda: server.admission.waiting == 1)
+
+    start = time.perf_counter()
+    status, _ = ask()
+    assert status == 429
+    assert time.perf_counter() - start < 1.0
+
+    agent.release.set()
+    first.join()
+    second.join()
+    assert first_result[0][0] == second_result[0][0] == 200
+    assert server.admission.rejected == 1
+
+
+def test_queue_timeout_answers_503(serve):
+    agent = BlockedAgent()
+    server = serve(agent, workers=1, queue_size=4, queue_timeout=0.2)
+    first, _ = _in_thread(lambda: _request(server, "/research", {"question": "uno"}))
+    assert _wait_for(lambda: agent.started == 1)
+    assert _request(server, "/research", {"question": "dos"})[0] == 503
+    agent.release.set()
+    first.join()
+    assert server.admission.timed_out == 1
@@ -0,0 +1,172 @@
+"""
+Pruebas de las conversaciones de varios turnos (session.py)
+Ejecuta: python -m pytest test_session.py
+"""
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from fake_ollama import FakeOllama
+from llm import OllamaHTTPClient
+from server import ResearchServer
+from session import ChatSession
+
+
+class RecordingClient(OllamaHTTPClient):
+    """Cliente que apunta el prompt y los campos extra de cada generación"""
+
+    def __init__(self, host):
+        super().__init__(host)
+        self.calls = []
+
+    def generate(self, model, prompt, options=None, **extra):
+        self.calls.append((model, prompt, extra))
+        return super().generate(model, prompt, options, **extra)
+
+    def generate_stream(self, model, prompt, options=None, **extra):
+        self.calls.append((model, prompt, extra))
+        return super().generate_stream(model, prompt, options, **extra)
+
+
+@pytest.fixture
+def server():
+    with FakeOllama(models=("a:latest", "b:latest"), tokens_per_second=1000,
+                    response_tokens=20) as server:
+        yield server
+
+
+def _agent(make_agent, server, model="a:latest"):
+    return make_agent(server, model=model, preload=False, backend=RecordingClient(server.host))
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_second_turn_sends_only_the_new_message(server, make_agent, tmp_path, stream):
+    agent = _agent(make_agent, server)
+    session = agent.session("ana", store_dir=str(tmp_path))
+
+    def send(message):
+        if stream:
+            return "".join(session.send_stream(message))
+        return session.send(message)
+
+    first = "Hola, me llamo Ana y quiero aprender a programar en Python desde cero"
+    assert send(first)
+    assert "context" not in agent.backend.calls[-1][2]
+    assert session.last_stats["prompt_eval_count"] == len(first) // 4
+    assert session.stats()["incremental"]
+
+    second = "¿Cómo me llamo?"
+    assert send(second)
+    _, prompt, extra = agent.backend.calls[-1]
+    assert prompt == second and extra["context"]
+    # Ollama ya tiene la conversación: solo lee el mensaje nuevo
+    assert session.last_stats["prompt_eval_count"] == len(second) // 4
+    assert session.stats()["turns"] == 2
+
+
+@pytest.mark.parametrize("summarize", [True, False])
+def test_compacts_at_max_tokens(server, make_agent, summarize):
+    agent = _agent(make_agent, server)
+    session = agent.session(store_dir=False, max_tokens=100, keep_turns=1, summarize=summarize)
+    # Cada turno suma unos 24 tokens al context
+    for i in range(4):
+        session.send(f"Pregunta número {i}")
+    assert session.stats()["compactions"] == 0 and session.tokens <= 100
+
+    session.send("Pregunta número 4")
+    stats = session.stats()
+    assert stats["compactions"] == 1 and not stats["incremental"]
+    assert session.turns[0]["content"] == "Pregunta número 4" and len(session.turns) == 2
+    summaries = [p for _, p, _ in agent.backend.calls if p.startswith("Resume en pocas frases")]
+    if summarize:
+        assert len(summaries) == 1 and session.summary
+    else:
+        # Sin resumen los turnos antiguos se descartan
+        assert summaries == [] and session.summary == ""
+
+    # El siguiente turno reenvía lo que queda como texto y empieza un context nuevo
+    session.send("¿Y ahora?")
+    _, prompt, extra = agent.backend.calls[-1]
+    assert "context" not in extra
+    assert "Usuario: Pregunta número 4" in prompt
+    assert prompt.endswith("Usuario: ¿Y ahora?\nAsistente:")
+    assert prompt.startswith("Resumen de la conversación anterior") == summarize
+    assert session.stats()["incremental"]
+
+
+def test_open_stream_does_not_block_the_session(server, make_agent):
+    agent = _agent(make_agent, server)
+    session = agent.session(store_dir=False)
+    stream = session.send_stream("Hola, me llamo Ana")
+    next(stream)
+    # Con el stream a medias la sesión sigue respondiendo (otro hilo, /health...)
+    stats = []
+    thread = threading.Thread(target=lambda: stats.append(session.stats()), daemon=True)
+    thread.start()
+    thread.join(2)
+    assert stats and stats[0]["turns"] == 0
+    # Un stream que se deja de leer no guarda el turno
+    stream.close()
+    assert session.send("¿Cómo me llamo?") and session.stats()["turns"] == 1
+
+
+def test_session_is_reloaded_from_disk(server, make_agent, tmp_path):
+    agent = _agent(make_agent, server)
+    session = agent.session("ana", store_dir=str(tmp_path))
+    session.send("Hola, me llamo Ana")
+    saved = json.loads((tmp_path / "ana.json").read_text(encoding="utf-8"))
+    assert saved["model"] == "a:latest" and saved["context"] == session.context
+
+    # Mismo modelo: se sigue con el context guardado
+    again = ChatSession(agent, "ana", store_dir=str(tmp_path))
+    assert again.turns == session.turns and again.context == session.context
+    again.send("¿Cómo me llamo?")
+    assert agent.backend.calls[-1][2]["context"] == session.context
+
+    # Otro modelo: los tokens no le valen, la conversación va como texto
+    other = _agent(make_agent, server, model="b:latest")
+    moved = ChatSession(other, "ana", store_dir=str(tmp_path))
+    assert moved.turns == again.turns and moved.context is None
+    moved.send("¿Y cuántos años tengo?")
+    _, prompt, extra = other.backend.calls[-1]
+    assert "context" not in extra and "Usuario: Hola, me llamo Ana" in prompt
+
+    moved.delete()
+    assert not (tmp_path / "ana.json").exists()
+    with pytest.raises(ValueError):
+        ChatSession(agent, "../ana", store_dir=str(tmp_path))
+
+
+def _post(server, path, data):
+    """POST con JSON: (status, cuerpo)"""
+    request = urllib.request.Request(server.url + path, data=json.dumps(data).encode("utf-8"))
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, response.read().decode("utf-8")
+    except urllib.error.HTTPError as e:
+        return e.code, e.read().decode("utf-8")
+
+
+def test_server_chat_with_session(server, make_agent):
+    agent = _agent(make_agent, server)
+    research = ResearchServer(agent, port=0).start()
+    try:
+        status, body = _post(research, "/chat", {"message": "Hola, me llamo Ana",
+                                                 "session": "ana"})
+        assert status == 200 and json.loads(body)["response"]
+        status, body = _post(research, "/chat", {"message": "¿Cómo me llamo?",
+                                                 "session": "ana", "stream": True})
+        chunks = [json.loads(line) for line in body.splitlines()]
+        assert status == 200 and chunks[-1]["done"]
+        assert agent.backend.calls[-1][2]["context"]
+        assert research.session("ana").stats()["turns"] == 2
+
+        # Sin "session" el chat no recuerda nada
+        _post(research, "/chat", {"message": "¿Cómo me llamo?"})
+        assert "context" not in agent.backend.calls[-1][2]
+        assert _post(research, "/chat", {"message": "Hola", "session": "../x"})[0] == 400
+    finally:
+        research.stop()
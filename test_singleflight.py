@@ -0,0 +1,160 @@
+"""
+Pruebas de la agrupación de peticiones idénticas (singleflight.py)
+Ejecuta: python -m pytest test_singleflight.py
+"""
+import threading
+import time
+
+import pytest
+
+from deadline import DeadlineExceeded
+from fake_ollama import FakeOllama
+from singleflight import SingleFlight
+
+
+def _wait_for(condition, seconds=2.0):
+    end = time.monotonic() + seconds
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    return condition()
+
+
+def _in_threads(count, target):
+    """Ejecuta target(i) en `count` hilos y devuelve (hilos, resultados)"""
+    results = [None] * count
+
+    def run(i):
+        try:
+            results[i] = target(i)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_identical_calls_run_once():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        release.wait(2)
+        return "respuesta"
+
+    threads, results = _in_threads(5, lambda i: flight.do("clave", work))
+    assert _wait_for(lambda: flight.stats()["coalesced"] == 4)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert results == ["respuesta"] * 5
+    assert len(calls) == 1
+    # Solo se comparten llamadas en curso: la siguiente vuelve a ejecutarse
+    assert flight.do("clave", work) == "respuesta"
+    assert len(calls) == 2
+    assert flight.stats() == {"in_flight": 0, "coalesced": 4}
+
+
+def test_different_keys_do_not_wait_for_each_other():
+    flight = SingleFlight()
+    release = threading.Event()
+    threads, _ = _in_threads(1, lambda i: flight.do("lenta", lambda: release.wait(2)))
+    assert _wait_for(lambda: flight.stats()["in_flight"] == 1)
+    assert flight.do("otra", lambda: "rápida") == "rápida"
+    release.set()
+    threads[0].join()
+
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def fail():
+        release.wait(2)
+        raise ConnectionError("sin Ollama")
+
+    threads, results = _in_threads(3, lambda i: flight.do("clave", fail))
+    assert _wait_for(lambda: flight.stats()["coalesced"] == 2)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert all(isinstance(r, ConnectionError) for r in results)
+
+
+def test_follower_stops_waiting_at_its_deadline():
+    flight = SingleFlight()
+    release = threading.Event()
+    threads, results = _in_threads(1, lambda i: flight.do("clave", lambda: release.wait(2)))
+    assert _wait_for(lambda: flight.stats()["in_flight"] == 1)
+    with pytest.raises(DeadlineExceeded):
+        flight.do("clave", lambda: "no se ejecuta", deadline=time.monotonic() + 0.1)
+    release.set()
+    threads[0].join()
+    assert results == [True]
+
+
+def test_late_stream_reader_gets_every_chunk():
+    flight = SingleFlight()
+    release = threading.Event()
+    made = []
+
+    def make_stream():
+        made.append(1)
+        yield "uno "
+        release.wait(2)
+        yield "dos "
+        yield "tres"
+
+    first = flight.stream("clave", make_stream)
+    assert next(first) == "uno "
+    second = flight.stream("clave", make_stream)
+    threads, results = _in_threads(1, lambda i: "".join(second))
+    assert _wait_for(lambda: flight.stats()["coalesced"] == 1)
+    release.set()
+    assert "uno " + "".join(first) == "uno dos tres"
+    threads[0].join()
+    assert results == ["uno dos tres"]
+    assert len(made) == 1
+
+
+def test_stream_is_closed_when_nobody_reads():
+    flight = SingleFlight()
+    closed = threading.Event()
+
+    def make_stream():
+        try:
+            while True:
+                time.sleep(0.01)
+                yield "trozo "
+        finally:
+            closed.set()
+
+    stream = flight.stream("clave", make_stream)
+    next(stream)
+    stream.close()
+    assert closed.wait(2)
+    assert _wait_for(lambda: flight.stats()["in_flight"] == 0)
+
+
+def test_stream_errors_reach_every_reader():
+    flight = SingleFlight()
+
+    def make_stream():
+        yield "algo "
+        raise ConnectionError("sin Ollama")
+
+    with pytest.raises(ConnectionError):
+        list(flight.stream("clave", make_stream))
+
+
+def test_agent_shares_identical_streamed_chats(make_agent):
+    with FakeOllama(tokens_per_second=100, response_tokens=30) as server:
+        agent = make_agent(server, preload=False)
+        threads, results = _in_threads(3, lambda i: "".join(agent.chat_stream("  Hola ")))
+        for thread in threads:
+            thread.join()
+        assert len(set(results)) == 1 and results[0]
+        assert server.requests == 1
@@ -0,0 +1,70 @@
+"""
+Pruebas del arranque del agente (una consulta a Ollama e imports perezosos)
+Ejecuta: python -m pytest test_startup.py
+"""
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from cache import ModelInventory
+from llm import OllamaHTTPClient
+
+
+class CountingClient(OllamaHTTPClient):
+    """Cliente HTTP que cuenta las veces que se piden los modelos"""
+
+    probes = 0
+
+    def list_models(self):
+        self.probes += 1
+        return super().list_models()
+
+
+def test_agent_probes_ollama_once_and_remembers_it(ollama, make_agent):
+    inventory = ModelInventory()
+    first = CountingClient(ollama.host)
+    agent = make_agent(ollama, backend=first, model_inventory=inventory, preload=False)
+    assert agent.model == "fake:latest"
+    assert first.probes == 1
+
+    second = CountingClient(ollama.host)
+    make_agent(ollama, backend=second, model_inventory=inventory, preload=False)
+    assert second.probes == 0
+
+
+def test_stale_inventory_is_refreshed_once(ollama, make_agent):
+    inventory = ModelInventory()
+    inventory.set(ollama.host, ["otro:latest"])
+    client = CountingClient(ollama.host)
+    agent = make_agent(ollama, model="fake:latest", backend=client,
+                       model_inventory=inventory, preload=False)
+    assert agent.model == "fake:latest"
+    assert client.probes == 1
+    assert inventory.get(ollama.host) == ["fake:latest"]
+
+
+def test_missing_model_is_reported(ollama, make_agent):
+    with pytest.raises(RuntimeError, match="no encontrado"):
+        make_agent(ollama, model="no-existe:1b", preload=False)
+
+
+@pytest.mark.skipif(shutil.which("ollama") is not None, reason="Ollama está instalado")
+def test_without_api_or_cli_ollama_is_not_installed(make_agent):
+    class Nowhere:
+        host = "http://127.0.0.1:9"
+
+    with pytest.raises(RuntimeError, match="no está instalado"):
+        make_agent(Nowhere, preload=False)
+
+
+def test_import_does_not_load_optional_modules():
+    optional = ("asyncio", "batch", "ddgs", "embeddings", "fetch", "numpy",
+                "answer_store", "balancer", "local_index")
+    code = f"import sys, agent; print([m for m in {optional!r} if m in sys.modules])"
+    root = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True,
+                            text=True, check=True).stdout
+    assert output.strip() == "[]"
@@ -0,0 +1,50 @@
+"""
+Pruebas de las respuestas en streaming (research_stream y chat_stream)
+Ejecuta: python -m pytest test_streaming.py
+"""
+import time
+
+from fake_ollama import FakeOllama
+
+
+def _wait_for(condition, seconds=2.0):
+    """Espera a que el servidor falso registre algo (lo hace en su hilo)"""
+    end = time.monotonic() + seconds
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.02)
+    return condition()
+
+
+def test_stream_gives_the_same_answer_in_pieces(ollama, make_agent):
+    agent = make_agent(ollama, preload=False)
+    pieces = list(agent.research_stream("¿Qué es Python?"))
+    assert len(pieces) > 1
+    assert "".join(pieces).strip() == agent.research("¿Qué es Python?")
+    assert "".join(agent.chat_stream("hola")).strip() == agent.chat("hola")
+
+
+def test_first_piece_arrives_before_the_answer_ends(make_agent):
+    with FakeOllama(tokens_per_second=50, response_tokens=50) as server:
+        agent = make_agent(server, preload=False)
+        start = time.perf_counter()
+        stream = agent.research_stream("¿Qué es Python?")
+        next(stream)
+        assert time.perf_counter() - start < 0.5
+        stream.close()
+
+
+def test_closing_the_stream_cancels_the_generation(make_agent):
+    with FakeOllama(tokens_per_second=50, response_tokens=500) as server:
+        agent = make_agent(server, preload=False)
+        for stream in (agent.research_stream("¿Qué es Python?"), agent.chat_stream("hola")):
+            next(stream)
+            stream.close()
+        assert _wait_for(lambda: server.cancelled == 2)
+        assert _wait_for(lambda: server.active == 0)
+
+
+def test_stream_errors_are_a_message(make_agent):
+    with FakeOllama(error_rate=1.0) as server:
+        agent = make_agent(server, preload=False)
+        answer = "".join(agent.chat_stream("hola"))
+        assert answer.startswith("Error")
@@ -0,0 +1,95 @@
+"""
+Pruebas de las trazas y métricas (tracing.py)
+Ejecuta: python -m pytest test_tracing.py
+"""
+import io
+import json
+
+import pytest
+
+import tracing
+from tracing import JSONLogExporter, PrometheusExporter, span
+
+
+@pytest.fixture
+def spans():
+    """Etapas terminadas durante la prueba"""
+    finished = []
+    hook = tracing.add_hook(finished.append)
+    yield finished
+    tracing.remove_hook(hook)
+
+
+def test_without_hooks_nothing_is_measured():
+    assert not tracing.enabled()
+    with span("search") as s:
+        s.set(results=3)
+    assert not isinstance(s, tracing.Span)
+
+
+def test_nested_spans_share_the_trace(spans):
+    with span("research"):
+        with span("search", query="python") as s:
+            s.set(results=3)
+        with pytest.raises(ValueError):
+            with span("llm"):
+                raise ValueError("sin modelo")
+    search, llm, research = spans
+    assert search.trace_id == llm.trace_id == research.trace_id == research.span_id
+    assert search.parent_id == llm.parent_id == research.span_id
+    assert search.attrs == {"query": "python", "results": 3}
+    assert llm.error == "ValueError: sin modelo"
+    assert research.error is None and research.duration >= search.duration
+
+
+def test_broken_hooks_do_not_break_the_agent(spans):
+    def broken(_):
+        raise RuntimeError("exportador roto")
+
+    tracing.add_hook(broken)
+    try:
+        with span("search"):
+            pass
+    finally:
+        tracing.remove_hook(broken)
+    assert [s.name for s in spans] == ["search"]
+
+
+def test_set_stats_from_ollama():
+    s = tracing.Span("llm", {})
+    s.set_stats({"prompt_eval_count": 100, "prompt_eval_duration": 500_000_000,
+                 "eval_count": 50, "eval_duration": 2_000_000_000, "load_duration": 0})
+    assert s.attrs == {
+        "prompt_tokens": 100, "response_tokens": 50,
+        "prompt_eval_seconds": 0.5, "eval_seconds": 2.0,
+        "tokens_per_second": 25.0, "prompt_tokens_per_second": 200.0,
+    }
+
+
+def test_exporters():
+    stream = io.StringIO()
+    metrics = PrometheusExporter()
+    hooks = [tracing.add_hook(JSONLogExporter(stream)), tracing.add_hook(metrics)]
+    try:
+        with span("llm") as s:
+            s.set(cache_hit=False)
+            s.set_stats({"eval_count": 10, "eval_duration": 1_000_000_000})
+    finally:
+        for hook in hooks:
+            tracing.remove_hook(hook)
+    line = json.loads(stream.getvalue())
+    assert line["name"] == "llm" and line["response_tokens"] == 10
+    text = metrics.render()
+    assert 'deepagents_stage_seconds_count{stage="llm"} 1' in text
+    assert 'deepagents_tokens_total{stage="llm",kind="response"} 10' in text
+    assert 'deepagents_cache_total{stage="llm",result="miss"} 1' in text
+
+
+def test_agent_stages(ollama, make_agent, spans):
+    agent = make_agent(ollama, preload=False)
+    agent.research("¿Qué es Python?")
+    by_name = {s.name: s for s in spans}
+    assert {"research", "search", "prompt", "llm"} <= set(by_name)
+    assert len({s.trace_id for s in spans if s.name != "model_load"}) == 1
+    assert by_name["llm"].attrs["response_tokens"] == 20
+    assert by_name["llm"].attrs["tokens_per_second"] > 0
@@ -0,0 +1,336 @@
+"""
+Trazas y métricas de cada etapa del agente
+Mide cuánto tarda la búsqueda, el prompt, la carga del modelo y la
+generación, con los tokens y la velocidad que informa Ollama
+
+Desactivado no cuesta casi nada: span() devuelve siempre el mismo
+objeto vacío hasta que alguien registra un hook.
+
+Uso:
+    import tracing
+    tracing.add_hook(tracing.JSONLogExporter())          # una línea JSON por etapa
+    metrics = tracing.PrometheusExporter()
+    tracing.add_hook(metrics)
+    metrics.serve(9464)                                  # http://localhost:9464/metrics
+"""
+import contextvars
+import itertools
+import json
+import sys
+import threading
+import time
+
+
+_hooks = ()
+_hooks_lock = threading.Lock()
+_current = contextvars.ContextVar("deepagents_span", default=None)
+_ids = itertools.count(1)
+
+
+def add_hook(hook):
+    """
+    Registra una función que recibe cada Span al terminar
+
+    Args:
+        hook: Función (o exportador) que se llama con el Span
+    """
+    global _hooks
+    with _hooks_lock:
+        _hooks = _hooks + (hook,)
+    return hook
+
+
+def remove_hook(hook):
+    """Quita un hook registrado con add_hook()"""
+    global _hooks
+    with _hooks_lock:
+        _hooks = tuple(h for h in _hooks if h is not hook)
+
+
+def enabled():
+    """Indica si hay algún hook (si no, las trazas no se miden)"""
+    return bool(_hooks)
+
+
+class Span:
+    """
+    Una etapa medida (ej: 'search', 'llm')
+
+    Atributos:
+        name: Nombre de la etapa
+        attrs: Datos de la etapa (tokens, cache_hit, modelo...)
+        trace_id: Identificador compartido por las etapas de una misma pregunta
+        span_id / parent_id: Para reconstruir el árbol de etapas
+        start: Hora de inicio (time.time())
+        duration: Segundos que tardó
+        error: Mensaje si la etapa falló
+    """
+
+    __slots__ = ("name", "attrs", "trace_id", "span_id", "parent_id", "start",
+                 "duration", "error", "_t0", "_token")
+
+    def __init__(self, name, attrs):
+        parent = _current.get()
+        self.name = name
+        self.attrs = attrs
+        self.span_id = next(_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.start = None
+        self.duration = None
+        self.error = None
+
+    def set(self, **attrs):
+        """Añade datos a la etapa"""
+        self.attrs.update(attrs)
+
+    def set_error(self, message):
+        """Marca la etapa como fallida (cuando el error no llega como excepción)"""
+        self.error = message
+
+    def set_stats(self, stats):
+        """
+        Añade los tokens y la velocidad a partir de las estadísticas de Ollama
+
+        Args:
+            stats: Diccionario con prompt_eval_count, eval_count, eval_duration...
+        """
+        if not stats:
+            return
+        attrs = self.attrs
+        if "prompt_eval_count" in stats:
+            attrs["prompt_tokens"] = stats["prompt_eval_count"]
+        if "eval_count" in stats:
+            attrs["response_tokens"] = stats["eval_count"]
+        for key in ("load_duration", "prompt_eval_duration", "eval_duration"):
+            if stats.get(key):
+                # Ollama da nanosegundos
+                attrs[key.replace("duration", "seconds")] = stats[key] / 1e9
+        if stats.get("eval_duration") and stats.get("eval_count"):
+            attrs["tokens_per_second"] = stats["eval_count"] / (stats["eval_duration"] / 1e9)
+        if stats.get("prompt_eval_duration") and stats.get("prompt_eval_count"):
+            attrs["prompt_tokens_per_second"] = (
+                stats["prompt_eval_count"] / (stats["prompt_eval_duration"] / 1e9)
+            )
+
+    def __enter__(self):
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._t0
+        if exc_type is not None and self.error is None and not issubclass(
+            exc_type, (GeneratorExit, StopIteration)
+        ):
+            self.error = f"{exc_type.__name__}: {exc}"
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # Un generador que se terminó desde otro contexto
+            pass
+        for hook in _hooks:
+            try:
+                hook(self)
+            except Exception:
+                # Un exportador roto no debe romper al agente
+                pass
+        return False
+
+    def to_dict(self):
+        """Diccionario listo para JSON"""
+        data = {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+        }
+        if self.error:
+            data["error"] = self.error
+        data.update(self.attrs)
+        return data
+
+
+class _NoopSpan:
+    """Lo que devuelve span() si no hay hooks: no mide nada"""
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def set_error(self, message):
+        pass
+
+    def set_stats(self, stats):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name, **attrs):
+    """
+    Mide una etapa
+
+        with span("search", query=q) as s:
+            ...
+            s.set(results=len(results))
+
+    Args:
+        name: Nombre de la etapa
+        **attrs: Datos iniciales de la etapa
+
+    Returns:
+        Un Span (o uno vacío si no hay hooks registrados)
+    """
+    if not _hooks:
+        return _NOOP
+    return Span(name, attrs)
+
+
+class JSONLogExporter:
+    """Escribe cada etapa como una línea JSON (en stderr o un archivo)"""
+
+    def __init__(self, stream=None):
+        """
+        Args:
+            stream: Archivo abierto o ruta (default: sys.stderr)
+        """
+        if isinstance(stream, str):
+            stream = open(stream, "a", encoding="utf-8")
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def __call__(self, span):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        stream = self.stream or sys.stderr
+        with self._lock:
+            stream.write(line + "\n")
+            stream.flush()
+
+
+# Límites (segundos) de los histogramas de duración
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class PrometheusExporter:
+    """
+    Acumula métricas por etapa en formato de texto de Prometheus
+
+    Métricas:
+        deepagents_stage_seconds        histograma de duración por etapa
+        deepagents_stage_errors_total   etapas que fallaron
+        deepagents_tokens_total         tokens del prompt y de la respuesta
+        deepagents_eval_seconds_total   tiempo de generación (tokens/s = tokens / esto)
+        deepagents_cache_total          aciertos y fallos de caché
+    """
+
+    def __init__(self, prefix="deepagents"):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._errors = {}
+        self._tokens = {}
+        self._eval_seconds = {}
+        self._cache = {}
+
+    def __call__(self, span):
+        name = span.name
+        attrs = span.attrs
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = [[0] * len(BUCKETS), 0, 0.0]
+            for i, limit in enumerate(BUCKETS):
+                if span.duration <= limit:
+                    histogram[0][i] += 1
+            histogram[1] += 1
+            histogram[2] += span.duration
+
+            if span.error:
+                self._errors[name] = self._errors.get(name, 0) + 1
+            for kind in ("prompt", "response"):
+                count = attrs.get(f"{kind}_tokens")
+                if count:
+                    key = (name, kind)
+                    self._tokens[key] = self._tokens.get(key, 0) + count
+            if attrs.get("eval_seconds"):
+                self._eval_seconds[name] = self._eval_seconds.get(name, 0.0) + attrs["eval_seconds"]
+            if "cache_hit" in attrs:
+                key = (name, "hit" if attrs["cache_hit"] else "miss")
+                self._cache[key] = self._cache.get(key, 0) + 1
+
+    def render(self):
+        """Devuelve todas las métricas como texto (Content-Type: text/plain; version=0.0.4)"""
+        p = self.prefix
+        lines = []
+        with self._lock:
+            lines.append(f"# HELP {p}_stage_seconds Duración de cada etapa")
+            lines.append(f"# TYPE {p}_stage_seconds histogram")
+            for name, (buckets, count, total) in sorted(self._histograms.items()):
+                for limit, value in zip(BUCKETS, buckets):
+                    lines.append(f'{p}_stage_seconds_bucket{{stage="{name}",le="{limit}"}} {value}')
+                lines.append(f'{p}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {count}')
+                lines.append(f'{p}_stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+                lines.append(f'{p}_stage_seconds_count{{stage="{name}"}} {count}')
+
+            lines.append(f"# HELP {p}_stage_errors_total Etapas que terminaron con error")
+            lines.append(f"# TYPE {p}_stage_errors_total counter")
+            for name, value in sorted(self._errors.items()):
+                lines.append(f'{p}_stage_errors_total{{stage="{name}"}} {value}')
+
+            lines.append(f"# HELP {p}_tokens_total Tokens procesados")
+            lines.append(f"# TYPE {p}_tokens_total counter")
+            for (name, kind), value in sorted(self._tokens.items()):
+                lines.append(f'{p}_tokens_total{{stage="{name}",kind="{kind}"}} {value}')
+
+            lines.append(f"# HELP {p}_eval_seconds_total Segundos generando tokens")
+            lines.append(f"# TYPE {p}_eval_seconds_total counter")
+            for name, value in sorted(self._eval_seconds.items()):
+                lines.append(f'{p}_eval_seconds_total{{stage="{name}"}} {value:.6f}')
+
+            lines.append(f"# HELP {p}_cache_total Aciertos y fallos de caché")
+            lines.append(f"# TYPE {p}_cache_total counter")
+            for (name, result), value in sorted(self._cache.items()):
+                lines.append(f'{p}_cache_total{{stage="{name}",result="{result}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=9464, host="127.0.0.1"):
+        """
+        Sirve las métricas en http://host:port/metrics en un hilo aparte
+
+        Returns:
+            El servidor HTTP (server.shutdown() para pararlo)
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        return server